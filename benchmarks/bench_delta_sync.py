@@ -0,0 +1,52 @@
+"""Records fetched by a full Oggo read versus an updated_since delta read.
+
+Usage (mock running with e.g. MOCK_CONTACT_COUNT=100000):
+    python benchmarks/bench_delta_sync.py --entity contacts --touch 500
+
+Touches --touch records through the mock's /mock/touch endpoint, then pages
+through the whole dataset and through only the records updated since just
+before the touch, reporting record counts, pages and time for both reads.
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+
+import requests
+
+
+def read_all(session, url, page_size, updated_since=None):
+    params = {"limit": page_size}
+    if updated_since:
+        params["updated_since"] = updated_since
+    records = pages = 0
+    started = time.perf_counter()
+    while True:
+        body = session.get(url, params=params, timeout=60).json()
+        records += len(body["results"])
+        pages += 1
+        after = body.get("paging", {}).get("next", {}).get("after")
+        if not after:
+            return records, pages, time.perf_counter() - started
+        params["after"] = after
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mock", default="http://localhost:3000")
+    parser.add_argument("--entity", choices=["contacts", "projects"], default="contacts")
+    parser.add_argument("--touch", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    session = requests.Session()
+    since = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    session.post(f"{args.mock}/mock/touch", json={"entity": args.entity, "count": args.touch}, timeout=60)
+
+    url = f"{args.mock}/{args.entity}"
+    for label, updated_since in (("full", None), ("delta", since)):
+        records, pages, elapsed = read_all(session, url, args.page_size, updated_since)
+        print(f"{label:>5}: {records:>9,} records in {pages:>6,} pages, {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Throughput of HubSpotBatchWriter against the mock HubSpot batch endpoint.
+
+Usage (mock running, optionally with MOCK_HUBSPOT_429_RATE set):
+    python benchmarks/bench_hubspot_batch.py --records 10000 --workers 1 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from shared.hubspot_batch import HubSpotBatchWriter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:3000/crm/v3/objects/contacts/batch/create")
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    inputs = [{"properties": {"email": f"contact{i}@example.com", "firstname": f"first{i}"}} for i in range(args.records)]
+    headers = {"Content-Type": "application/json"}
+
+    for workers in args.workers:
+        writer = HubSpotBatchWriter(max_workers=workers)
+        start = time.perf_counter()
+        result = writer.write(args.url, inputs, headers=headers)
+        elapsed = time.perf_counter() - start
+        print(
+            f"workers={workers}: {len(result['results'])}/{args.records} written in {elapsed:.2f}s "
+            f"-> {len(result['results']) / elapsed:,.0f} records/sec, chunks={result['chunks']} "
+            f"retries={result['retries']} errors={len(result['errors'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
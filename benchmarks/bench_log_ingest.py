@@ -0,0 +1,77 @@
+"""Ingest throughput of the service_logs segment store versus the legacy TinyDB path.
+
+Usage:
+    python benchmarks/bench_log_ingest.py --events 1000000 --batch-size 100 --tinydb-events 5000
+
+TinyDB rewrites the whole document on every insert, so its run is capped
+with --tinydb-events; the events/sec figure keeps dropping as it grows.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "service_logs"))
+
+from log_store import SegmentLogStore
+
+
+def make_event(i):
+    return {
+        "service": "flow",
+        "level": "info",
+        "message": "service_contacts → service_connect (fetch_oggo_contacts)",
+        "from_service": "service_contacts",
+        "to_service": "service_connect",
+        "action": "fetch_oggo_contacts",
+        "request_id": f"{i // 10:08x}",
+        "timestamp": time.time(),
+    }
+
+
+def bench_segment_store(events, batch_size):
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = SegmentLogStore(data_dir)
+        start = time.perf_counter()
+        for offset in range(0, events, batch_size):
+            store.append_many([make_event(i) for i in range(offset, min(offset + batch_size, events))])
+        elapsed = time.perf_counter() - start
+        return events / elapsed, elapsed, store.stats()
+
+
+def bench_tinydb(events):
+    try:
+        from tinydb import TinyDB
+    except ImportError:
+        return None
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        db = TinyDB(os.path.join(data_dir, "logs.json"))
+        start = time.perf_counter()
+        for i in range(events):
+            db.insert(make_event(i))
+        elapsed = time.perf_counter() - start
+        return events / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--tinydb-events", type=int, default=5000)
+    args = parser.parse_args()
+
+    rate, elapsed, stats = bench_segment_store(args.events, args.batch_size)
+    print(f"segment store: {args.events} events in {elapsed:.2f}s -> {rate:,.0f} events/sec {stats}")
+
+    result = bench_tinydb(args.tinydb_events)
+    if result is None:
+        print("tinydb: not installed, skipped")
+    else:
+        rate, elapsed = result
+        print(f"tinydb:        {args.tinydb_events} events in {elapsed:.2f}s -> {rate:,.0f} events/sec")
+
+
+if __name__ == "__main__":
+    main()
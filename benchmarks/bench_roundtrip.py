@@ -0,0 +1,70 @@
+"""p50/p99 latency of a gateway -> contacts -> connect -> mock round-trip.
+
+Usage (with the stack running via `make up`):
+    python benchmarks/bench_roundtrip.py --requests 200 --label pooled
+
+Run it once on a checkout that still uses bare requests calls and once
+with the shared pooled client, using the same --requests/--concurrency,
+and compare the two summaries. --client-mode fresh opens a new connection
+per benchmark request as well, which isolates the server-side change from
+the client side of the measurement.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(url, total, concurrency, client_mode):
+    if client_mode == "pooled":
+        from shared.http_client import get_http_client
+        send = get_http_client().post
+    else:
+        send = requests.post
+
+    def one(_):
+        start = time.perf_counter()
+        response = send(url, json={}, timeout=60)
+        return (time.perf_counter() - start) * 1000, response.status_code
+
+    # Warm up pools and caches on every hop before measuring
+    for _ in range(min(10, total)):
+        one(None)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    return [latency for latency, _ in results], [status for _, status in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:9000/api/contacts/sync")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--client-mode", choices=["pooled", "fresh"], default="pooled")
+    parser.add_argument("--label", default="current")
+    args = parser.parse_args()
+
+    latencies, statuses = run(args.url, args.requests, args.concurrency, args.client_mode)
+    errors = len([status for status in statuses if status >= 400])
+    print(
+        f"{args.label}: n={len(latencies)} errors={errors} "
+        f"p50={percentile(latencies, 50):.1f}ms p99={percentile(latencies, 99):.1f}ms "
+        f"mean={statistics.mean(latencies):.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
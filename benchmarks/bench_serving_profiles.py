@@ -0,0 +1,213 @@
+"""Requests/sec and latency of the gateway path under the dev server and each gunicorn profile.
+
+Starts the gateway locally once per profile, in front of a small stub
+upstream, and drives GET /api/stub/<route> with concurrent keep-alive
+clients. Each profile runs gateway/gunicorn.conf.py with
+GUNICORN_WORKER_CLASS set; "dev" is `python app.py` (Werkzeug, debug=True).
+
+Usage (gateway requirements installed, port 5000 free):
+    python benchmarks/bench_serving_profiles.py --profiles dev sync gthread gevent --clients 32 --duration 10
+
+To measure an already running gateway instead (e.g. the compose stack):
+    python benchmarks/bench_serving_profiles.py --url http://localhost:9000/api/contacts/health
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+GATEWAY_DIR = os.path.join(ROOT, "gateway")
+
+# The dev server's port is fixed in gateway/app.py
+GATEWAY_PORT = 5000
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every request with a small JSON body, standing in for a backend service"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, delayed ACKs add ~40ms per request
+    disable_nagle_algorithm = True
+    body = json.dumps({"status": "ok", "service": "stub"}).encode("utf-8")
+
+    def do_GET(self):
+        self._reply()
+
+    def do_POST(self):
+        # Also swallows the gateway's log shipper batches
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._reply()
+
+    def _reply(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_gateway(profile, stub_url, workers, threads):
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": ROOT,
+        "SERVICE_STUB": stub_url,
+        "LOGS_SERVICE_URL": stub_url,
+        "GUNICORN_BIND": f"127.0.0.1:{GATEWAY_PORT}",
+        "GUNICORN_WORKER_CLASS": profile,
+    })
+    if workers:
+        env["GUNICORN_WORKERS"] = str(workers)
+    if threads:
+        env["GUNICORN_THREADS"] = str(threads)
+
+    if profile == "dev":
+        command = [sys.executable, "app.py"]
+    else:
+        command = [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "app:create_app()"]
+    # A session of its own, so the dev server's reloader child goes down with it
+    return subprocess.Popen(
+        command, cwd=GATEWAY_DIR, env=env, start_new_session=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def stop_gateway(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def wait_until_ready(url, timeout=30):
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+            conn.request("GET", parts.path)
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def run_load(url, clients, duration, warmup):
+    """Hammer url from `clients` threads, each on its own keep-alive connection"""
+    parts = urlsplit(url)
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    start_at = time.perf_counter() + warmup
+    stop_at = start_at + duration
+
+    def client(index):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        while True:
+            started = time.perf_counter()
+            if started >= stop_at:
+                break
+            try:
+                conn.request("GET", parts.path)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            # Requests that started during the warm-up are not counted
+            if started < start_at:
+                continue
+            if ok:
+                latencies[index].append(time.perf_counter() - started)
+            else:
+                errors[index] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(index,), daemon=True) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    samples = sorted(value for per_client in latencies for value in per_client)
+    return samples, sum(errors)
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return float("nan")
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def report(label, samples, errors, duration):
+    print(
+        f"{label:>8}: {len(samples) / duration:8,.0f} req/s  "
+        f"p50={percentile(samples, 0.50) * 1000:7.2f}ms  p99={percentile(samples, 0.99) * 1000:7.2f}ms  "
+        f"max={(samples[-1] if samples else float('nan')) * 1000:7.2f}ms  errors={errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", default=["dev", "sync", "gthread", "gevent"])
+    parser.add_argument("--url", help="Measure this running endpoint instead of starting the gateway")
+    parser.add_argument("--route", default="health", help="Route requested on the stub service through the gateway")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--workers", type=int, default=0, help="GUNICORN_WORKERS override (default: gunicorn.conf.py)")
+    parser.add_argument("--threads", type=int, default=0, help="GUNICORN_THREADS override (default: gunicorn.conf.py)")
+    args = parser.parse_args()
+
+    print(f"clients={args.clients} duration={args.duration}s warmup={args.warmup}s")
+
+    if args.url:
+        samples, errors = run_load(args.url, args.clients, args.duration, args.warmup)
+        report("url", samples, errors, args.duration)
+        return
+
+    stub = start_stub()
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    url = f"http://127.0.0.1:{GATEWAY_PORT}/api/stub/{args.route}"
+    try:
+        for profile in args.profiles:
+            process = start_gateway(profile, stub_url, args.workers, args.threads)
+            try:
+                wait_until_ready(url)
+                samples, errors = run_load(url, args.clients, args.duration, args.warmup)
+                report(profile, samples, errors, args.duration)
+            except RuntimeError as e:
+                print(f"{profile:>8}: {e}")
+            finally:
+                stop_gateway(process)
+    finally:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,20 @@
 from flask import Blueprint, request, jsonify
 import logging
 import time
-import json
 from services.gateway_service import GatewayService
+from services.response_capture import ResponseCapture
 from shared.debugger_client import track_incoming_request_with_payload, track_routing, track_final_response
+from shared.streaming import has_request_body, iter_request_body
 
 gateway_bp = Blueprint('gateway', __name__)
 logger = logging.getLogger(__name__)
 
 # Initialize service
 gateway_service = GatewayService()
+response_capture = ResponseCapture.from_env()
+
+# Bodies up to this size are buffered so their payload can be logged; larger ones are streamed
+PAYLOAD_CAPTURE_LIMIT = 64 * 1024
 
 @gateway_bp.route('/api/<service>/<path:route>', methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH'])
 def gateway_router(service, route):
@@ -17,11 +22,19 @@ def gateway_router(service, route):
     
     start_time = time.time()
     
+    # Large or chunked bodies are piped through untouched instead of being read into memory
+    stream_body = gateway_service.streaming and has_request_body(request) and (
+        request.content_length is None or request.content_length > PAYLOAD_CAPTURE_LIMIT
+    )
+    
     # Capture request payload
-    try:
-        payload = request.get_json() if request.is_json else None
-    except:
-        payload = None
+    if stream_body:
+        payload = {"note": "Streamed request body not captured"}
+    else:
+        try:
+            payload = request.get_json() if request.is_json else None
+        except:
+            payload = None
     
     # Enhanced tracking with payload information
     tracker = track_incoming_request_with_payload(
@@ -45,29 +58,26 @@ def gateway_router(service, route):
             service=service,
             route=route,
             method=request.method,
-            data=request.get_data(),
+            data=iter_request_body(request.stream) if stream_body else request.get_data(),
             headers=headers
         )
 
-        # Calculate response time
-        response_time_ms = round((time.time() - start_time) * 1000, 2)
-        
-        # Try to extract response data for logging
-        try:
-            response_data = json.loads(response.data) if response.data else None
-        except:
-            response_data = {"note": "Non-JSON response"}
+        status_code = response.status_code
 
-        # Track final response with details
-        track_final_response(
-            tracker=tracker,
-            service="gateway", 
-            status_code=response.status_code,
-            response_data=response_data,
-            response_time_ms=response_time_ms
-        )
+        def on_captured(preview):
+            # Calculate response time - for streamed bodies this is when the last byte went out
+            response_time_ms = round((time.time() - start_time) * 1000, 2)
+            
+            # Track final response with a bounded sample of the body
+            track_final_response(
+                tracker=tracker,
+                service="gateway", 
+                status_code=status_code,
+                response_time_ms=response_time_ms,
+                response_preview=preview
+            )
 
-        return response
+        return response_capture.capture(response, on_captured)
         
     except Exception as e:
         # Calculate response time even for errors
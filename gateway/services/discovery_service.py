@@ -1,62 +1,195 @@
 import logging
 import os
-import docker
+import threading
+from types import MappingProxyType
+
+# Container events that change which services are reachable, or at which address
+WATCHED_EVENTS = ["start", "die"]
+
 
 class DiscoveryService:
-    """Service class for discovering and managing service endpoints"""
-    
-    def __init__(self):
+    """Keeps the gateway's route table in step with the running containers.
+
+    Discovery runs in the background: the route table starts from the
+    SERVICE_* environment variables so the gateway can serve at once, then
+    a reconcile thread resolves the containers through Docker and repeats
+    every `reconcile_interval` seconds, while an event thread refreshes the
+    table as soon as Docker reports a container starting or dying. `start()`
+    waits up to `startup_timeout` seconds for that first resolve, so the
+    gateway does not begin serving from a partial env table. Each
+    refresh builds a new read-only table and swaps it in with a single
+    assignment, so readers never see a half-updated one. The Docker client
+    comes from `client_factory`, which can be replaced with a fake one.
+    """
+
+    def __init__(self, client_factory=None, reconcile_interval=30.0, network_name="microservices_network", retry_interval=5.0,
+                 startup_timeout=5.0):
         self.logger = logging.getLogger(__name__)
-    
+        self.client_factory = client_factory or _docker_client
+        self.reconcile_interval = reconcile_interval
+        self.network_name = network_name
+        self.retry_interval = retry_interval
+        self.startup_timeout = startup_timeout
+
+        self._routes = MappingProxyType(self._get_services_from_env())
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._client = None
+        self._events = None
+        self._stop = threading.Event()
+        self._pid = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            reconcile_interval=float(os.environ.get("DISCOVERY_RECONCILE_INTERVAL", 30)),
+            network_name=os.environ.get("DISCOVERY_NETWORK", "microservices_network"),
+            startup_timeout=float(os.environ.get("DISCOVERY_STARTUP_TIMEOUT", 5)),
+        )
+
+    def start(self):
+        """Start the reconcile and event threads for this process (again after a fork) and wait for the first resolve"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._client = None
+            self._stop = threading.Event()
+            resolved = threading.Event()
+            threading.Thread(
+                target=self._reconcile_loop, args=(self._stop, resolved), name="discovery-reconcile", daemon=True
+            ).start()
+            threading.Thread(target=self._watch_events, args=(self._stop,), name="discovery-events", daemon=True).start()
+        # Bounded, so an unreachable Docker daemon only delays startup and the env routes are used meanwhile
+        if not resolved.wait(self.startup_timeout):
+            self.logger.warning(f"Docker discovery did not answer within {self.startup_timeout}s, serving env routes for now")
+
+    def stop(self):
+        with self._lock:
+            self._stop.set()
+            self._pid = None
+            events, self._events = self._events, None
+        if events is not None:
+            try:
+                events.close()
+            except Exception:
+                pass
+
+    def get_routes(self):
+        """Current read-only {service name: base URL} table"""
+        self.start()
+        return self._routes
+
     def initialize_services(self):
-        """Initialize the services dictionary from Docker or environment variables"""
+        """Resolve the services once, synchronously, and return the route table"""
+        self.refresh()
+        return self._routes
+
+    def refresh(self):
+        """Re-resolve every service through Docker and swap in the new route table.
+
+        If Docker cannot be reached the current table is kept; if it answers
+        but knows no services, the environment variables are used instead.
+        """
+        with self._refresh_lock:
+            try:
+                services = self._discover_services_via_docker(self._get_client())
+            except Exception as e:
+                self.logger.error(f"Docker service discovery failed: {str(e)}")
+                self._reset_client()
+                return self._routes
+
+            if not services:
+                services = self._get_services_from_env()
+            self._swap(services)
+            return self._routes
+
+    # ============ Private Methods ===============
+    def _reconcile_loop(self, stop, resolved):
+        self.refresh()
+        resolved.set()
+        while not stop.wait(self.reconcile_interval):
+            self.refresh()
+
+    def _watch_events(self, stop):
+        """Refresh on every container start/die, reconnecting to the event stream if it drops"""
+        while not stop.is_set():
+            try:
+                events = self._get_client().events(decode=True, filters={"type": "container", "event": WATCHED_EVENTS})
+                with self._lock:
+                    self._events = events
+                for event in events:
+                    if stop.is_set():
+                        break
+                    name = event.get("Actor", {}).get("Attributes", {}).get("com.docker.compose.service", event.get("id", "")[:12])
+                    self.logger.info(f"Container {name} {event.get('status') or event.get('Action')}, refreshing routes")
+                    self.refresh()
+            except Exception as e:
+                if stop.is_set():
+                    break
+                self.logger.warning(f"Docker event stream unavailable: {str(e)}")
+                self._reset_client()
+            # The stream ended or failed; catch up on anything missed before watching again
+            if not stop.wait(self.retry_interval):
+                self.refresh()
+
+    def _get_client(self):
+        with self._lock:
+            client = self._client
+        if client is None:
+            # Connected outside the lock so a slow daemon cannot stall get_routes()
+            client = self.client_factory()
+            with self._lock:
+                if self._client is None:
+                    self._client = client
+                client = self._client
+        return client
+
+    def _reset_client(self):
+        with self._lock:
+            self._client = None
+
+    def _swap(self, services):
+        current = self._routes
+        if dict(current) == services:
+            return
+        added = sorted(set(services) - set(current))
+        removed = sorted(set(current) - set(services))
+        moved = sorted(name for name in set(services) & set(current) if services[name] != current[name])
+        self._routes = MappingProxyType(dict(services))
+        self.logger.info(f"Routes updated: added={added} removed={removed} moved={moved}")
+
+    def _discover_services_via_docker(self, client):
+        """Discover services using Docker API"""
         services = {}
-        # Try Docker discovery first
-        try:
-            services = self._discover_services_via_docker()
-        except Exception as e:
-            self.logger.error(f"Docker service discovery failed: {str(e)}")
-        
-        if not services:
-            services = self._get_services_from_env()        
+
+        containers = client.containers.list()
+
+        for container in containers:
+            # Check if container is part of current Docker Compose project
+            labels = container.labels
+            if 'com.docker.compose.service' in labels:
+                service_name = labels['com.docker.compose.service']
+
+                # Get the container's network IP
+                networks = container.attrs['NetworkSettings']['Networks']
+
+                for network_name, network_info in networks.items():
+                    if self.network_name in network_name:
+                        ip = network_info['IPAddress']
+
+                        # Make the service name simpler - remove "service_" prefix for easier access
+                        simplified_name = service_name
+                        if service_name.startswith('service_'):
+                            simplified_name = service_name[8:]  # Remove "service_" prefix
+
+                        services[simplified_name.lower()] = f'http://{ip}:5000'
+                        # Also add the original name to avoid confusion
+                        services[service_name.lower()] = f'http://{ip}:5000'
+                        break
+
         return services
-    
-    def _discover_services_via_docker(self):
-        """Discover services using Docker API"""
-        try:
-            client = docker.from_env()
-            services = {}
-            
-            containers = client.containers.list()
-            
-            for container in containers:
-                # Check if container is part of current Docker Compose project
-                labels = container.labels
-                if 'com.docker.compose.service' in labels:
-                    service_name = labels['com.docker.compose.service']
-                    
-                    # Get the container's network IP
-                    networks = container.attrs['NetworkSettings']['Networks']
-                    
-                    for network_name, network_info in networks.items():
-                        if 'microservices_network' in network_name:
-                            ip = network_info['IPAddress']
-                            
-                            # Make the service name simpler - remove "service_" prefix for easier access
-                            simplified_name = service_name
-                            if service_name.startswith('service_'):
-                                simplified_name = service_name[8:]  # Remove "service_" prefix
-                            
-                            services[simplified_name.lower()] = f'http://{ip}:5000'
-                            # Also add the original name to avoid confusion
-                            services[service_name.lower()] = f'http://{ip}:5000'
-                            break
-            
-            return services
-            
-        except Exception as e:
-            return {}
-    
+
     def _get_services_from_env(self):
         """Get service URLs from environment variables"""
         services = {}
@@ -64,4 +197,10 @@ class DiscoveryService:
             if key.startswith('SERVICE_'):
                 service_name = key[8:].lower()  # Remove 'SERVICE_' prefix
                 services[service_name] = value
-        return services
\ No newline at end of file
+        return services
+
+
+def _docker_client():
+    """Docker client for the local daemon (imported here so a fake client_factory needs no Docker SDK)"""
+    import docker
+    return docker.from_env()
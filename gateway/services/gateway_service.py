@@ -1,7 +1,10 @@
 import logging
+import os
 import requests
 from flask import Response
 from services.discovery_service import DiscoveryService
+from shared.http_client import get_http_client
+from shared.streaming import strip_hop_by_hop, streamed_response, FRAMING_HEADERS
 
 
 class GatewayService:
@@ -9,59 +12,69 @@ class GatewayService:
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.discovery_service = DiscoveryService()
-        self.services = self.discovery_service.initialize_services()
+        # Routes are resolved in the background and kept current as containers come and go
+        self.discovery_service = DiscoveryService.from_env()
+        self.discovery_service.start()
+        self.streaming = os.environ.get('PROXY_STREAMING', 'true').lower() == 'true'
     
     def get_available_services(self):
         """Get dictionary of available services"""
-        return self.services
+        return self.discovery_service.get_routes()
     
     def route_request(self, service, route, method, data, headers):
         """Route a request to the appropriate service"""
         
+        # One snapshot of the route table for the whole request
+        services = self.discovery_service.get_routes()
+
         # Validate service exists
-        service_name = self._validate_service(service)
+        service_name = self._validate_service(services, service)
         
         # Build service URL
-        service_url = self._build_service_url(service_name, route)
+        service_url = self._build_service_url(services, service_name, route)
         
         # Forward the request
-        return self._forward_request(service_url, method, data, headers)
+        return self._forward_request(service_url, method, data, headers, stream=self.streaming)
     
-    def _validate_service(self, service):
+    def _validate_service(self, services, service):
         """Validate that the requested service exists"""
         service = service.lower()
-        if service not in self.services:
+        if service not in services:
             self.logger.warning(f"Service not found: {service}")
             raise ValueError(f"Service '{service}' not found")
         return service
     
-    def _build_service_url(self, service, route):
+    def _build_service_url(self, services, service, route):
         """Build the complete service URL"""
-        return f"{self.services[service]}/{route}"
+        return f"{services[service]}/{route}"
     
-    def _forward_request(self, service_url, method, data, headers=None):
-        """Forward the request to the target service"""
+    def _forward_request(self, service_url, method, data, headers=None, stream=False):
+        """Forward the request to the target service, piping the response through when streaming"""
         try:
             
-            # Prepare headers
+            # Prepare headers - the body is re-framed by the outgoing request
             if headers is None:
                 headers = {}
+            headers = strip_hop_by_hop(headers, extra=['host', *FRAMING_HEADERS])
             
             # Make the request
-            resp = requests.request(
+            resp = get_http_client().request(
                 method=method,
                 url=service_url,
                 headers=headers,
                 data=data,
-                timeout=30
+                timeout=30,
+                stream=stream
             )
             
-            # Create Flask response
+            if stream:
+                return streamed_response(resp)
+            
+            # Create Flask response - content is already decoded by requests
             response = Response(
                 resp.content,
                 status=resp.status_code,
-                headers=dict(resp.headers)
+                headers=strip_hop_by_hop(resp.headers, extra=['content-encoding', *FRAMING_HEADERS])
             )
             
             return response
@@ -0,0 +1,100 @@
+import logging
+import os
+
+
+class ResponseCapture:
+    """Samples a bounded prefix of proxied response bodies for the request log.
+
+    Only the first `max_bytes` of a body are ever looked at, so capture cost
+    does not grow with payload size. Streamed bodies are sampled as they pass
+    through to the client and reported once the stream ends. Binary and
+    content-encoded bodies are described instead of sampled, and bodies
+    larger than `max_body_bytes` (when set) are skipped entirely.
+    """
+
+    TEXT_TYPES = ("application/json", "text/", "application/xml", "application/x-www-form-urlencoded", "+json", "+xml")
+
+    def __init__(self, enabled=True, max_bytes=1000, max_body_bytes=0):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.max_body_bytes = max_body_bytes
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            enabled=os.environ.get('RESPONSE_CAPTURE', 'true').lower() == 'true',
+            max_bytes=int(os.environ.get('RESPONSE_CAPTURE_BYTES', 1000)),
+            max_body_bytes=int(os.environ.get('RESPONSE_CAPTURE_MAX_BODY', 0))
+        )
+
+    def capture(self, response, on_complete):
+        """Call on_complete(preview) with a bounded description of the response body.
+
+        For buffered responses this happens immediately; for streamed ones
+        the body iterator is wrapped and on_complete runs when it is exhausted
+        or closed. Returns the response to send to the client.
+        """
+        if not self.enabled:
+            on_complete(None)
+            return response
+
+        skip_reason = self._skip_reason(response)
+        if skip_reason:
+            on_complete(skip_reason)
+            return response
+
+        if not response.is_streamed:
+            body = response.get_data()
+            on_complete(self._preview(body[:self.max_bytes], len(body)))
+            return response
+
+        response.response = self._tee(response.response, on_complete)
+        return response
+
+    # ============ Private Methods ===============
+    def _skip_reason(self, response):
+        """Describe the body instead of sampling it, or return None to sample"""
+        content_type = (response.headers.get('Content-Type') or '').lower()
+        content_encoding = response.headers.get('Content-Encoding')
+        content_length = response.headers.get('Content-Length')
+
+        if content_encoding and content_encoding.lower() != 'identity':
+            return f"[{content_encoding}-encoded body not captured]"
+        if content_type and not any(text_type in content_type for text_type in self.TEXT_TYPES):
+            return f"[binary body not captured: {content_type}]"
+        if self.max_body_bytes and content_length and int(content_length) > self.max_body_bytes:
+            return f"[body of {content_length} bytes not captured]"
+        return None
+
+    def _tee(self, chunks, on_complete):
+        """Pass chunks through unchanged while keeping the first max_bytes"""
+        prefix = bytearray()
+        total = 0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                total += len(chunk)
+                if len(prefix) < self.max_bytes:
+                    prefix.extend(chunk[:self.max_bytes - len(prefix)])
+                yield chunk
+        finally:
+            try:
+                if self.max_body_bytes and total > self.max_body_bytes:
+                    on_complete(f"[body of {total} bytes not captured]")
+                else:
+                    on_complete(self._preview(bytes(prefix), total))
+            except Exception as e:
+                self.logger.error(f"Failed to record streamed response: {str(e)}")
+            close = getattr(chunks, 'close', None)
+            if close:
+                close()
+
+    def _preview(self, prefix, total):
+        if not total:
+            return None
+        text = prefix.decode('utf-8', errors='replace')
+        if total > len(prefix):
+            text += f"... [truncated, {total} bytes]"
+        return text
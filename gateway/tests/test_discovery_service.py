@@ -0,0 +1,185 @@
+"""DiscoveryService against a fake Docker client with an in-memory event stream (no daemon needed)"""
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from services.discovery_service import DiscoveryService
+
+
+class FakeContainer:
+    def __init__(self, service, ip, network="project_microservices_network"):
+        self.labels = {"com.docker.compose.service": service}
+        self.attrs = {"NetworkSettings": {"Networks": {network: {"IPAddress": ip}}}}
+
+
+class FakeEventStream:
+    """Blocks like Docker's event stream until an event is pushed or it is closed"""
+
+    def __init__(self):
+        self._events = queue.Queue()
+
+    def push(self, action, service):
+        self._events.put({
+            "Type": "container",
+            "Action": action,
+            "Actor": {"Attributes": {"com.docker.compose.service": service}},
+        })
+
+    def close(self):
+        self._events.put(None)
+
+    def __iter__(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            yield event
+
+
+class FakeContainers:
+    def __init__(self, client):
+        self._client = client
+
+    def list(self):
+        if self._client.fail:
+            raise ConnectionError("Docker daemon unreachable")
+        return list(self._client.running)
+
+
+class FakeDockerClient:
+    def __init__(self, running):
+        self.running = running
+        self.fail = False
+        self.stream = FakeEventStream()
+        self.containers = FakeContainers(self)
+
+    def events(self, decode=True, filters=None):
+        return self.stream
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def make_service(client, reconcile_interval=60.0):
+    return DiscoveryService(
+        client_factory=lambda: client, reconcile_interval=reconcile_interval, retry_interval=0.05
+    )
+
+
+def test_initial_resolve_replaces_env_routes(monkeypatch):
+    monkeypatch.setenv("SERVICE_CONTACTS", "http://env-contacts:5000")
+    client = FakeDockerClient([FakeContainer("service_contacts", "10.0.0.2")])
+    discovery = make_service(client)
+    try:
+        # Serves from the environment before Docker has answered
+        assert discovery._routes["contacts"] == "http://env-contacts:5000"
+
+        discovery.start()
+        assert wait_for(lambda: discovery.get_routes().get("contacts") == "http://10.0.0.2:5000")
+        assert discovery.get_routes()["service_contacts"] == "http://10.0.0.2:5000"
+    finally:
+        discovery.stop()
+
+
+def test_start_waits_for_the_first_resolve():
+    client = FakeDockerClient([FakeContainer("service_connect", "10.0.0.3")])
+    discovery = make_service(client)
+    try:
+        discovery.start()
+        # No polling: the Docker routes are in place as soon as start() returns
+        assert discovery.get_routes()["connect"] == "http://10.0.0.3:5000"
+    finally:
+        discovery.stop()
+
+
+def test_start_gives_up_waiting_when_docker_hangs():
+    hung = threading.Event()
+
+    def factory():
+        hung.wait(5)
+        raise ConnectionError("Docker daemon unreachable")
+
+    discovery = DiscoveryService(client_factory=factory, retry_interval=0.05, startup_timeout=0.1)
+    try:
+        started = time.monotonic()
+        discovery.start()
+        assert time.monotonic() - started < 1.0
+    finally:
+        hung.set()
+        discovery.stop()
+
+
+def test_start_and_die_events_swap_the_route_table():
+    client = FakeDockerClient([FakeContainer("service_contacts", "10.0.0.2")])
+    discovery = make_service(client)
+    try:
+        discovery.start()
+        assert wait_for(lambda: "contacts" in discovery.get_routes())
+        before = discovery.get_routes()
+
+        client.running = [FakeContainer("service_contacts", "10.0.0.9"), FakeContainer("service_connect", "10.0.0.3")]
+        client.stream.push("start", "service_connect")
+        assert wait_for(lambda: discovery.get_routes().get("connect") == "http://10.0.0.3:5000")
+        assert discovery.get_routes()["contacts"] == "http://10.0.0.9:5000"
+
+        # Readers holding the old table keep a consistent, unchanged snapshot
+        assert before["contacts"] == "http://10.0.0.2:5000"
+        assert "connect" not in before
+
+        client.running = [FakeContainer("service_contacts", "10.0.0.9")]
+        client.stream.push("die", "service_connect")
+        assert wait_for(lambda: "connect" not in discovery.get_routes())
+    finally:
+        discovery.stop()
+
+
+def test_periodic_reconcile_picks_up_changes_without_events():
+    client = FakeDockerClient([FakeContainer("service_contacts", "10.0.0.2")])
+    discovery = make_service(client, reconcile_interval=0.05)
+    try:
+        discovery.start()
+        assert wait_for(lambda: discovery.get_routes().get("contacts") == "http://10.0.0.2:5000")
+
+        client.running = [FakeContainer("service_contacts", "10.0.0.7")]
+        assert wait_for(lambda: discovery.get_routes().get("contacts") == "http://10.0.0.7:5000")
+    finally:
+        discovery.stop()
+
+
+def test_keeps_current_routes_when_docker_fails():
+    client = FakeDockerClient([FakeContainer("service_contacts", "10.0.0.2")])
+    discovery = make_service(client)
+    try:
+        discovery.start()
+        assert wait_for(lambda: discovery.get_routes().get("contacts") == "http://10.0.0.2:5000")
+        routes = discovery.get_routes()
+
+        client.fail = True
+        assert discovery.refresh() is routes
+        assert discovery.get_routes() is routes
+    finally:
+        discovery.stop()
+
+
+def test_route_table_is_read_only():
+    discovery = make_service(FakeDockerClient([FakeContainer("service_contacts", "10.0.0.2")]))
+    try:
+        discovery.initialize_services()
+        try:
+            discovery._routes["contacts"] = "http://elsewhere:5000"
+        except TypeError:
+            pass
+        else:
+            raise AssertionError("route table should be immutable")
+    finally:
+        discovery.stop()
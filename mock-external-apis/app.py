@@ -1,5 +1,8 @@
 from flask import Flask, request, jsonify
 import logging
+import os
+import random
+from datetime import datetime, timezone
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -48,7 +51,8 @@ projects = [
         'status': 'in_progress',
         'start_date': '2023-01-15',
         'end_date': '2023-06-30',
-        'budget': 50000
+        'budget': 50000,
+        'updated_at': '2023-04-18T10:00:00Z'
     },
     {
         'id': 'proj_2', 
@@ -57,7 +61,8 @@ projects = [
         'status': 'planning',
         'start_date': '2023-03-01',
         'end_date': '2023-12-31',
-        'budget': 120000
+        'budget': 120000,
+        'updated_at': '2023-04-12T16:30:00Z'
     },
     {
         'id': 'proj_3',
@@ -66,29 +71,188 @@ projects = [
         'status': 'completed',
         'start_date': '2022-09-01',
         'end_date': '2023-02-28',
-        'budget': 75000
+        'budget': 75000,
+        'updated_at': '2023-03-01T09:00:00Z'
     }
 ]
 
 
+# Synthetic records appended after the fixed ones, for large-tenant testing
+MOCK_CONTACT_COUNT = int(os.environ.get('MOCK_CONTACT_COUNT', 0))
+MOCK_PROJECT_COUNT = int(os.environ.get('MOCK_PROJECT_COUNT', 0))
+MAX_PAGE_SIZE = 1000
+
+
+def synthetic_contact(index):
+    """Deterministic fake contact, generated on demand so huge datasets cost no memory"""
+    number = index + 1
+    return {
+        'id': f'syn_{number}',
+        'first_name': f'first{number}',
+        'last_name': f'last{number}',
+        'email': f'contact{number}@example.com',
+        'phone': f'+1{number:010d}',
+        'company': f'Company {number % 1000}',
+        'created_at': '2023-01-01T00:00:00Z',
+        'updated_at': '2023-04-20T14:15:00Z'
+    }
+
+
+# id -> updated_at for records "modified" through /mock/touch, applied over the datasets above
+touched = {}
+
+
+def now_iso():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def contact_at(index):
+    contact = contacts[index] if index < len(contacts) else synthetic_contact(index - len(contacts))
+    if contact['id'] in touched:
+        contact = dict(contact, updated_at=touched[contact['id']])
+    return contact
+
+
+def project_at(index):
+    project = projects[index] if index < len(projects) else synthetic_project(index - len(projects))
+    if project['id'] in touched:
+        project = dict(project, updated_at=touched[project['id']])
+    return project
+
+
+def record_slice(record_at, total, offset, limit, updated_since=None):
+    """Up to `limit` records from index `offset` on, skipping ones not updated since `updated_since`.
+
+    Returns (records, next_offset), next_offset being None at the end.
+    """
+    results = []
+    index = offset
+    while index < total and len(results) < limit:
+        record = record_at(index)
+        index += 1
+        if updated_since and (record.get('updated_at') or '') < updated_since:
+            continue
+        results.append(record)
+    return results, (index if index < total else None)
+
+
+def get_contact_slice(offset, limit, updated_since=None):
+    """Contacts from offset across the fixed and synthetic datasets"""
+    return record_slice(contact_at, len(contacts) + MOCK_CONTACT_COUNT, offset, limit, updated_since)
+
+
+def synthetic_project(index):
+    """Deterministic fake project, generated on demand like synthetic_contact"""
+    number = index + 1
+    return {
+        'id': f'syn_proj_{number}',
+        'name': f'Project {number}',
+        'description': f'Synthetic project {number}',
+        'status': ('planning', 'in_progress', 'completed')[number % 3],
+        'start_date': '2023-01-01',
+        'end_date': '2023-12-31',
+        'budget': 1000 * (number % 500 + 1),
+        'updated_at': '2023-04-20T14:15:00Z'
+    }
+
+
+def get_project_slice(offset, limit, updated_since=None):
+    """Projects from offset across the fixed and synthetic datasets"""
+    return record_slice(project_at, len(projects) + MOCK_PROJECT_COUNT, offset, limit, updated_since)
+
+
+def paginated_response(get_slice):
+    """HubSpot-style cursor paging: ?limit=N&after=<cursor> -> {results, paging.next.after}.
+
+    ?updated_since=<ISO timestamp> keeps only records with updated_at at or after it.
+    Pages carry an ETag and answer If-None-Match with 304, like Oggo does.
+    """
+    limit = min(int(request.args.get('limit', 100)), MAX_PAGE_SIZE)
+    offset = int(request.args.get('after', 0))
+    results, next_offset = get_slice(offset, limit, request.args.get('updated_since'))
+    body = {'results': results}
+    if next_offset is not None:
+        body['paging'] = {'next': {'after': str(next_offset)}}
+    response = jsonify(body)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
 # Contacts endpoints
 @app.route('/contacts', methods=['GET'])
 def get_contacts():
-    """Get all contacts"""
+    """Get contacts - paginated when ?limit is given, otherwise all of them"""
     logger.info('Oggo API: GET /contacts')
-    return jsonify(contacts)
+    if 'limit' in request.args:
+        return paginated_response(get_contact_slice)
+    total = len(contacts) + MOCK_CONTACT_COUNT
+    return jsonify(get_contact_slice(0, total, request.args.get('updated_since'))[0])
 
 
 
 # Projects endpoints
 @app.route('/projects', methods=['GET'])
 def get_projects():
-    """Get all projects"""
+    """Get projects - paginated when ?limit is given, otherwise all of them"""
     logger.info('Oggo API: GET /projects')
-    return jsonify(projects)
+    if 'limit' in request.args:
+        return paginated_response(get_project_slice)
+    total = len(projects) + MOCK_PROJECT_COUNT
+    return jsonify(get_project_slice(0, total, request.args.get('updated_since'))[0])
+
+
+@app.route('/mock/touch', methods=['POST'])
+def touch_records():
+    """Mark records as just updated, to measure delta syncs.
+
+    Body: {"entity": "contacts"|"projects", "ids": [...]} or {"entity": ..., "count": N}
+    to touch the first N records.
+    """
+    body = request.json or {}
+    entity = body.get('entity', 'contacts')
+    if entity == 'contacts':
+        record_at, total = contact_at, len(contacts) + MOCK_CONTACT_COUNT
+    elif entity == 'projects':
+        record_at, total = project_at, len(projects) + MOCK_PROJECT_COUNT
+    else:
+        return jsonify({'error': f'Unknown entity: {entity}'}), 400
+
+    ids = body.get('ids') or [record_at(i)['id'] for i in range(min(int(body.get('count', 0)), total))]
+    timestamp = now_iso()
+    for record_id in ids:
+        touched[record_id] = timestamp
+    return jsonify({'entity': entity, 'touched': len(ids), 'updated_at': timestamp})
 
 
 # ===== HUBSPOT API ROUTES =====
+# HubSpot batch endpoints accept at most this many inputs per call
+HUBSPOT_BATCH_LIMIT = 100
+# Fraction of batch calls answered with 429, and the Retry-After sent with them
+MOCK_HUBSPOT_429_RATE = float(os.environ.get('MOCK_HUBSPOT_429_RATE', 0))
+MOCK_HUBSPOT_RETRY_AFTER = os.environ.get('MOCK_HUBSPOT_RETRY_AFTER', '1')
+
+
+def check_hubspot_batch(inputs):
+    """Return an error response when HubSpot would reject the batch call, else None"""
+    if MOCK_HUBSPOT_429_RATE and random.random() < MOCK_HUBSPOT_429_RATE:
+        response = jsonify({
+            'status': 'error',
+            'category': 'RATE_LIMITS',
+            'message': 'You have reached your secondly limit.'
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = MOCK_HUBSPOT_RETRY_AFTER
+        return response
+    if len(inputs) > HUBSPOT_BATCH_LIMIT:
+        response = jsonify({
+            'status': 'error',
+            'category': 'VALIDATION_ERROR',
+            'message': f'Batch input limit exceeded: {len(inputs)} inputs, maximum is {HUBSPOT_BATCH_LIMIT}'
+        })
+        response.status_code = 400
+        return response
+    return None
+
 # Contacts (HubSpot format)
 @app.route('/crm/v3/objects/contacts/batch/create', methods=['POST'])
 def create_hubspot_contacts():
@@ -96,6 +260,9 @@ def create_hubspot_contacts():
     try:
         # Get the input data
         inputs = request.json.get('inputs', [])
+        rejection = check_hubspot_batch(inputs)
+        if rejection:
+            return rejection
         results = []
 
         # Process each contact
@@ -125,6 +292,9 @@ def create_hubspot_deals():
     try:
         # Get the input data
         inputs = request.json.get('inputs', [])
+        rejection = check_hubspot_batch(inputs)
+        if rejection:
+            return rejection
         results = []
 
         for i, deal_data in enumerate(inputs):
@@ -145,5 +315,51 @@ def create_hubspot_deals():
         logger.error(f"Error in HubSpot deals mock: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Upserted objects: object type -> {id property value -> stored object}
+upserted_objects = {'contacts': {}, 'deals': {}}
+
+
+@app.route('/crm/v3/objects/<object_type>/batch/upsert', methods=['POST'])
+def upsert_hubspot_objects(object_type):
+    """Create or update contacts/deals keyed by a unique id property"""
+    logger.info(f'HubSpot API: POST /crm/v3/objects/{object_type}/batch/upsert')
+    if object_type not in upserted_objects:
+        return jsonify({'status': 'error', 'message': f'Unknown object type: {object_type}'}), 404
+
+    try:
+        inputs = request.json.get('inputs', [])
+        rejection = check_hubspot_batch(inputs)
+        if rejection:
+            return rejection
+
+        store = upserted_objects[object_type]
+        timestamp = now_iso()
+        results = []
+        for item in inputs:
+            key = str(item.get('id'))
+            existing = store.get(key)
+            if existing:
+                existing['properties'].update(item.get('properties', {}))
+                existing['updatedAt'] = timestamp
+                results.append(dict(existing, new=False))
+            else:
+                prefix = '1000' if object_type == 'contacts' else '2000'
+                created = {
+                    'id': f"{prefix}{len(store)}",
+                    'properties': dict(item.get('properties', {}), **{item.get('idProperty', 'id'): key}),
+                    'createdAt': timestamp,
+                    'updatedAt': timestamp
+                }
+                store[key] = created
+                results.append(dict(created, new=True))
+        return jsonify({
+            'results': results,
+            'status': 'COMPLETE'
+        })
+
+    except Exception as e:
+        logger.error(f"Error in HubSpot upsert mock: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
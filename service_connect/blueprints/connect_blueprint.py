@@ -2,6 +2,8 @@ print("🚨🚨🚨 CONNECT BLUEPRINT LOADED - THIS SHOULD APPEAR IN LOGS! 🚨
 
 from flask import Blueprint, request, jsonify
 import logging
+from shared.streaming import has_request_body, iter_request_body
+from services.rate_limiter import RateLimitExceeded
 
 print("🚨 About to import ConnectService...")
 try:
@@ -30,37 +32,55 @@ def test_route():
     print("🚨 TEST ROUTE CALLED!")
     return "Test successful"
 
+@connect_bp.route('/limits', methods=['GET'])
+def get_limits():
+    """Rate limiter state per target"""
+    return jsonify(connect_service.get_limiter_stats())
+
+@connect_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Response cache counters"""
+    return jsonify(connect_service.get_cache_stats())
+
+@connect_bp.route('/coalescing/stats', methods=['GET'])
+def get_coalescing_stats():
+    """Single-flight counters for upstream GETs"""
+    return jsonify(connect_service.get_coalescing_stats())
+
+@connect_bp.route('/cache/clear', methods=['POST'])
+def clear_cache():
+    """Drop every cached response"""
+    connect_service.clear_cache()
+    return jsonify({"status": "success", "message": "Response cache cleared"})
+
 @connect_bp.route('/proxy/<target>/<path:endpoint>', methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH'])
 def proxy_request(target, endpoint):
-    print(f"🚨 PROXY ROUTE CALLED! target={target}, endpoint={endpoint}")
-    return "Proxy function called"  # Simple return first
-
-# @connect_bp.route('/proxy/<target>/<path:endpoint>', methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH'])
-# def proxy_request(target, endpoint):
-#     """
-#     Proxy requests to external services
-#     """
-#     print(f"🚨 BLUEPRINT: Function called with target={target}, endpoint={endpoint}")
-#     print(f"🚨 BLUEPRINT: Request method={request.method}")
-#     print(f"🚨 BLUEPRINT: Request path={request.path}")
-    
-#     try:
-#         print(f"🚨 BLUEPRINT: About to call connect_service.proxy_request")
+    """
+    Proxy requests to external services
+    """
+    try:
+        # Bodies are forwarded chunk by chunk when streaming instead of read into memory
+        if connect_service.streaming and has_request_body(request):
+            data = iter_request_body(request.stream)
+        else:
+            data = request.get_data()
         
-#         response = connect_service.proxy_request(
-#             target=target,
-#             endpoint=endpoint,
-#             method=request.method,
-#             headers=dict(request.headers),
-#             data=request.get_data(),
-#             params=dict(request.args)
-#         )
+        response = connect_service.proxy_request(
+            target=target,
+            endpoint=endpoint,
+            method=request.method,
+            headers=dict(request.headers),
+            data=data,
+            params=dict(request.args)
+        )
         
-#         print(f"🚨 BLUEPRINT: Got response, returning it")
-#         return response
+        return response
         
-#     except Exception as e:        
-#         print(f"🚨 BLUEPRINT: Exception occurred: {str(e)}")
-#         import traceback
-#         traceback.print_exc()
-#         return jsonify({"error": f"Proxy error: {str(e)}"}), 500
\ No newline at end of file
+    except RateLimitExceeded as e:
+        logger.warning(str(e))
+        return jsonify({"error": str(e)}), 429, {"Retry-After": e.retry_after_header()}
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:        
+        logger.error(f"Proxy error: {str(e)}")
+        return jsonify({"error": f"Proxy error: {str(e)}"}), 500
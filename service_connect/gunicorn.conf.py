@@ -0,0 +1,13 @@
+# gunicorn.conf.py - production serving profile for service_connect; the common settings are in shared/gunicorn_profile.py
+import os
+import sys
+
+# gunicorn reads this file before the app directory is on sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from shared.gunicorn_profile import profile  # noqa: E402
+
+# The per-target rate limits, in-flight caps and response cache live in this process;
+# a second worker would get its own buckets and double what Oggo and HubSpot actually
+# receive, so there must be exactly one worker. Concurrency comes from threads (or gevent),
+# with enough of them to fill every target's in-flight slots at once
+globals().update(profile(single_worker=True, threads=32))
@@ -3,6 +3,11 @@ import os
 import requests
 from flask import Response
 from shared.debugger_client import FlowTracker, track_api_call, track_response
+from shared.http_client import get_http_client
+from shared.streaming import strip_hop_by_hop, streamed_response, iter_upstream_body, FRAMING_HEADERS
+from services.rate_limiter import TargetLimiter
+from services.response_cache import ResponseCache
+from services.single_flight import SingleFlight, NotShared
 
 
 class ConnectService:
@@ -11,6 +16,23 @@ class ConnectService:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.targets = self._load_target_configurations()
+        self.limiters = {
+            name: TargetLimiter(
+                name,
+                rate=config["rate_limit"],
+                burst=config["burst"],
+                max_in_flight=config["max_in_flight"],
+                max_wait=config["max_wait"],
+            )
+            for name, config in self.targets.items()
+        }
+        self.response_cache = ResponseCache.from_env()
+        self.single_flight = SingleFlight()
+        # Largest streamed GET body the leader keeps a copy of for requests that joined it
+        self.coalesce_max_bytes = int(os.environ.get('CONNECT_COALESCE_MAX_BYTES', 8 * 1024 * 1024))
+        # Longest a joined request waits for the leader before making its own call (the upstream read timeout)
+        self.coalesce_wait = float(os.environ.get('CONNECT_COALESCE_WAIT', 30))
+        self.streaming = os.environ.get('PROXY_STREAMING', 'true').lower() == 'true'
 
     def _load_target_configurations(self):
         """Load target configurations from environment variables"""
@@ -19,14 +41,38 @@ class ConnectService:
                 "base_url": os.environ.get("OGGO_BASE_URL"),
                 "auth_type": "bearer",
                 "auth_key": os.environ.get("OGGO_API_KEY"),
+                # Requests per second, bucket size, concurrent requests and seconds a request may queue
+                "rate_limit": float(os.environ.get("OGGO_RATE_LIMIT", 20)),
+                "burst": float(os.environ.get("OGGO_BURST", 40)),
+                "max_in_flight": int(os.environ.get("OGGO_MAX_IN_FLIGHT", 16)),
+                "max_wait": float(os.environ.get("OGGO_MAX_WAIT", 10)),
             },
             "hubspot": {
                 "base_url": os.environ.get("HUBSPOT_BASE_URL"),
                 "auth_type": "bearer", 
                 "auth_key": os.environ.get("HUBSPOT_API_KEY"),
+                "rate_limit": float(os.environ.get("HUBSPOT_RATE_LIMIT", 10)),
+                "burst": float(os.environ.get("HUBSPOT_BURST", 10)),
+                "max_in_flight": int(os.environ.get("HUBSPOT_MAX_IN_FLIGHT", 8)),
+                "max_wait": float(os.environ.get("HUBSPOT_MAX_WAIT", 10)),
             }
         }
 
+    def get_cache_stats(self):
+        """Response cache hit, miss and eviction counters"""
+        return self.response_cache.get_stats()
+
+    def get_coalescing_stats(self):
+        """How many upstream GETs were shared by concurrent identical requests"""
+        return self.single_flight.get_stats()
+
+    def clear_cache(self):
+        self.response_cache.clear()
+
+    def get_limiter_stats(self):
+        """Current tokens, queue depth and admission wait times per target"""
+        return {name: limiter.get_stats() for name, limiter in self.limiters.items()}
+
     def proxy_request(self, target, endpoint, method, headers, data, params=None):
         """Enhanced proxy request with extensive debugging"""
 
@@ -62,7 +108,13 @@ class ConnectService:
             track_api_call(tracker, "service_connect", f"external_{target}", "api_call")
         
         print(f"🔍 CONNECT DEBUG: API call tracked, now making actual request")
-        response = self._execute_proxy_request(method, target_url, prepared_headers, data, params)
+        cache_ttl = self._cache_ttl(target, endpoint, method, headers)
+        if cache_ttl:
+            response = self._cached_proxy_request(target, endpoint, target_url, prepared_headers, params, cache_ttl)
+        elif method == 'GET':
+            response = self._coalesced_get(target, endpoint, target_url, prepared_headers, params)
+        else:
+            response = self._direct_proxy_request(target, method, target_url, prepared_headers, data, params)
         print(f"🔍 CONNECT DEBUG: Got response from external service")
 
         # Track response from external service
@@ -102,32 +154,187 @@ class ConnectService:
 
     def _prepare_headers(self, target, original_headers):
         """Prepare headers for the proxied request, including authentication"""
-        headers = {
-            key: value for key, value in original_headers.items() 
-            if key.lower() not in ['host', 'content-length']
-        }        
+        # The outgoing request sets its own Host and body framing
+        headers = strip_hop_by_hop(original_headers, extra=['host', *FRAMING_HEADERS])
         return headers
 
-    def _execute_proxy_request(self, method, url, headers, data, params=None):
+    def _execute_proxy_request(self, method, url, headers, data, params=None, stream=False):
         """Execute the proxy request and handle errors"""
         try:
-            response = requests.request(
+            response = get_http_client().request(
                 method=method,
                 url=url,
                 headers=headers,
                 data=data,
                 params=params,
-                timeout=30
+                timeout=30,
+                stream=stream
             )
+            
+            # Pipe the body through chunk by chunk with bounded memory
+            if stream:
+                return streamed_response(response)
              
-            # Create Flask response that preserves original response
+            # Create Flask response that preserves original response (content is already decoded)
             flask_response = Response(
                 response.content,
                 status=response.status_code,
-                headers=dict(response.headers)
+                headers=strip_hop_by_hop(response.headers, extra=['content-encoding', *FRAMING_HEADERS])
             )
             return flask_response
         except (requests.Timeout, requests.ConnectionError, requests.RequestException) as e:
             raise Exception(f"Request error: {str(e)}")
         except Exception as e:
-            raise Exception(f"Proxy error: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Proxy error: {str(e)}")
+
+    def _cache_ttl(self, target, endpoint, method, headers):
+        """TTL to cache this request under, or 0 if it must go upstream uncached"""
+        if method != 'GET':
+            return 0
+        ttl = self.response_cache.ttl_for(target, endpoint)
+        if not ttl:
+            return 0
+        # Callers asking for fresh data, or doing their own revalidation, bypass the cache
+        lowered = {name.lower(): value for name, value in headers.items()}
+        if 'no-cache' in lowered.get('cache-control', '').lower() or 'if-none-match' in lowered or 'if-modified-since' in lowered:
+            self.response_cache.count_bypass()
+            return 0
+        return ttl
+
+    def _cached_proxy_request(self, target, endpoint, url, headers, params, ttl):
+        """Serve a GET from the response cache, revalidating or refetching it upstream once stale"""
+        key = self.response_cache.key_for(target, endpoint, params, headers)
+        entry = self.response_cache.get(key)
+        if entry is not None and entry.is_fresh():
+            return self._build_buffered_response(entry.status, entry.headers, entry.body, cache_state="HIT")
+
+        # Concurrent misses for the same entry share one upstream call
+        (status, response_headers, body, cache_state), shared = self.single_flight.do(
+            ("cache",) + key, lambda: self._refresh_cache_entry(target, key, entry, url, headers, params, ttl)
+        )
+        return self._build_buffered_response(status, response_headers, body, shared=shared, cache_state=cache_state)
+
+    def _refresh_cache_entry(self, target, key, entry, url, headers, params, ttl):
+        """Fetch a missing entry, or revalidate a stale one with a conditional GET"""
+        request_headers = dict(headers)
+        if entry is not None:
+            request_headers.update(entry.conditional_headers())
+
+        status, response_headers, body = self._fetch_buffered(target, url, request_headers, params)
+        if status == 304 and entry is not None:
+            self.response_cache.revalidated(key, entry)
+            return entry.status, entry.headers, entry.body, "REVALIDATED"
+
+        self.response_cache.store(key, status, response_headers, body, ttl)
+        return status, response_headers, body, "MISS"
+
+    def _direct_proxy_request(self, target, method, url, headers, data, params):
+        """Forward one request on its own, streaming the body through when streaming is on"""
+        # Wait for the target's rate limit; raises RateLimitExceeded once its deadline passes
+        permit = self.limiters[target].acquire()
+        try:
+            response = self._execute_proxy_request(method, url, headers, data, params, stream=self.streaming)
+        except Exception:
+            permit.release()
+            raise
+        # A streamed body keeps the upstream request in flight until it has been sent on
+        response.call_on_close(permit.release)
+        return response
+
+    def _coalesced_get(self, target, endpoint, url, headers, params):
+        """GET whose upstream call is shared by identical requests already in flight.
+
+        Requests that join a call get the leader's status, headers and body
+        once it completes. With streaming on the leader still pipes the body
+        to its own client, keeping a copy of up to `coalesce_max_bytes` for
+        the others; if the body outgrows that, the stream is cut short or
+        the leader takes longer than `coalesce_wait`, the requests that
+        joined make their own call instead.
+        """
+        key = ("get",) + self.response_cache.key_for(target, endpoint, params, headers)
+        call, leader = self.single_flight.begin(key)
+        if not leader:
+            try:
+                status, response_headers, body = self.single_flight.wait(call, timeout=self.coalesce_wait)
+            except NotShared:
+                return self._direct_proxy_request(target, 'GET', url, headers, None, params)
+            return self._build_buffered_response(status, response_headers, body, shared=True)
+
+        if self.streaming:
+            return self._stream_shared_get(key, call, target, url, headers, params)
+
+        try:
+            result = self._fetch_buffered(target, url, headers, params)
+        except Exception as e:
+            self.single_flight.finish(key, call, error=e)
+            raise
+        self.single_flight.finish(key, call, result=result)
+        status, response_headers, body = result
+        return self._build_buffered_response(status, response_headers, body, shared=call.waiters > 0)
+
+    def _stream_shared_get(self, key, call, target, url, headers, params):
+        """Leader of a coalesced GET: stream the body to its client while keeping a copy for the waiters"""
+        try:
+            permit = self.limiters[target].acquire()
+        except Exception as e:
+            self.single_flight.finish(key, call, error=e)
+            raise
+        try:
+            upstream = get_http_client().request(method='GET', url=url, headers=headers, params=params, timeout=30, stream=True)
+        except Exception as e:
+            permit.release()
+            error = Exception(f"Request error: {str(e)}") if isinstance(e, requests.RequestException) else e
+            self.single_flight.finish(key, call, error=error)
+            raise error
+
+        status = upstream.status_code
+        # Raw bytes are passed through undecoded, so Content-Encoding is kept
+        response_headers = list(strip_hop_by_hop(upstream.headers, extra=FRAMING_HEADERS).items())
+
+        def body():
+            copy = []
+            size = 0
+            complete = False
+            try:
+                for chunk in iter_upstream_body(upstream):
+                    if copy is not None:
+                        size += len(chunk)
+                        if size <= self.coalesce_max_bytes:
+                            copy.append(chunk)
+                        else:
+                            copy = None
+                    yield chunk
+                complete = True
+            finally:
+                if complete and copy is not None:
+                    self.single_flight.finish(key, call, result=(status, response_headers, b"".join(copy)))
+                else:
+                    self.single_flight.finish(key, call, error=NotShared("Streamed body was too large or cut short"))
+
+        response = Response(body(), status=status, headers=response_headers)
+        response.call_on_close(upstream.close)
+        response.call_on_close(permit.release)
+        # Never leave waiters hanging if the body is not read to the end (this is a no-op once finished)
+        response.call_on_close(lambda: self.single_flight.finish(key, call, error=NotShared("Leader response closed early")))
+        return response
+
+    def _fetch_buffered(self, target, url, headers, params):
+        """GET the whole upstream body, returning (status, headers, body) so it can be shared or stored"""
+        permit = self.limiters[target].acquire()
+        try:
+            upstream = get_http_client().request(method='GET', url=url, headers=headers, params=params, timeout=30)
+            body = upstream.content
+        except requests.RequestException as e:
+            raise Exception(f"Request error: {str(e)}")
+        finally:
+            permit.release()
+        response_headers = list(strip_hop_by_hop(upstream.headers, extra=['content-encoding', *FRAMING_HEADERS]).items())
+        return upstream.status_code, response_headers, body
+
+    def _build_buffered_response(self, status, headers, body, shared=False, cache_state=None):
+        response = Response(body, status=status, headers=headers)
+        if cache_state:
+            response.headers['X-Cache'] = cache_state
+        if shared:
+            response.headers['X-Coalesced'] = 'true'
+        return response
@@ -0,0 +1,160 @@
+import math
+import threading
+import time
+
+# Upper bounds (ms) of the admission wait-time histogram buckets; the last bucket is open-ended
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request cannot be admitted to a target before its deadline"""
+
+    def __init__(self, target, reason, retry_after):
+        super().__init__(f"Rate limit for target '{target}' exceeded: {reason}")
+        self.target = target
+        self.retry_after = retry_after
+
+    def retry_after_header(self):
+        """Retry-After value in whole seconds, at least 1"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TargetLimiter:
+    """Admission control for one external target: a token bucket plus a cap on requests in flight.
+
+    `rate` tokens per second refill a bucket holding at most `burst`; each
+    request takes one token and one in-flight slot. A request that finds
+    neither waits for them, but never beyond `max_wait` seconds - if the
+    slot does not free up or the next token cannot arrive in time it is
+    shed with RateLimitExceeded instead. A rate or max_in_flight of 0
+    disables that half of the limit. Limits apply per process, which is why
+    service_connect runs a single gunicorn worker.
+    """
+
+    def __init__(self, name, rate=0, burst=0, max_in_flight=0, max_wait=10.0):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, self.rate))
+        self.max_in_flight = int(max_in_flight)
+        self.max_wait = float(max_wait)
+
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._slots = threading.BoundedSemaphore(self.max_in_flight) if self.max_in_flight > 0 else None
+
+        self._in_flight = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._shed = 0
+        self._wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_seconds = 0.0
+
+    def acquire(self):
+        """Wait for a slot and a token, returning a permit to release once the response is done"""
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        with self._lock:
+            self._waiting += 1
+
+        try:
+            if self._slots is not None and not self._slots.acquire(timeout=self.max_wait):
+                self._reject("no free in-flight slot before the deadline", 1.0)
+            try:
+                delay = self._reserve_token(deadline)
+                if delay > 0:
+                    time.sleep(delay)
+            except Exception:
+                if self._slots is not None:
+                    self._slots.release()
+                raise
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._in_flight += 1
+            self._admitted += 1
+            self._wait_seconds += waited
+            self._wait_histogram[self._bucket(waited * 1000)] += 1
+        return _Permit(self)
+
+    def get_stats(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            histogram = {str(bound): count for bound, count in zip(WAIT_BUCKETS_MS, self._wait_histogram)}
+            histogram["+Inf"] = self._wait_histogram[-1]
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "max_in_flight": self.max_in_flight,
+                "max_wait": self.max_wait,
+                "tokens": round(self._tokens, 2) if self.rate > 0 else None,
+                "in_flight": self._in_flight,
+                "queue_depth": self._waiting,
+                "admitted": self._admitted,
+                "shed": self._shed,
+                "wait_ms_histogram": histogram,
+                "wait_ms_avg": round(self._wait_seconds * 1000 / self._admitted, 2) if self._admitted else 0.0,
+            }
+
+    # ============ Private Methods ===============
+    def _reserve_token(self, deadline):
+        """Take the next token, returning how long to sleep until it is actually due.
+
+        The token may be borrowed from the future (the bucket goes negative),
+        which keeps waiters in arrival order without a second queue. If it
+        would only be due after the deadline the request is shed right away
+        rather than after a pointless wait.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            delay = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if now + delay > deadline:
+                self._shed += 1
+                raise RateLimitExceeded(self.name, "no token available before the deadline", delay)
+            self._tokens -= 1
+            return delay
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _reject(self, reason, retry_after):
+        with self._lock:
+            self._shed += 1
+        raise RateLimitExceeded(self.name, reason, retry_after)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    @staticmethod
+    def _bucket(wait_ms):
+        for index, bound in enumerate(WAIT_BUCKETS_MS):
+            if wait_ms <= bound:
+                return index
+        return len(WAIT_BUCKETS_MS)
+
+
+class _Permit:
+    """One admitted request; releasing it more than once is harmless"""
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._limiter._release()
@@ -0,0 +1,192 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """An upstream 200 response kept in the cache, with the validators needed to revalidate it"""
+
+    def __init__(self, status, headers, body, ttl):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = _header(headers, "etag")
+        self.last_modified = _header(headers, "last-modified")
+        self.ttl = ttl
+        self.expires_at = time.monotonic() + ttl
+        self.size = len(body) + sum(len(name) + len(value) for name, value in headers)
+
+    def is_fresh(self):
+        return time.monotonic() < self.expires_at
+
+    def can_revalidate(self):
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self):
+        """Headers asking the upstream to answer 304 if this copy is still current"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def refresh(self):
+        self.expires_at = time.monotonic() + self.ttl
+
+
+class ResponseCache:
+    """Byte-bounded LRU cache of upstream GET responses, with a TTL per route.
+
+    Only routes listed in `route_ttls` are cached; the TTL of the longest
+    matching "target/path" prefix applies. Entries are keyed by target,
+    path, query string and the values of the `vary_headers`. An expired
+    entry that has an ETag or Last-Modified is kept so the next request can
+    revalidate it with a conditional GET instead of downloading it again;
+    the least recently used entries are evicted once the cache holds more
+    than `max_bytes`.
+    """
+
+    def __init__(self, route_ttls=None, max_bytes=64 * 1024 * 1024, max_entry_bytes=None, vary_headers=("Accept", "Authorization")):
+        self.route_ttls = dict(route_ttls or {})
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max(1, max_bytes // 8)
+        self.vary_headers = tuple(name.lower() for name in vary_headers)
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "revalidated": 0, "stale": 0, "stores": 0, "evictions": 0, "bypassed": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            route_ttls=_parse_route_ttls(os.environ.get("CONNECT_CACHE_TTLS", "")),
+            max_bytes=int(os.environ.get("CONNECT_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+            max_entry_bytes=int(os.environ.get("CONNECT_CACHE_MAX_ENTRY_BYTES", 0)) or None,
+            vary_headers=[
+                name.strip() for name in os.environ.get("CONNECT_CACHE_VARY_HEADERS", "Accept,Authorization").split(",")
+                if name.strip()
+            ],
+        )
+
+    def ttl_for(self, target, endpoint):
+        """TTL of the longest configured prefix of target/endpoint, or 0 when it is not cached"""
+        route = f"{target}/{endpoint.strip('/')}"
+        best = None
+        for prefix in self.route_ttls:
+            if (route == prefix or route.startswith(prefix.rstrip("/") + "/")) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return self.route_ttls[best] if best is not None else 0
+
+    def key_for(self, target, endpoint, params, headers):
+        lowered = {name.lower(): value for name, value in headers.items()}
+        return (
+            target,
+            endpoint.strip("/"),
+            tuple(sorted((params or {}).items())),
+            tuple(lowered.get(name, "") for name in self.vary_headers),
+        )
+
+    def get(self, key):
+        """The entry for key, fresh or stale (to be revalidated), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not entry.is_fresh() and not entry.can_revalidate():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits" if entry.is_fresh() else "stale"] += 1
+            return entry
+
+    def revalidated(self, key, entry):
+        """The upstream answered 304 - the stale entry is good for another TTL"""
+        with self._lock:
+            entry.refresh()
+            self._counters["revalidated"] += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def store(self, key, status, headers, body, ttl):
+        """Cache a 200 response unless it is too large or the upstream forbids storing it"""
+        cache_control = (_header(headers, "cache-control") or "").lower()
+        if status != 200 or ttl <= 0 or "no-store" in cache_control or "private" in cache_control:
+            with self._lock:
+                self._counters["bypassed"] += 1
+            return None
+
+        entry = CachedResponse(status, headers, body, ttl)
+        if entry.size > self.max_entry_bytes:
+            with self._lock:
+                self._counters["bypassed"] += 1
+            return None
+
+        evicted = 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._counters["stores"] += 1
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+            self._counters["evictions"] += evicted
+        if evicted:
+            logger.debug(f"Evicted {evicted} cached responses to stay under {self.max_bytes} bytes")
+        return entry
+
+    def count_bypass(self):
+        with self._lock:
+            self._counters["bypassed"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["stale"] + self._counters["misses"]
+            stats = dict(self._counters)
+            stats.update({
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                "route_ttls": self.route_ttls,
+            })
+            return stats
+
+    # ============ Private Methods ===============
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+def _header(headers, name):
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _parse_route_ttls(value):
+    """Parse "target/path=seconds,target/path=seconds" into a dict"""
+    ttls = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        route, seconds = item.split("=", 1)
+        try:
+            ttls[route.strip().strip("/")] = float(seconds)
+        except ValueError:
+            logger.warning(f"Ignoring invalid cache TTL entry: {item}")
+    return ttls
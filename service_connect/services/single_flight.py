@@ -0,0 +1,92 @@
+import threading
+
+
+class NotShared(Exception):
+    """The leader's outcome cannot be handed to the callers that joined it; they should make their own call"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.finished = False
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is still running wait for it and receive the same result, or
+    the same exception. Once the call finishes the key is forgotten, so
+    later callers start a fresh one - this only merges requests that
+    overlap in time, it does not cache.
+
+    `do()` covers the common case. A leader whose result only becomes
+    available later (e.g. once a streamed body has been sent on) uses
+    `begin()` and publishes the outcome with `finish()`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {"leaders": 0, "coalesced": 0, "wait_timeouts": 0}
+
+    def do(self, key, func):
+        """Run func once for all concurrent callers of key, returning (result, shared)"""
+        call, leader = self.begin(key)
+        if not leader:
+            return self.wait(call), True
+
+        try:
+            result = func()
+        except Exception as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result, call.waiters > 0
+
+    def begin(self, key):
+        """Join the call in flight for key, or start a new one; returns (call, is_leader)"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._counters["coalesced"] += 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self._counters["leaders"] += 1
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        """Publish the leader's outcome to its waiters and forget the key; only the first finish counts"""
+        with self._lock:
+            if call.finished:
+                return
+            call.finished = True
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result = result
+        call.error = error
+        call.done.set()
+
+    def wait(self, call, timeout=None):
+        """Block until the leader finishes, then return its result or raise its error.
+
+        Raises NotShared if the leader has not finished within `timeout` seconds.
+        """
+        if not call.done.wait(timeout):
+            with self._lock:
+                self._counters["wait_timeouts"] += 1
+            raise NotShared(f"Leader did not finish within {timeout}s")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._calls)
+            return stats
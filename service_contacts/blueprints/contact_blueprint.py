@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 import logging
 from services.contact_service import ContactService
+from shared.sync_jobs import SyncJobQueue
 
 contact_bp = Blueprint('contact', __name__)
 logger = logging.getLogger(__name__)
@@ -8,13 +9,35 @@ logger = logging.getLogger(__name__)
 
 # Initialize services
 contact_service = ContactService()
+sync_jobs = SyncJobQueue.from_env(
+    contact_service.sync_contacts, kind="contacts", default_db_path="./data/sync_jobs.db",
+    normalize=contact_service.resolve_sync_params,
+)
+
+# Pick up jobs left queued or running by a previous process as soon as the app starts
+contact_bp.record_once(lambda state: sync_jobs.start())
 
 
 @contact_bp.route('/sync', methods=['POST'])
 def sync_contacts():
+    """Queue a contact sync, or join an identical one already queued or running, and return its job ID"""
     try:
         params = request.json or {}
-        result = contact_service.sync_contacts(params)
-        return jsonify(result)
+        job = sync_jobs.submit(params, request_id=request.headers.get('X-Request-ID'))
+        response = jsonify(job)
+        response.status_code = 202
+        return response
+    except ValueError as e:
+        return jsonify({"error": f"Invalid sync parameters: {str(e)}"}), 400
     except Exception as e:
-        return ({"error": f"Error in sync: {str(e)}, 500"})
\ No newline at end of file
+        logger.error(f"Error queueing contact sync: {str(e)}")
+        return jsonify({"error": f"Error in sync: {str(e)}"}), 500
+
+
+@contact_bp.route('/sync/<job_id>', methods=['GET'])
+def get_sync_job(job_id):
+    """Report the status and progress of a contact sync job"""
+    job = sync_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Sync job {job_id} not found"}), 404
+    return jsonify(job)
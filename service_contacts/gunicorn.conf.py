@@ -0,0 +1,13 @@
+# gunicorn.conf.py - production serving profile for service_contacts; the common settings are in shared/gunicorn_profile.py
+import os
+import sys
+
+# gunicorn reads this file before the app directory is on sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from shared.gunicorn_profile import profile  # noqa: E402
+
+# Each worker also runs SYNC_JOB_WORKERS background contact sync threads; more workers
+# means more syncs running at once against HubSpot. The job threads start when the app
+# is created, so it must not be preloaded in the master, and recycling a worker (off by
+# default) abandons its running sync job until the lease expires
+globals().update(profile(workers=1, threads=8, preload_app=False, max_requests=0, max_requests_jitter=0))
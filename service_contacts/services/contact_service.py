@@ -1,9 +1,14 @@
 import logging
 import os
 import requests
-import json
-from flask import request
 from shared.debugger_client import track_api_call, track_error, FlowTracker, track_response
+from shared.http_client import get_http_client
+from shared.ndjson import NDJSON_MIMETYPE, encode_ndjson, iter_ndjson, is_error_line
+from shared.hubspot_batch import HubSpotBatchWriter
+from shared.mapping_registry import MappingRegistry, MappingVersionConflict, PinnedMapping
+from shared.pipeline import Pipeline, Stage
+from shared.sync_jobs import parse_flag
+from shared.sync_state import SyncStateStore
 
 
 class ContactService:
@@ -13,52 +18,173 @@ class ContactService:
         self.logger = logging.getLogger(__name__)
         self.service_transform = os.environ.get('SERVICE_TRANSFORM')
         self.service_connect = os.environ.get('SERVICE_CONNECT')
+        self.page_size = int(os.environ.get('CONTACT_SYNC_PAGE_SIZE', 100))
+        self.queue_size = int(os.environ.get('CONTACT_SYNC_QUEUE_SIZE', 2))
+        self.transform_workers = int(os.environ.get('CONTACT_SYNC_TRANSFORM_WORKERS', 2))
+        self.send_workers = int(os.environ.get('CONTACT_SYNC_SEND_WORKERS', 2))
+        self.batch_writer = HubSpotBatchWriter.from_env()
+        self.mapping_registry = MappingRegistry.from_env()
+        self.stream_transform = os.environ.get('TRANSFORM_STREAMING', 'false').lower() == 'true'
+        self.sync_state = SyncStateStore.from_env("./data/sync_state.db")
+        self.default_mode = os.environ.get('CONTACT_SYNC_MODE', 'incremental')
+        self.upsert_id_property = os.environ.get('HUBSPOT_UPSERT_ID_PROPERTY', 'oggo_id')
 
 
-    def sync_contacts(self, params):
-        """Main method to sync contacts from Oggo to HubSpot"""
+    def resolve_sync_params(self, params):
+        """Sync params with this service's defaults filled in, so equivalent requests queue identical jobs.
+
+        Raises ValueError for a page_size or skip_unchanged that cannot be parsed.
+        """
+        resolved = dict(params or {})
+        resolved['mode'] = resolved.get('mode') or self.default_mode
+        resolved['page_size'] = int(resolved.get('page_size') or self.page_size)
+        resolved['skip_unchanged'] = parse_flag(resolved.get('skip_unchanged'), default=resolved['mode'] == 'incremental')
+        if not resolved.get('updated_since'):
+            resolved.pop('updated_since', None)
+        return resolved
+
+    def sync_contacts(self, params, request_id=None, progress=None):
+        """Main method to sync contacts from Oggo to HubSpot.
+
+        Contacts are paged through Oggo and run through a fetch -> transform
+        -> send pipeline, so the next page is fetched while earlier ones are
+        being transformed and sent. Queues between stages hold at most
+        `queue_size` pages, which keeps memory bounded by page size rather
+        than tenant size. Runs as a background job, reporting counts to
+        `progress` (a JobProgress) as pages complete.
+
+        In `incremental` mode (the default) only contacts updated since the
+        last successful sync are fetched and they are upserted into HubSpot;
+        `full` mode fetches everything and uses batch/create. Contacts whose
+        mapped output is identical to what was last pushed are skipped unless
+        `skip_unchanged` is turned off (it is off by default in full mode).
+        """
+        tracker = FlowTracker(request_id)
+        page_size = int(params.get('page_size', self.page_size))
+        mode = params.get('mode', self.default_mode)
+        upsert = mode == 'incremental'
+        skip_unchanged = parse_flag(params.get('skip_unchanged'), default=upsert)
+        updated_since = params.get('updated_since') or (self.sync_state.get_watermark('contacts') if upsert else None)
         
         try:
-            
-            request_id = request.headers.get('X-Request-ID') if request else None
-            tracker = FlowTracker(request_id)
             track_api_call(tracker, "service_contacts", "service_connect", "fetch_oggo_contacts")
 
-            # Step 1: Fetch contacts from Oggo
-            contacts = self._fetch_contacts_from_oggo(params)
-            
-            if not contacts:
-                return {"message": "No contacts found to sync"}
-            
-            # Step 2: Transform contacts  
-            track_api_call(tracker, "service_contacts", "service_transformer", "transform_data")
-            transformed_data = self._transform_contacts(contacts)
+            # Pin the pages of this sync to the mapping version current at its start (re-pinned if it is saved mid-run)
+            mapping = PinnedMapping(self.mapping_registry, 'contact')
+
+            # Step 1: Fetch contacts from Oggo page by page, steps 2 and 3 run in their own stages
+            pipeline = Pipeline([
+                Stage("transform", lambda contacts: self._transform_page(contacts, tracker, mapping), self.transform_workers),
+                Stage("send", lambda transformed_data: self._send_page(transformed_data, tracker, progress, upsert, skip_unchanged), self.send_workers),
+            ], queue_size=self.queue_size, name="contact-sync")
+            fetched = []
+            high_water = [updated_since]
+
+            def on_page_fetched(contacts):
+                fetched.append(len(contacts))
+                high_water.append(max((contact.get('updated_at') or '' for contact in contacts), default=None))
+                if progress:
+                    progress.add(pages=1, fetched=len(contacts))
+
+            outcome = pipeline.run(
+                self._iter_contact_pages(page_size, request_id, updated_since), on_source_item=on_page_fetched
+            )
+            if progress and outcome["errors"]:
+                progress.add(errors=len(outcome["errors"]))
             
-            # Step 3: Send to HubSpot
-            track_api_call(tracker, "service_contacts", "service_connect", "send_to_hubspot")    
-            hubspot_response = self._send_to_hubspot(transformed_data)
+            stages = outcome["stages"]
+            if not fetched:
+                return {"message": "No contacts found to sync", "mode": mode, "updated_since": updated_since}
+
+            errors = [error["message"] for error in outcome["errors"]]
+            for page_result in outcome["results"]:
+                errors.extend(page_result["errors"])
+            for error in errors:
+                track_error(tracker, "service_contacts", error, f"Params: {params}")
+
+            # Only a clean run may move the watermark, otherwise failed records would never be retried
+            watermark = max(value for value in high_water if value) if any(high_water) else None
+            if not errors:
+                self.sync_state.set_watermark('contacts', watermark)
 
             return {
-                "status": "success",
-                "data": transformed_data,
-                "hubspot_response": hubspot_response,
+                "status": "success" if not errors else "partial_success",
+                "mode": mode,
+                "updated_since": updated_since,
+                "watermark": watermark if not errors else updated_since,
+                "pages": len(fetched),
+                "fetched": sum(fetched),
+                "transformed": sum(page_result["transformed"] for page_result in outcome["results"]),
+                "skipped": sum(page_result["skipped"] for page_result in outcome["results"]),
+                "skipped_no_id": sum(page_result["skipped_no_id"] for page_result in outcome["results"]),
+                "sent": sum(page_result["sent"] for page_result in outcome["results"]),
+                "errors": errors,
+                "elapsed": outcome["elapsed"],
+                "stages": stages,
+                "mapping_versions": mapping.versions,
             }
             
         except Exception as e:
             # ADD JUST THIS ONE LINE FOR ERROR TRACKING:
             track_error(tracker, "service_contacts", str(e), f"Params: {params}")
             raise e
-        
 
-    def load_mapping(self, mapping_file):
-        """Load mapping configuration from JSON file"""
+    def _transform_page(self, contacts, tracker, mapping=None):
+        """Pipeline stage: transform one page of contacts, re-pinning the mapping if it was saved mid-sync"""
+        # Step 2: Transform contacts  
+        track_api_call(tracker, "service_contacts", "service_transformer", "transform_data")
         try:
-            with open(mapping_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            self.logger.error(f"Error loading mapping file {mapping_file}: {str(e)}")
-            raise e
+            transformed_data = self._transform_contacts(contacts, tracker.request_id, mapping.version if mapping else None)
+        except MappingVersionConflict as conflict:
+            if mapping is None:
+                raise
+            transformed_data = self._transform_contacts(contacts, tracker.request_id, mapping.repin(conflict))
+        if not transformed_data:
+            raise Exception("Transform service returned no data for contact page")
+        return transformed_data
+
+    def _send_page(self, transformed_data, tracker, progress=None, upsert=False, skip_unchanged=False):
+        """Pipeline stage: send one transformed page to HubSpot, skipping records unchanged since their last push"""
+        records = transformed_data.get('contacts', [])
+        sendable = records
+        if upsert:
+            # An upsert needs the Oggo id; without one HubSpot would be sent the literal "None"
+            sendable = [record for record in records if record.get('hubspot_id') not in (None, '')]
+            if len(sendable) < len(records):
+                # Reported, but not an error: retrying cannot fix a missing id, so it must not hold back the watermark
+                self.logger.warning(f"{len(records) - len(sendable)} contacts have no hubspot_id and were not upserted")
 
+        if skip_unchanged:
+            changed, hashes = self.sync_state.filter_changed('contacts', sendable, 'hubspot_id')
+        else:
+            changed, hashes = sendable, self.sync_state.hash_records(sendable, 'hubspot_id')
+
+        if changed:
+            # Step 3: Send to HubSpot
+            track_api_call(tracker, "service_contacts", "service_connect", "send_to_hubspot")
+            hubspot_response = self._send_to_hubspot({'contacts': changed}, tracker.request_id, upsert)
+        else:
+            hubspot_response = {"results": [], "errors": []}
+
+        # Remember what was pushed only when the whole page went through
+        if not hubspot_response["errors"]:
+            self.sync_state.save_hashes('contacts', hashes)
+        
+        page_result = {
+            "transformed": len(records),
+            "skipped": len(sendable) - len(changed),
+            "skipped_no_id": len(records) - len(sendable),
+            "sent": len(hubspot_response["results"]),
+            "errors": [error["message"] for error in hubspot_response["errors"]],
+        }
+        if progress:
+            progress.add(
+                transformed=page_result["transformed"], skipped=page_result["skipped"],
+                skipped_no_id=page_result["skipped_no_id"],
+                sent=page_result["sent"], errors=len(page_result["errors"])
+            )
+        return page_result
+        
 
     #============ private Methods ===============
     # def _send_to_hubspot(self, transformed_data):
@@ -77,19 +203,16 @@ class ContactService:
     #         error_msg = f"Failed to sync data to Hubspot: {str(e)}"
     #         raise Exception(error_msg)
         
-    def _send_to_hubspot(self, transformed_data):
-        """Send transformed data to Hubspot via connect service"""
-        url, headers, payload = self._build_hubspot_request(transformed_data)
+    def _send_to_hubspot(self, transformed_data, request_id=None, upsert=False):
+        """Send transformed data to Hubspot via connect service in concurrent 100-record chunks"""
+        url, headers, payload = self._build_hubspot_request(transformed_data, upsert)
 
         try:
-            response = requests.post(url=url, headers=headers, json=payload)
-            if response.status_code != 200:
-                error_msg = f"HubSpot API error: Status code {response.status_code}"
-            
-            hubspot_response = response.json()
+            hubspot_response = self.batch_writer.write(url, payload["inputs"], headers=headers)
+            if hubspot_response["status"] == "ERROR":
+                raise Exception(hubspot_response["errors"][0]["message"])
             
             # NEW: Track receiving response from connect service
-            request_id = request.headers.get('X-Request-ID') if request else None
             if request_id:
                 tracker = FlowTracker(request_id)
                 track_response(tracker, "service_connect", "service_contacts")
@@ -100,11 +223,25 @@ class ContactService:
             error_msg = f"Failed to sync data to Hubspot: {str(e)}"
             raise Exception(error_msg)
     
-    def _build_hubspot_request(self, transformed_data):
+    def _build_hubspot_request(self, transformed_data, upsert=False):
         """Build the request configuration for HubSpot API"""
-        url = f"{self.service_connect}/proxy/hubspot/crm/v3/objects/contacts/batch/create"
         headers = {"Content-Type": "application/json"}
         hubspot_contacts = transformed_data.get('contacts', [])
+        if upsert:
+            # Upsert keyed on the Oggo id so re-sent contacts update instead of duplicating
+            url = f"{self.service_connect}/proxy/hubspot/crm/v3/objects/contacts/batch/upsert"
+            payload = {
+                "inputs": [
+                    {
+                        "idProperty": self.upsert_id_property,
+                        "id": str(contact['hubspot_id']),
+                        "properties": contact.get('properties', {})
+                    } for contact in hubspot_contacts if contact.get('hubspot_id') not in (None, '')
+                ]
+            }
+            return url, headers, payload
+
+        url = f"{self.service_connect}/proxy/hubspot/crm/v3/objects/contacts/batch/create"
         payload = {
             "inputs": [
                 {
@@ -115,21 +252,34 @@ class ContactService:
         return url, headers, payload
     
 
-    def _fetch_contacts_from_oggo(self, params):
-        """Fetch contacts from oggo via proxy service"""
-        url, headers = self._build_oggo_request()
+    def _iter_contact_pages(self, page_size, request_id=None, updated_since=None):
+        """Yield pages of contacts from Oggo, following the paging cursor"""
+        after = None
+        while True:
+            contacts, after = self._fetch_contacts_from_oggo(page_size, after, request_id, updated_since)
+            if contacts:
+                yield contacts
+            if not after:
+                return
+
+    def _fetch_contacts_from_oggo(self, page_size, after=None, request_id=None, updated_since=None):
+        """Fetch one page of contacts from oggo via proxy service, returning (contacts, next_cursor)"""
+        url, headers, params = self._build_oggo_request(page_size, after, updated_since)
         try:
-            response = requests.get(url, headers=headers)
+            response = get_http_client().get(url, headers=headers, params=params)
             response.raise_for_status()
-            contacts = response.json()
+            body = response.json()
             
             # NEW: Track receiving response from connect service
-            request_id = request.headers.get('X-Request-ID') if request else None
             if request_id:
                 tracker = FlowTracker(request_id)
                 track_response(tracker, "service_connect", "service_contacts")
             
-            return contacts
+            # An unpaginated API answers with the whole list
+            if isinstance(body, list):
+                return body, None
+            next_cursor = body.get('paging', {}).get('next', {}).get('after')
+            return body.get('results', []), next_cursor
         except requests.RequestException as e:
             error_msg = f"Failed to fetch contacts from Oggo: {str(e)}"
             raise Exception(error_msg)
@@ -149,11 +299,16 @@ class ContactService:
 
     
     
-    def _build_oggo_request(self):
+    def _build_oggo_request(self, page_size, after=None, updated_since=None):
         """Build the request configuration from Oggo Api"""
         url = f"{self.service_connect}/proxy/oggo/contacts"
         headers = {"Content-Type": "application/json"}
-        return url, headers
+        params = {"limit": page_size}
+        if after:
+            params["after"] = after
+        if updated_since:
+            params["updated_since"] = updated_since
+        return url, headers, params
 
     # def _transform_contacts(self, contacts):
     #     """Transform contact using the transformation service"""
@@ -178,13 +333,17 @@ class ContactService:
     #         self.logger.error(error_msg)
     #         raise Exception(error_msg)
 
-    def _transform_contacts(self, contacts):
+    def _transform_contacts(self, contacts, request_id=None, mapping_version=None):
         """Transform contact using the transformation service"""
-        url, headers, payload = self._build_transform_request(contacts)
+        if self.stream_transform:
+            return self._transform_contacts_streaming(contacts, request_id, mapping_version)
+        url, headers, payload = self._build_transform_request(contacts, mapping_version)
 
         try:        
-            response = requests.post(url, headers=headers, json=payload)
+            response = get_http_client().post(url, headers=headers, json=payload)
             
+            if response.status_code == 409:
+                raise MappingVersionConflict('contact', mapping_version, response.json().get('version'))
             if response.status_code != 200:
                 raise Exception(f"Transform service error: {response.text}")
             
@@ -196,7 +355,6 @@ class ContactService:
             transformed_data = response.json()
             
             # NEW: Track receiving response from transformer service
-            request_id = request.headers.get('X-Request-ID') if request else None
             if request_id:
                 tracker = FlowTracker(request_id)
                 track_response(tracker, "service_transformer", "service_contacts")
@@ -208,14 +366,50 @@ class ContactService:
             self.logger.error(error_msg)
             raise Exception(error_msg)
     
-    def _build_transform_request(self, contacts):
+    def _transform_contacts_streaming(self, contacts, request_id=None, mapping_version=None):
+        """Transform contacts through the NDJSON streaming endpoint, reading results as they are produced"""
+        url = f"{self.service_transform}/transform/stream"
+        headers = {"Content-Type": NDJSON_MIMETYPE, "X-Entity-Type": "contact"}
+        if mapping_version:
+            headers["X-Mapping-Version"] = mapping_version
+
+        try:
+            response = get_http_client().post(url, headers=headers, data=encode_ndjson(contacts), stream=True)
+            try:
+                if response.status_code == 409:
+                    raise MappingVersionConflict('contact', mapping_version, response.json().get('version'))
+                if response.status_code != 200:
+                    raise Exception(f"Transform service error: {response.text}")
+
+                transformed = []
+                for record in iter_ndjson(response.iter_lines()):
+                    if is_error_line(record):
+                        raise Exception(f"Transform service error at line {record['line']}: {record['error']}")
+                    transformed.append(record)
+            finally:
+                response.close()
+
+            # Track receiving response from transformer service
+            if request_id:
+                tracker = FlowTracker(request_id)
+                track_response(tracker, "service_transformer", "service_contacts")
+
+            return {"contacts": transformed}
+
+        except requests.RequestException as e:
+            error_msg = f"Failed to stream contacts through transformer: {str(e)}"
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+
+    def _build_transform_request(self, contacts, mapping_version=None):
         """Build the request configuration for Transform service"""
         url = f"{self.service_transform}/transform"
         headers = {"Content-Type": "application/json"}
         
+        # The transformer resolves the mapping itself; only its version is sent
         payload = {
             "data": contacts,
             "entity_type": "contact",
-            "mapping_file": self.load_mapping("./mappings/contact_mapping.json")
+            "mapping_version": mapping_version
         }
         return url, headers, payload
\ No newline at end of file
@@ -1,14 +1,37 @@
 from flask import Flask, request, jsonify
 import os
 import time
-from tinydb import TinyDB
+import json
+import atexit
+from log_store import SegmentLogStore
+from request_summaries import RequestSummaryTable
 
 app = Flask(__name__)
 
-# Initialize TinyDB
-db_path = '/app/data/logs.json'
-os.makedirs(os.path.dirname(db_path), exist_ok=True)
-db = TinyDB(db_path)
+# Request summaries, kept current on ingest and dropped once their request log is evicted
+summaries = RequestSummaryTable()
+
+# Initialize the segment log store; the oldest segments are evicted past LOG_RETENTION_RECORDS events (0 keeps everything)
+data_dir = os.environ.get('LOG_DATA_DIR', '/app/data')
+os.makedirs(data_dir, exist_ok=True)
+db = SegmentLogStore(
+    data_dir,
+    segment_max_bytes=int(os.environ.get('LOG_SEGMENT_MAX_BYTES', 8 * 1024 * 1024)),
+    compact_after=int(os.environ.get('LOG_COMPACT_AFTER', 8)),
+    fsync=os.environ.get('LOG_FSYNC', 'false').lower() == 'true',
+    max_records=int(os.environ.get('LOG_RETENTION_RECORDS', 200000)),
+    on_evict=summaries.evict
+)
+
+# Carry over logs written by the previous TinyDB storage (the file itself is left untouched)
+db.import_tinydb(os.path.join(data_dir, 'logs.json'))
+
+# Materialize request summaries from the stored logs
+for stored_log in db.all():
+    summaries.add(stored_log)
+
+# Persist the secondary indexes so the next start only replays new events
+atexit.register(db.save_index)
 
 @app.route('/logs', methods=['POST'])
 def store_log():
@@ -22,13 +45,45 @@ def store_log():
         if 'timestamp' not in log_data:
             log_data['timestamp'] = time.time()
         
-        # Store in TinyDB
-        db.insert(log_data)
+        # Append to the active segment
+        db.append(log_data)
+        summaries.add(log_data)
         
         return jsonify({'status': 'success'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/logs/batch', methods=['POST'])
+def store_logs_batch():
+    """Store many log entries at once from a JSON array or an NDJSON body"""
+    try:
+        body = request.get_data(as_text=True).strip()
+        if not body:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        if body.startswith('['):
+            logs = json.loads(body)
+        else:
+            logs = [json.loads(line) for line in body.splitlines() if line.strip()]
+        
+        if not all(isinstance(log, dict) for log in logs):
+            return jsonify({'error': 'Every log entry must be a JSON object'}), 400
+        
+        now = time.time()
+        for log_data in logs:
+            if 'timestamp' not in log_data:
+                log_data['timestamp'] = now
+        
+        stored = db.append_many(logs)
+        for log_data in logs:
+            summaries.add(log_data)
+        
+        return jsonify({'status': 'success', 'stored': stored})
+    except ValueError as e:
+        return jsonify({'error': f'Invalid JSON: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 
 
 @app.route('/logs', methods=['GET'])
@@ -41,24 +96,17 @@ def get_logs():
         request_id = request.args.get('request_id')  # New: filter by request ID
         limit = int(request.args.get('limit', 100))
         
-        # Get all logs
-        logs = db.all()
-        
-        # Filter by request_id if specified (for getting specific request details)
+        # Build index filters from the query parameters
+        filters = {}
         if request_id:
-            logs = [log for log in logs if log.get('request_id') == request_id]
-        
-        # Filter by service if specified
+            filters['request_id'] = request_id
         if service:
-            logs = [log for log in logs if log.get('service') == service]
-        
-        # Filter by level if specified
+            filters['service'] = service
         if level:
-            logs = [log for log in logs if log.get('level') == level]
+            filters['level'] = level
         
-        # Sort by timestamp (newest first) and limit
-        logs.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
-        logs = logs[:limit]
+        # Index lookup, already newest first and limited
+        logs = db.query(filters, limit)
         
         return jsonify({
             'status': 'success',
@@ -69,60 +117,56 @@ def get_logs():
 
 @app.route('/requests', methods=['GET'])
 def get_requests():
-    """Get summary of all requests (grouped by request_id)"""
+    """Get a page of request summaries (grouped by request_id), newest first"""
+    try:
+        limit = int(request.args.get('limit', 100))
+        cursor = request.args.get('cursor')
+        since = request.args.get('since')
+        since = float(since) if since else None
+        
+        # Served from the incrementally maintained summary table
+        request_summaries, next_cursor = summaries.page(limit=limit, cursor=cursor, since=since)
+        
+        return jsonify({
+            'status': 'success',
+            'requests': request_summaries,
+            'next_cursor': next_cursor
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid pagination parameter: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/requests/<request_id>', methods=['GET'])
+def get_request_trace(request_id):
+    """Get the full trace of one request: ordered steps, payload log and final response"""
     try:
-        # Get all logs
-        all_logs = db.all()
-        
-        # Group by request_id
-        request_groups = {}
-        for log in all_logs:
-            req_id = log.get('request_id')
-            if req_id:
-                if req_id not in request_groups:
-                    request_groups[req_id] = []
-                request_groups[req_id].append(log)
-        
-        # Create request summaries
-        request_summaries = []
-        for req_id, logs in request_groups.items():
-            # Find the initial request log
-            initial_log = None
-            request_log = None
-            response_log = None
-            
-            for log in logs:
-                if log.get('action') == 'incoming_request':
-                    initial_log = log
-                elif log.get('action') == 'incoming_request_with_payload':
-                    request_log = log
-                elif log.get('action') == 'final_response':
-                    response_log = log
-            
-            # Use request_log if available, otherwise initial_log
-            main_log = request_log or initial_log
-            if main_log:
-                summary = {
-                    'request_id': req_id,
-                    'timestamp': main_log.get('timestamp'),
-                    'method': main_log.get('method', 'GET'),
-                    'endpoint': main_log.get('endpoint', '/unknown'),
-                    'step_count': len(logs),
-                    'has_errors': any('error' in log.get('level', '').lower() or 'ERROR' in log.get('to_service', '') for log in logs),
-                    'payload': main_log.get('payload'),
-                    'headers': main_log.get('headers'),
-                    'response': response_log.get('response') if response_log else None,
-                    'status_code': response_log.get('status_code') if response_log else None,
-                    'response_time_ms': response_log.get('response_time_ms') if response_log else None
-                }
-                request_summaries.append(summary)
-        
-        # Sort by timestamp (newest first)
-        request_summaries.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
+        # One index lookup for every log of the request, oldest first
+        logs = db.query({'request_id': request_id}, limit=None)
+        logs.reverse()
+        
+        if not logs:
+            return jsonify({'error': f'No logs found for request ID: {request_id}'}), 404
+        
+        request_log = None
+        response_log = None
+        steps = []
+        for log in logs:
+            action = log.get('action')
+            if action == 'incoming_request_with_payload' and request_log is None:
+                request_log = log
+            elif action == 'final_response':
+                response_log = log
+            else:
+                steps.append(log)
         
         return jsonify({
             'status': 'success',
-            'requests': request_summaries
+            'request_id': request_id,
+            'summary': summaries.get(request_id),
+            'request_log': request_log,
+            'response_log': response_log,
+            'steps': steps
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -132,6 +176,7 @@ def clear_logs():
     """Clear all logs"""
     try:
         db.truncate()
+        summaries.clear()
         return jsonify({'status': 'success', 'message': 'All logs cleared'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
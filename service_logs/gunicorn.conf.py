@@ -0,0 +1,12 @@
+# gunicorn.conf.py - production serving profile for service_logs; the common settings are in shared/gunicorn_profile.py
+import os
+import sys
+
+# gunicorn reads this file before the app directory is on sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from shared.gunicorn_profile import profile  # noqa: E402
+
+# The log store, its index and the request summaries live in this process, so there
+# must be exactly one worker; concurrency comes from threads (or gevent). Recycling is
+# off by default: a recycled worker starts with empty request summaries
+globals().update(profile(single_worker=True, threads=16, max_requests=0, max_requests_jitter=0))
@@ -0,0 +1,189 @@
+import bisect
+import json
+import logging
+import os
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class PostingList:
+    """Seqs of the events sharing one indexed value, kept in timestamp order"""
+
+    def __init__(self):
+        self.entries = []  # sorted [(timestamp, seq)]
+        self.members = set()
+
+    def add(self, timestamp, seq):
+        entry = (timestamp, seq)
+        # Events arrive roughly in time order, so this is almost always an append
+        if not self.entries or self.entries[-1] <= entry:
+            self.entries.append(entry)
+        else:
+            bisect.insort(self.entries, entry)
+        self.members.add(seq)
+
+    def trim(self, floor, count):
+        """Remove the `count` entries whose seq is below floor.
+
+        Events arrive roughly in time order, so those entries sit at the
+        front and the scan stops as soon as all of them have been found.
+        """
+        kept = []
+        index = 0
+        while count and index < len(self.entries):
+            entry = self.entries[index]
+            if entry[1] < floor:
+                self.members.discard(entry[1])
+                count -= 1
+            else:
+                kept.append(entry)
+            index += 1
+        self.entries[:index] = kept
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class LogIndex:
+    """Secondary indexes over the log store.
+
+    Keeps one posting list per value of each indexed field plus a timeline
+    of every event ordered by timestamp, so filtered queries become a walk
+    over the smallest matching posting list (newest first) with membership
+    checks against the others, instead of a scan and sort of the full table.
+    """
+
+    def __init__(self, fields=("request_id", "service", "level")):
+        self.fields = tuple(fields)
+        self.postings = {field: {} for field in self.fields}
+        self.timeline = PostingList()
+        self.covered = 0  # number of store events reflected in the index
+
+    def add(self, seq, record):
+        timestamp = self._timestamp(record)
+        self.timeline.add(timestamp, seq)
+        for field in self.fields:
+            value = record.get(field)
+            if value is None:
+                continue
+            postings = self.postings[field]
+            if value not in postings:
+                postings[value] = PostingList()
+            postings[value].add(timestamp, seq)
+        self.covered = max(self.covered, seq + 1)
+
+    def query(self, filters, limit):
+        """Return up to `limit` seqs matching every filter, newest first (all of them if limit is None)"""
+        candidates = []
+        for field, value in filters.items():
+            posting = self.postings.get(field, {}).get(value)
+            if posting is None:
+                return []
+            candidates.append(posting)
+
+        if not candidates:
+            candidates = [self.timeline]
+        candidates.sort(key=len)
+        driver, others = candidates[0], candidates[1:]
+
+        seqs = []
+        for _, seq in reversed(driver.entries):
+            if all(seq in other.members for other in others):
+                seqs.append(seq)
+                if limit is not None and len(seqs) >= limit:
+                    break
+        return seqs
+
+    def evict_before(self, seq, records=None):
+        """Forget every event older than seq, given the evicted `records` when known.
+
+        With the records only the posting lists they appear in are trimmed,
+        so the cost follows the number of evicted events rather than the
+        size of the index. Without them (e.g. a snapshot older than the last
+        eviction) every posting list is filtered.
+        """
+        if records is None:
+            self._filter_before(seq)
+            return
+
+        self.timeline.trim(seq, len(records))
+        for field in self.fields:
+            postings = self.postings[field]
+            counts = Counter(record.get(field) for record in records if record.get(field) is not None)
+            for value, count in counts.items():
+                posting = postings.get(value)
+                if posting is None:
+                    continue
+                posting.trim(seq, count)
+                if not posting.entries:
+                    del postings[value]
+
+    def snapshot(self):
+        """Copy of the index as plain lists - cheap enough to take under the store lock, written later by write_snapshot()"""
+        return {
+            "fields": list(self.fields),
+            "covered": self.covered,
+            "timeline": list(self.timeline.entries),
+            "postings": {
+                field: {value: list(posting.entries) for value, posting in postings.items()}
+                for field, postings in self.postings.items()
+            },
+        }
+
+    def save(self, path):
+        """Persist the index so a restart only has to replay events after `covered`"""
+        self.write_snapshot(self.snapshot(), path)
+
+    @staticmethod
+    def write_snapshot(snapshot, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, fields):
+        """Load a saved index, or None if it is missing, unreadable or built for other fields"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                snapshot = json.load(f)
+            if tuple(snapshot["fields"]) != tuple(fields):
+                return None
+
+            index = cls(fields)
+            index.covered = snapshot["covered"]
+            index.timeline = cls._posting_from_entries(snapshot["timeline"])
+            for field, postings in snapshot["postings"].items():
+                index.postings[field] = {
+                    value: cls._posting_from_entries(entries) for value, entries in postings.items()
+                }
+            return index
+        except Exception as e:
+            logger.warning(f"Discarding unreadable log index {path}: {str(e)}")
+            return None
+
+    # ============ Private Methods ===============
+    def _filter_before(self, seq):
+        self.timeline = self._posting_from_entries([entry for entry in self.timeline.entries if entry[1] >= seq])
+        for field, postings in self.postings.items():
+            kept = {}
+            for value, posting in postings.items():
+                entries = [entry for entry in posting.entries if entry[1] >= seq]
+                if entries:
+                    kept[value] = self._posting_from_entries(entries)
+            self.postings[field] = kept
+
+    @staticmethod
+    def _posting_from_entries(entries):
+        posting = PostingList()
+        posting.entries = [(timestamp, seq) for timestamp, seq in entries]
+        posting.members = set(seq for _, seq in posting.entries)
+        return posting
+
+    @staticmethod
+    def _timestamp(record):
+        timestamp = record.get("timestamp", 0)
+        return timestamp if isinstance(timestamp, (int, float)) else 0
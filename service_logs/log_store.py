@@ -0,0 +1,349 @@
+import json
+import logging
+import os
+import threading
+from log_index import LogIndex
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentLogStore:
+    """Append-only log storage backed by JSONL segment files.
+
+    Every ingested event is appended as one JSON line to the active segment,
+    so ingest cost does not depend on how much is already stored (TinyDB
+    rewrites the whole document on each insert). When the active segment
+    grows past `segment_max_bytes` it is sealed and a new one is opened.
+    Once `compact_after` raw segments are sealed, a background compaction
+    merges them into a single compacted segment, rewriting each event at
+    most once. Compacted segments are not merged again, so on their own they
+    accumulate; what bounds memory, disk and the file count is retention:
+    with `max_records` set, the oldest sealed segments are deleted whole
+    once the events after them still number at least `max_records`.
+
+    File layout inside `<data_dir>/segments`:
+
+    - `<first_seq>.jsonl`: raw segment, the last one is the active segment
+    - `<first_seq>-<last_seq>.c.jsonl`: compacted segment covering a seq range
+
+    Events keep their ingest order; an event's seq is its position in that
+    order and is stable until the store is truncated, including across
+    evictions (seqs below the oldest retained segment simply no longer exist).
+    On load a record's seq is its segment's first seq plus its line number,
+    so a corrupt line is kept as an empty slot rather than shifting the seqs
+    of everything after it.
+    `on_evict(records)` is called with the events each eviction drops. A `LogIndex` over
+    `index_fields` is maintained on every append and snapshotted to
+    `<data_dir>/index.json` after compactions (copied under the lock,
+    written outside it so ingest is not blocked on the write), so a restart only re-indexes
+    events newer than the snapshot; a missing or stale snapshot is rebuilt
+    from the segments.
+    """
+
+    RAW_SUFFIX = ".jsonl"
+    COMPACTED_SUFFIX = ".c.jsonl"
+
+    def __init__(self, data_dir, segment_max_bytes=8 * 1024 * 1024, compact_after=8, fsync=False,
+                 index_fields=("request_id", "service", "level"), max_records=0, on_evict=None):
+        self.segment_dir = os.path.join(data_dir, "segments")
+        self.index_path = os.path.join(data_dir, "index.json")
+        self.index_fields = tuple(index_fields)
+        self.segment_max_bytes = segment_max_bytes
+        self.compact_after = compact_after
+        self.fsync = fsync
+        self.max_records = max_records
+        self.on_evict = on_evict
+        self.import_marker_path = os.path.join(data_dir, "tinydb.imported")
+
+        self._lock = threading.RLock()
+        # Serialises index snapshot writes, which happen outside the store lock
+        self._index_write_lock = threading.Lock()
+        self._records = []
+        self._base_seq = 0  # seq of self._records[0]; older events have been evicted
+        self._segments = []  # [(first_seq, last_seq, path, compacted)] for sealed segments
+        self._active = None
+        self._active_first_seq = 0
+        self._active_bytes = 0
+        self._generation = 0
+        self._compacting = False
+
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self._load()
+        self._load_index()
+
+    def append(self, record):
+        """Append one event and return its seq"""
+        with self._lock:
+            self._write_lines([record])
+            return self._next_seq() - 1
+
+    def append_many(self, records):
+        """Append a batch of events with a single write and return how many were stored"""
+        if not records:
+            return 0
+        with self._lock:
+            self._write_lines(records)
+            return len(records)
+
+    def all(self):
+        """Return every stored event in ingest order"""
+        with self._lock:
+            return [record for record in self._records if record is not None]
+
+    def query(self, filters=None, limit=100):
+        """Return up to `limit` events matching every field filter, newest first"""
+        with self._lock:
+            seqs = self._index.query(filters or {}, limit)
+            records = (self._records[seq - self._base_seq] for seq in seqs if seq >= self._base_seq)
+            # A snapshot taken before a line was found corrupt may still point at its empty slot
+            return [record for record in records if record is not None]
+
+    def save_index(self):
+        """Snapshot the secondary indexes to disk"""
+        with self._lock:
+            snapshot = self._index.snapshot()
+            generation = self._generation
+        self._write_index(snapshot, generation)
+
+    def count(self):
+        with self._lock:
+            return len(self._records)
+
+    def truncate(self):
+        """Remove every segment and start over from seq 0"""
+        with self._lock, self._index_write_lock:
+            self._generation += 1
+            self._active.close()
+            for name in os.listdir(self.segment_dir):
+                os.remove(os.path.join(self.segment_dir, name))
+            self._records = []
+            self._base_seq = 0
+            self._segments = []
+            self._index = LogIndex(self.index_fields)
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            self._open_active(0)
+
+    def compact(self):
+        """Merge all sealed raw segments into one compacted segment"""
+        with self._lock:
+            raw_segments = [segment for segment in self._segments if not segment[3]]
+            if len(raw_segments) < 2 or self._compacting:
+                return False
+            self._compacting = True
+            generation = self._generation
+
+        try:
+            first_seq = raw_segments[0][0]
+            last_seq = raw_segments[-1][1]
+            path = os.path.join(self.segment_dir, f"{first_seq:012d}-{last_seq:012d}{self.COMPACTED_SUFFIX}")
+            tmp_path = path + ".tmp"
+
+            # Sealed segments are immutable, so they can be merged without the lock
+            with open(tmp_path, "w") as out:
+                for _, _, segment_path, _ in raw_segments:
+                    # Corrupt lines are carried over as null so every seq stays in place
+                    for record in self._read_segment(segment_path):
+                        out.write(json.dumps(record, separators=(",", ":")) + "\n")
+                out.flush()
+                os.fsync(out.fileno())
+
+            with self._lock:
+                if generation != self._generation:
+                    os.remove(tmp_path)
+                    return False
+                os.replace(tmp_path, path)
+                merged = set(segment[2] for segment in raw_segments)
+                for segment_path in merged:
+                    os.remove(segment_path)
+                remaining = [segment for segment in self._segments if segment[2] not in merged]
+                self._segments = sorted(remaining + [(first_seq, last_seq, path, True)])
+                # Only the copy is taken under the lock; serialising and writing it happens below
+                snapshot = self._index.snapshot()
+            self._write_index(snapshot, generation)
+            return True
+        except Exception as e:
+            logger.error(f"Log segment compaction failed: {str(e)}")
+            return False
+        finally:
+            with self._lock:
+                self._compacting = False
+                # Retention waits for compaction so it never deletes a segment being merged
+                self._enforce_retention()
+
+    def import_tinydb(self, tinydb_path):
+        """One-off import of a legacy TinyDB logs.json.
+
+        The file is only read; a marker next to the index records the import
+        so it is not repeated. Truncating the store does not re-import it.
+        """
+        if not os.path.exists(tinydb_path) or os.path.exists(self.import_marker_path):
+            return 0
+        with open(tinydb_path, "r") as f:
+            table = json.load(f).get("_default", {})
+        records = [table[doc_id] for doc_id in sorted(table, key=int)]
+        imported = self.append_many(records)
+        with open(self.import_marker_path, "w") as f:
+            json.dump({"source": os.path.abspath(tinydb_path), "events": imported}, f)
+        return imported
+
+    def stats(self):
+        with self._lock:
+            return {
+                "events": len(self._records),
+                "first_seq": self._base_seq,
+                "sealed_segments": len(self._segments),
+                "raw_segments": len([segment for segment in self._segments if not segment[3]]),
+                "active_segment_bytes": self._active_bytes,
+            }
+
+    # ============ Private Methods ===============
+    def _write_lines(self, records):
+        """Serialize records to the active segment; caller holds the lock"""
+        data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        self._active.write(data)
+        self._active.flush()
+        if self.fsync:
+            os.fsync(self._active.fileno())
+        first_seq = self._next_seq()
+        self._records.extend(records)
+        for offset, record in enumerate(records):
+            self._index.add(first_seq + offset, record)
+        self._active_bytes += len(data)
+        if self._active_bytes >= self.segment_max_bytes:
+            self._roll_segment()
+
+    def _roll_segment(self):
+        """Seal the active segment and open a new one; caller holds the lock"""
+        self._active.close()
+        last_seq = self._next_seq() - 1
+        self._segments.append((self._active_first_seq, last_seq, self._active_path, False))
+        self._open_active(self._next_seq())
+        self._enforce_retention()
+
+        if len([segment for segment in self._segments if not segment[3]]) >= self.compact_after:
+            threading.Thread(target=self.compact, name="log-compaction", daemon=True).start()
+
+    def _write_index(self, snapshot, generation):
+        """Write an index snapshot unless the store was truncated since it was taken"""
+        with self._index_write_lock:
+            if generation != self._generation:
+                return
+            LogIndex.write_snapshot(snapshot, self.index_path)
+
+    def _next_seq(self):
+        return self._base_seq + len(self._records)
+
+    def _enforce_retention(self):
+        """Delete the oldest sealed segments while the events after them still meet max_records; caller holds the lock"""
+        if not self.max_records or self._compacting:
+            return
+        evicted = []
+        while self._segments:
+            first_seq, last_seq, path, _ = self._segments[0]
+            size = last_seq - self._base_seq + 1
+            if len(self._records) - size < self.max_records:
+                break
+            self._segments.pop(0)
+            evicted.extend(record for record in self._records[:size] if record is not None)
+            del self._records[:size]
+            self._base_seq = last_seq + 1
+            os.remove(path)
+        if not evicted:
+            return
+
+        self._index.evict_before(self._base_seq, evicted)
+        logger.info(f"Evicted {len(evicted)} log events older than seq {self._base_seq}")
+        if self.on_evict is not None:
+            try:
+                self.on_evict(evicted)
+            except Exception as e:
+                logger.error(f"Log eviction callback failed: {str(e)}")
+
+    def _open_active(self, first_seq):
+        self._active_first_seq = first_seq
+        self._active_path = os.path.join(self.segment_dir, f"{first_seq:012d}{self.RAW_SUFFIX}")
+        self._active = open(self._active_path, "a")
+        self._active_bytes = self._active.tell()
+        if self._active_bytes and not self._ends_with_newline(self._active_path):
+            # Terminate a torn last line so the next append starts cleanly
+            self._active.write("\n")
+            self._active_bytes += 1
+
+    def _ends_with_newline(self, path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _load(self):
+        """Replay segments from disk, skipping raw segments already covered by a compaction"""
+        compacted = []
+        raw = []
+        for name in os.listdir(self.segment_dir):
+            path = os.path.join(self.segment_dir, name)
+            if name.endswith(".tmp"):
+                # Leftover from an interrupted compaction, the raw segments are still there
+                os.remove(path)
+            elif name.endswith(self.COMPACTED_SUFFIX):
+                first, last = name[:-len(self.COMPACTED_SUFFIX)].split("-")
+                compacted.append((int(first), int(last), path))
+            elif name.endswith(self.RAW_SUFFIX):
+                raw.append((int(name[:-len(self.RAW_SUFFIX)]), path))
+
+        covered = [(first, last) for first, last, _ in compacted]
+        files = [(first, path, True) for first, _, path in compacted]
+        for first, path in raw:
+            if any(low <= first <= high for low, high in covered):
+                os.remove(path)
+            else:
+                files.append((first, path, False))
+        files.sort()
+        if files:
+            self._base_seq = files[0][0]
+
+        for index, (first, path, is_compacted) in enumerate(files):
+            expected = self._next_seq()
+            if first > expected:
+                logger.warning(f"Log segment {path} starts at seq {first}, after a gap from {expected}")
+                self._records.extend([None] * (first - expected))
+            elif first < expected:
+                logger.warning(f"Log segment {path} starts at seq {first}, overlapping seqs up to {expected - 1}")
+                del self._records[first - self._base_seq:]
+            self._records.extend(self._read_segment(path))
+            is_last = index == len(files) - 1
+            if is_last and not is_compacted:
+                # The newest raw segment stays the active segment
+                self._open_active(first)
+            else:
+                self._segments.append((first, self._next_seq() - 1, path, is_compacted))
+
+        if self._active is None:
+            self._open_active(self._next_seq())
+
+    def _load_index(self):
+        """Load the index snapshot and catch it up, or rebuild it from the replayed events"""
+        index = LogIndex.load(self.index_path, self.index_fields)
+        if index is None or index.covered > self._next_seq():
+            index = LogIndex(self.index_fields)
+        elif self._base_seq:
+            # The snapshot may predate the last eviction
+            index.evict_before(self._base_seq)
+        for seq in range(max(index.covered, self._base_seq), self._next_seq()):
+            record = self._records[seq - self._base_seq]
+            if record is not None:
+                index.add(seq, record)
+        self._index = index
+
+    def _read_segment(self, path):
+        """Yield a segment's records in order, with None in place of each corrupt line"""
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Torn write from a crash, the rest of the segment is still usable
+                    logger.warning(f"Skipping corrupt log line in {path}, its seq is left empty")
+                    yield None
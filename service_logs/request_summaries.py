@@ -0,0 +1,156 @@
+import bisect
+import threading
+
+
+class RequestSummaryTable:
+    """Request summaries maintained incrementally as logs are ingested.
+
+    Each log updates the summary of its request_id in O(log n): step count,
+    error flag, the request log (first `incoming_request_with_payload`,
+    falling back to `incoming_request`) and the `final_response`. Listed
+    summaries are kept ordered by request timestamp, so a page is a slice
+    of that order rather than a regroup of every stored log.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries = {}
+        self._ordered = []  # sorted [(timestamp, request_id)] of requests with a request log
+
+    def add(self, log):
+        req_id = log.get('request_id')
+        if not req_id:
+            return
+
+        with self._lock:
+            summary = self._summaries.get(req_id)
+            if summary is None:
+                summary = self._summaries[req_id] = {
+                    'request_id': req_id,
+                    'timestamp': None,
+                    'method': 'GET',
+                    'endpoint': '/unknown',
+                    'step_count': 0,
+                    'has_errors': False,
+                    'payload': None,
+                    'headers': None,
+                    'response': None,
+                    'status_code': None,
+                    'response_time_ms': None,
+                    '_main_action': None
+                }
+
+            summary['step_count'] += 1
+            if 'error' in log.get('level', '').lower() or 'ERROR' in log.get('to_service', ''):
+                summary['has_errors'] = True
+
+            action = log.get('action')
+            if action == 'incoming_request_with_payload' and summary['_main_action'] != action:
+                self._set_main_log(summary, log)
+            elif action == 'incoming_request' and summary['_main_action'] is None:
+                self._set_main_log(summary, log)
+            elif action == 'final_response':
+                summary['response'] = log.get('response')
+                summary['status_code'] = log.get('status_code')
+                summary['response_time_ms'] = log.get('response_time_ms')
+
+    def page(self, limit=100, cursor=None, since=None):
+        """Return (summaries newest first, next_cursor).
+
+        `cursor` is the `next_cursor` of the previous page; `since` restricts
+        the result to requests that started after that timestamp.
+        """
+        with self._lock:
+            end = len(self._ordered)
+            if cursor:
+                end = bisect.bisect_left(self._ordered, self._decode_cursor(cursor))
+
+            start = 0
+            if since is not None:
+                start = bisect.bisect_right(self._ordered, (since, '\uffff'))
+
+            first = max(start, end - limit)
+            keys = self._ordered[first:end]
+            page = [self._public(self._summaries[req_id]) for _, req_id in reversed(keys)]
+
+            next_cursor = None
+            if first > start and keys:
+                next_cursor = self._encode_cursor(keys[0])
+            return page, next_cursor
+
+    def get(self, req_id):
+        with self._lock:
+            summary = self._summaries.get(req_id)
+            return self._public(summary) if summary else None
+
+    def evict(self, logs):
+        """Account for logs evicted from the store.
+
+        A summary is dropped only when its request log was among them; a
+        request whose earlier steps went but whose request log is still
+        stored stays listed, with those steps taken off its step count.
+        """
+        with self._lock:
+            for log in logs:
+                summary = self._summaries.get(log.get('request_id'))
+                if summary is None:
+                    continue
+                if self._is_main_log(summary, log):
+                    del self._summaries[summary['request_id']]
+                    self._unlist(summary)
+                else:
+                    summary['step_count'] = max(0, summary['step_count'] - 1)
+
+    def clear(self):
+        with self._lock:
+            self._summaries = {}
+            self._ordered = []
+
+    # ============ Private Methods ===============
+    def _set_main_log(self, summary, log):
+        """Point the summary at a new request log, moving it in the time order"""
+        self._unlist(summary)
+
+        timestamp = self._timestamp(log)
+
+        summary['_main_action'] = log.get('action')
+        summary['timestamp'] = timestamp
+        summary['method'] = log.get('method', 'GET')
+        summary['endpoint'] = log.get('endpoint', '/unknown')
+        summary['payload'] = log.get('payload')
+        summary['headers'] = log.get('headers')
+        bisect.insort(self._ordered, (timestamp, summary['request_id']))
+
+    def _is_main_log(self, summary, log):
+        return (
+            summary['_main_action'] is not None
+            and log.get('action') == summary['_main_action']
+            and self._timestamp(log) == summary['timestamp']
+        )
+
+    def _unlist(self, summary):
+        """Take the summary out of the time order, if it is listed"""
+        if summary['_main_action'] is not None:
+            old_key = (summary['timestamp'], summary['request_id'])
+            index = bisect.bisect_left(self._ordered, old_key)
+            if index < len(self._ordered) and self._ordered[index] == old_key:
+                del self._ordered[index]
+
+    @staticmethod
+    def _timestamp(log):
+        timestamp = log.get('timestamp', 0)
+        return timestamp if isinstance(timestamp, (int, float)) else 0
+
+    @staticmethod
+    def _public(summary):
+        return {key: value for key, value in summary.items() if not key.startswith('_')}
+
+    @staticmethod
+    def _encode_cursor(key):
+        timestamp, req_id = key
+        return f"{timestamp!r}:{req_id}"
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        timestamp, _, req_id = cursor.partition(':')
+        return (float(timestamp), req_id)
@@ -1,14 +1,26 @@
 from flask import Flask, render_template, request, jsonify
-import requests
+from shared.http_client import get_http_client
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import json
+import os
+import threading
+import time
 
 app = Flask(__name__)
 
 # URL of logs service
 LOGS_SERVICE_URL = "http://service_logs:5000"
 
+# Recently viewed request traces, shared by the detail page and its step pages
+TRACE_CACHE_TTL = float(os.environ.get('TRACE_CACHE_TTL', 30))
+TRACE_CACHE_SIZE = int(os.environ.get('TRACE_CACHE_SIZE', 100))
+
+# Requests shown per page of the request list; older pages follow the logs service's next_cursor
+REQUEST_PAGE_SIZE = int(os.environ.get('REQUEST_PAGE_SIZE', 100))
+_trace_cache = OrderedDict()
+_trace_cache_lock = threading.Lock()
+
 @app.template_filter('timestamp_to_time')
 def timestamp_to_time(timestamp):
     """Convert timestamp to readable time"""
@@ -28,11 +40,15 @@ def timestamp_to_datetime(timestamp):
 
 @app.route('/', methods=['GET'])
 def request_list():
-    """Main page: Shows list of incoming requests"""
+    """Main page: Shows one page of incoming requests, newest first"""
     try:
+        cursor = request.args.get('cursor')
         # Use the new enhanced endpoint if available
         try:
-            response = requests.get(f"{LOGS_SERVICE_URL}/requests")
+            params = {'limit': REQUEST_PAGE_SIZE}
+            if cursor:
+                params['cursor'] = cursor
+            response = get_http_client().get(f"{LOGS_SERVICE_URL}/requests", params=params)
             if response.status_code == 200:
                 data = response.json()
                 request_summaries = data.get('requests', [])
@@ -42,12 +58,15 @@ def request_list():
                     req['formatted_time'] = timestamp_to_datetime(req.get('timestamp', 0))
                     req['status'] = 'Error' if req.get('has_errors') else 'Success'
                 
-                return render_template('request_list.html', requests=request_summaries)
+                # Only the first page polls for requests newer than its top row
+                newest = request_summaries[0].get('timestamp') if request_summaries and not cursor else None
+                return render_template('request_list.html', requests=request_summaries,
+                                       next_cursor=data.get('next_cursor'), cursor=cursor, newest=newest)
         except:
             pass  # Fall back to old method
         
         # Fallback: Fetch all logs and group manually (old method)
-        response = requests.get(f"{LOGS_SERVICE_URL}/logs", params={'limit': 1000})
+        response = get_http_client().get(f"{LOGS_SERVICE_URL}/logs", params={'limit': 1000})
         
         if response.status_code == 200:
             data = response.json()
@@ -102,127 +121,116 @@ def request_list():
     except Exception as e:
         return f"Error fetching requests: {str(e)}"
 
+@app.route('/requests/new', methods=['GET'])
+def new_requests():
+    """Number of requests logged after `since`, polled by the first page of the request list"""
+    try:
+        since = float(request.args.get('since', 0))
+        response = get_http_client().get(
+            f"{LOGS_SERVICE_URL}/requests", params={'since': since, 'limit': REQUEST_PAGE_SIZE}
+        )
+        response.raise_for_status()
+        data = response.json()
+        return jsonify({
+            'status': 'success',
+            'count': len(data.get('requests', [])),
+            'more': data.get('next_cursor') is not None
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid since parameter: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def fetch_request_trace(request_id, refresh=False):
+    """Get a request trace from the logs service, reusing a recently fetched copy"""
+    now = time.time()
+    with _trace_cache_lock:
+        cached = _trace_cache.get(request_id)
+        if cached and not refresh and now - cached[0] < TRACE_CACHE_TTL:
+            _trace_cache.move_to_end(request_id)
+            return cached[1]
+    
+    response = get_http_client().get(f"{LOGS_SERVICE_URL}/requests/{request_id}")
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    trace = response.json()
+    
+    with _trace_cache_lock:
+        _trace_cache[request_id] = (now, trace)
+        _trace_cache.move_to_end(request_id)
+        while len(_trace_cache) > TRACE_CACHE_SIZE:
+            _trace_cache.popitem(last=False)
+    return trace
+
 @app.route('/request/<request_id>')
 def request_detail(request_id):
     """Detail page: Shows detailed flow for a specific request with enhanced details"""
     try:
-        # Get all logs for this request
-        response = requests.get(f"{LOGS_SERVICE_URL}/logs", params={'limit': 1000})
+        # Always load a fresh trace here; step pages reuse it
+        trace = fetch_request_trace(request_id, refresh=True)
         
-        if response.status_code == 200:
-            data = response.json()
-            all_logs = data.get('logs', [])
-            
-            # Filter logs for this specific request
-            request_logs = [log for log in all_logs if log.get('request_id') == request_id]
-            
-            if not request_logs:
-                return f"No logs found for request ID: {request_id}"
-            
-            # Separate flow logs from payload/response logs
-            flow_logs = []
-            request_payload_log = None
-            response_data_log = None
-            request_info = {}
-            
-            for log in request_logs:
-                # Look for the incoming request with payload
-                if log.get('action') == 'incoming_request_with_payload':
-                    request_payload_log = log
-                    request_info = {
-                        'request_id': request_id,
-                        'method': log.get('method', 'POST'),
-                        'endpoint': log.get('endpoint', '/unknown'),
-                        'timestamp': log.get('timestamp'),
-                        'formatted_datetime': timestamp_to_datetime(log.get('timestamp', 0))
-                    }
-                    
-                # Look for the final response
-                elif log.get('action') == 'final_response':
-                    response_data_log = log
-                    
-                else:
-                    # Regular flow log - enhance with details
-                    enhanced_log = enhance_log_with_details(log)
-                    flow_logs.append(enhanced_log)
-            
-            # Sort flow logs by timestamp
-            flow_logs.sort(key=lambda x: x.get('timestamp', 0))
-            
-            # Add formatted time to flow logs
-            for log in flow_logs:
-                if 'timestamp' in log:
-                    log['formatted_time'] = timestamp_to_time(log['timestamp'])
-                else:
-                    log['formatted_time'] = "00:00:00"
-                
-                # IMPORTANT: Ensure details exists, even if empty
-                if 'details' not in log:
-                    log['details'] = []
-            
-            # Extract payload data
-            if request_payload_log:
-                request_payload = request_payload_log.get('payload', {})
-                if not request_info:  # If we didn't set it above
-                    request_info = {
-                        'request_id': request_id,
-                        'method': request_payload_log.get('method', 'POST'),
-                        'endpoint': request_payload_log.get('endpoint', '/unknown'),
-                        'timestamp': request_payload_log.get('timestamp'),
-                        'formatted_datetime': timestamp_to_datetime(request_payload_log.get('timestamp', 0))
-                    }
-            else:
-                request_payload = {'note': 'No request payload captured'}
-            
-            # Extract response data
-            if response_data_log:
-                # The response might be in 'response' field as JSON string or object
-                response_content = response_data_log.get('response')
-                if isinstance(response_content, str):
-                    try:
-                        # Try to parse JSON string
-                        response_content = json.loads(response_content)
-                    except:
-                        # If parsing fails, keep as string
-                        pass
-                
-                response_data = {
-                    'status_code': response_data_log.get('status_code', 200),
-                    'response_time_ms': response_data_log.get('response_time_ms', 0),
-                    'data': response_content
-                }
-            else:
-                response_data = {
-                    'status_code': 200,
-                    'response_time_ms': 0,
-                    'data': {'note': 'No response data captured'}
-                }
-            
-            # Set defaults if no request info found
-            if not request_info:
-                initial_log = flow_logs[0] if flow_logs else {}
-                request_info = {
-                    'request_id': request_id,
-                    'method': 'POST',
-                    'endpoint': '/unknown',
-                    'timestamp': initial_log.get('timestamp'),
-                    'formatted_datetime': timestamp_to_datetime(initial_log.get('timestamp', 0))
-                }
-            
-            # Add payload and response to request_info
-            request_info['payload'] = request_payload
-            request_info['response'] = response_data
-            
+        if not trace:
+            return f"No logs found for request ID: {request_id}"
+        
+        request_payload_log = trace.get('request_log')
+        response_data_log = trace.get('response_log')
+        
+        # Steps come back ordered oldest first - enhance copies so the cached trace stays untouched
+        flow_logs = []
+        for log in trace.get('steps', []):
+            enhanced_log = enhance_log_with_details(dict(log))
+            enhanced_log['formatted_time'] = timestamp_to_time(enhanced_log['timestamp']) if 'timestamp' in enhanced_log else "00:00:00"
+            flow_logs.append(enhanced_log)
+        
+        # Request info comes from the payload log when it was captured
+        if request_payload_log:
+            request_info = {
+                'request_id': request_id,
+                'method': request_payload_log.get('method', 'POST'),
+                'endpoint': request_payload_log.get('endpoint', '/unknown'),
+                'timestamp': request_payload_log.get('timestamp'),
+                'formatted_datetime': timestamp_to_datetime(request_payload_log.get('timestamp', 0))
+            }
+            request_payload = request_payload_log.get('payload', {})
         else:
-            flow_logs = []
+            initial_log = flow_logs[0] if flow_logs else {}
             request_info = {
                 'request_id': request_id,
-                'formatted_datetime': 'Unknown',
-                'method': 'Unknown',
-                'endpoint': 'Unknown',
-                'payload': {'error': 'Could not load request data'},
-                'response': {'error': 'Could not load response data'}
+                'method': 'POST',
+                'endpoint': '/unknown',
+                'timestamp': initial_log.get('timestamp'),
+                'formatted_datetime': timestamp_to_datetime(initial_log.get('timestamp', 0))
             }
+            request_payload = {'note': 'No request payload captured'}
+        
+        # Extract response data
+        if response_data_log:
+            # The response might be in 'response' field as JSON string or object
+            response_content = response_data_log.get('response')
+            if isinstance(response_content, str):
+                try:
+                    # Try to parse JSON string
+                    response_content = json.loads(response_content)
+                except:
+                    # If parsing fails, keep as string
+                    pass
+            
+            response_data = {
+                'status_code': response_data_log.get('status_code', 200),
+                'response_time_ms': response_data_log.get('response_time_ms', 0),
+                'data': response_content
+            }
+        else:
+            response_data = {
+                'status_code': 200,
+                'response_time_ms': 0,
+                'data': {'note': 'No response data captured'}
+            }
+        
+        # Add payload and response to request_info
+        request_info['payload'] = request_payload
+        request_info['response'] = response_data
             
         return render_template('request_detail.html', 
                              logs=flow_logs, 
@@ -235,93 +243,83 @@ def request_detail(request_id):
 def step_detail(request_id, step_index):
     """Detailed page for a specific step/sublog"""
     try:
-        # Get all logs for this request
-        response = requests.get(f"{LOGS_SERVICE_URL}/logs", params={'limit': 1000})
+        # Served from the trace cached by the detail page when still fresh
+        trace = fetch_request_trace(request_id)
         
-        if response.status_code == 200:
-            data = response.json()
-            all_logs = data.get('logs', [])
-            
-            # Filter logs for this specific request
-            request_logs = [log for log in all_logs if log.get('request_id') == request_id]
-            
-            if not request_logs:
-                return f"No logs found for request ID: {request_id}"
-            
-            # Sort by timestamp to match the order shown in flow
-            request_logs.sort(key=lambda x: x.get('timestamp', 0))
-            
-            # Get the specific step
-            if step_index <= 0 or step_index > len(request_logs):
-                return f"Invalid step index: {step_index}"
-            
-            step_log = request_logs[step_index - 1]  # Convert to 0-based index
-            
-            # Enhance the step with details
-            enhanced_step = enhance_log_with_details(step_log)
-            
-            # Add formatted time
-            enhanced_step['formatted_time'] = timestamp_to_time(enhanced_step.get('timestamp', 0))
-            enhanced_step['formatted_datetime'] = timestamp_to_datetime(enhanced_step.get('timestamp', 0))
-            
-            # Prepare step info for the template
-            step_info = {
-                'request_id': request_id,
-                'step_index': step_index,
-                'total_steps': len(request_logs),
-                'action': enhanced_step.get('action', 'Unknown'),
-                'from_service': enhanced_step.get('from_service', 'Unknown'),
-                'to_service': enhanced_step.get('to_service', 'Unknown'),
-                'timestamp': enhanced_step.get('timestamp'),
-                'formatted_datetime': enhanced_step['formatted_datetime'],
-                'formatted_time': enhanced_step['formatted_time'],
-                'level': enhanced_step.get('level', 'info'),
-                'message': enhanced_step.get('message', ''),
-                'details': enhanced_step.get('details', [])
-            }
-            
-            # Extract request data (if this step has it)
-            request_data = {
-                'method': enhanced_step.get('method'),
-                'endpoint': enhanced_step.get('endpoint'),
-                'headers': enhanced_step.get('headers', {}),
-                'payload': enhanced_step.get('payload'),
-                'params': enhanced_step.get('params')
-            }
-            
-            # Extract response data (if this step has it)
-            response_data = {
-                'status_code': enhanced_step.get('status_code'),
-                'response': enhanced_step.get('response'),
-                'response_time_ms': enhanced_step.get('response_time_ms'),
-                'headers': enhanced_step.get('response_headers', {})
-            }
-            
-            # Extract context/error data
-            context_data = {
-                'context': enhanced_step.get('context'),
-                'error': enhanced_step.get('error'),
-                'stack_trace': enhanced_step.get('stack_trace'),
-                'additional_data': enhanced_step.get('data')
-            }
-            
-            # Get navigation info (previous/next steps)
-            navigation = {
-                'has_previous': step_index > 1,
-                'has_next': step_index < len(request_logs),
-                'previous_step': step_index - 1 if step_index > 1 else None,
-                'next_step': step_index + 1 if step_index < len(request_logs) else None
-            }
-            
-            return render_template('step_detail.html',
-                                 step_info=step_info,
-                                 request_data=request_data,
-                                 response_data=response_data,
-                                 context_data=context_data,
-                                 navigation=navigation)
+        if not trace:
+            return f"No logs found for request ID: {request_id}"
         
-        else:
-            return f"Error fetching logs: {response.status_code}"
+        # Steps are numbered the same way as on the detail page
+        request_logs = trace.get('steps', [])
+        
+        # Get the specific step
+        if step_index <= 0 or step_index > len(request_logs):
+            return f"Invalid step index: {step_index}"
+        
+        step_log = request_logs[step_index - 1]  # Convert to 0-based index
+        
+        # Enhance a copy of the step with details
+        enhanced_step = enhance_log_with_details(dict(step_log))
+        
+        # Add formatted time
+        enhanced_step['formatted_time'] = timestamp_to_time(enhanced_step.get('timestamp', 0))
+        enhanced_step['formatted_datetime'] = timestamp_to_datetime(enhanced_step.get('timestamp', 0))
+        
+        # Prepare step info for the template
+        step_info = {
+            'request_id': request_id,
+            'step_index': step_index,
+            'total_steps': len(request_logs),
+            'action': enhanced_step.get('action', 'Unknown'),
+            'from_service': enhanced_step.get('from_service', 'Unknown'),
+            'to_service': enhanced_step.get('to_service', 'Unknown'),
+            'timestamp': enhanced_step.get('timestamp'),
+            'formatted_datetime': enhanced_step['formatted_datetime'],
+            'formatted_time': enhanced_step['formatted_time'],
+            'level': enhanced_step.get('level', 'info'),
+            'message': enhanced_step.get('message', ''),
+            'details': enhanced_step.get('details', [])
+        }
+        
+        # Extract request data (if this step has it)
+        request_data = {
+            'method': enhanced_step.get('method'),
+            'endpoint': enhanced_step.get('endpoint'),
+            'headers': enhanced_step.get('headers', {}),
+            'payload': enhanced_step.get('payload'),
+            'params': enhanced_step.get('params')
+        }
+        
+        # Extract response data (if this step has it)
+        response_data = {
+            'status_code': enhanced_step.get('status_code'),
+            'response': enhanced_step.get('response'),
+            'response_time_ms': enhanced_step.get('response_time_ms'),
+            'headers': enhanced_step.get('response_headers', {})
+        }
+        
+        # Extract context/error data
+        context_data = {
+            'context': enhanced_step.get('context'),
+            'error': enhanced_step.get('error'),
+            'stack_trace': enhanced_step.get('stack_trace'),
+            'additional_data': enhanced_step.get('data')
+        }
+        
+        # Get navigation info (previous/next steps)
+        navigation = {
+            'has_previous': step_index > 1,
+            'has_next': step_index < len(request_logs),
+            'previous_step': step_index - 1 if step_index > 1 else None,
+            'next_step': step_index + 1 if step_index < len(request_logs) else None
+        }
+        
+        return render_template('step_detail.html',
+                             step_info=step_info,
+                             request_data=request_data,
+                             response_data=response_data,
+                             context_data=context_data,
+                             navigation=navigation)
             
     except Exception as e:
         return f"Error fetching step details: {str(e)}"
@@ -388,7 +386,7 @@ def enhance_log_with_details(log):
 def clear_logs():
     """Clear all logs via UI"""
     try:
-        response = requests.post(f"{LOGS_SERVICE_URL}/logs/clear")
+        response = get_http_client().post(f"{LOGS_SERVICE_URL}/logs/clear")
         if response.status_code == 200:
             return jsonify({'status': 'success', 'message': 'Logs cleared'})
         else:
@@ -0,0 +1,9 @@
+# gunicorn.conf.py - production serving profile for service_logs_ui; the common settings are in shared/gunicorn_profile.py
+import os
+import sys
+
+# gunicorn reads this file before the app directory is on sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from shared.gunicorn_profile import profile  # noqa: E402
+
+globals().update(profile())
@@ -2,7 +2,10 @@ from flask import Flask, jsonify, request
 import json
 import os
 import logging
+import hashlib
+import threading
 import requests
+from shared.http_client import get_http_client
 
 app = Flask(__name__)
 
@@ -10,6 +13,13 @@ app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 app.logger.setLevel(logging.INFO)
 
+# Consumers told about saved mappings so they can drop their cached copy
+SERVICE_TRANSFORM = os.environ.get('SERVICE_TRANSFORM', 'http://service_transformer:5000')
+
+# Parsed mapping files keyed by path, reused until the file changes on disk
+_mapping_cache = {}
+_mapping_cache_lock = threading.Lock()
+
 @app.route('/api/entity-types', methods=['GET'])
 def get_entity_types():
     """Return available entity types for mapping"""
@@ -31,6 +41,33 @@ def get_service_mapping_directory(entity_type):
     }
     return service_directories.get(entity_type)
 
+def compute_mapping_version(mapping_data):
+    """Content hash of a mapping, used as its version and ETag"""
+    return hashlib.sha1(json.dumps(mapping_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+def load_mapping_file(mapping_file):
+    """Return (mapping_data, version), re-reading the file only when it changed"""
+    stat = os.stat(mapping_file)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _mapping_cache_lock:
+        cached = _mapping_cache.get(mapping_file)
+    if cached and cached[0] == signature:
+        return cached[1], cached[2]
+    
+    with open(mapping_file, 'r') as f:
+        mapping_data = json.load(f)
+    version = compute_mapping_version(mapping_data)
+    with _mapping_cache_lock:
+        _mapping_cache[mapping_file] = (signature, mapping_data, version)
+    return mapping_data, version
+
+def notify_mapping_changed(entity_type):
+    """Push a cache invalidation to the transformer, which passes it on to all of its workers; its cache TTL covers a lost push"""
+    try:
+        get_http_client().post(f"{SERVICE_TRANSFORM}/mappings/{entity_type}/invalidate", timeout=2)
+    except requests.RequestException as e:
+        app.logger.warning(f"Could not notify transformer about {entity_type} mapping change: {str(e)}")
+
 # API endpoint to get existing mappings
 @app.route('/mappings/<entity_type>', methods=['GET'])
 def get_mapping(entity_type):
@@ -42,9 +79,16 @@ def get_mapping(entity_type):
             return jsonify({"error": f"Unknown entity type: {entity_type}"}), 400        
         mapping_file = f"{service_mapping_dir}/{entity_type}_mapping.json"
         if os.path.exists(mapping_file):
-            with open(mapping_file, 'r') as f:
-                mapping_data = json.load(f)
-            return jsonify({"rules": mapping_data})
+            mapping_data, version = load_mapping_file(mapping_file)
+            etag = f'"{version}"'
+            
+            # Conditional GET - the caller's cached copy is still current
+            if request.if_none_match.contains(version):
+                return '', 304, {'ETag': etag}
+            
+            response = jsonify({"rules": mapping_data, "version": version})
+            response.headers['ETag'] = etag
+            return response
         else:
             return jsonify({"error": f"No mapping found for {entity_type} at {mapping_file}"}), 404
     except Exception as e:
@@ -71,8 +115,11 @@ def save_mapping(entity_type):
         # Write the file
         with open(mapping_file, 'w') as f:
             json.dump(mapping_data, f, indent=2)
+        
+        version = compute_mapping_version(mapping_data)
+        notify_mapping_changed(entity_type)
 
-        return jsonify({"status": "success", })
+        return jsonify({"status": "success", "version": version})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 import logging
 from services.project_service import ProjectService
+from shared.sync_jobs import SyncJobQueue
 
 
 project_bp = Blueprint('project', __name__)
@@ -8,19 +9,39 @@ logger = logging.getLogger(__name__)
 
 # Initialize services
 project_service = ProjectService()
+sync_jobs = SyncJobQueue.from_env(
+    project_service.sync_projects, kind="projects", default_db_path="./data/sync_jobs.db",
+    normalize=project_service.resolve_sync_params,
+)
+
+# Pick up jobs left queued or running by a previous process as soon as the app starts
+project_bp.record_once(lambda state: sync_jobs.start())
 
 
 @project_bp.route('/sync', methods=['POST'])
 def sync_projects():
-    """Sync projects from Oggo to HubSpot"""
+    """Queue a project sync from Oggo to HubSpot, or join an identical one already queued or running, and return its job ID"""
     try:
         params = request.json or {}
-        result = project_service.sync_projects(params)
-        return jsonify(result)
+        job = sync_jobs.submit(params, request_id=request.headers.get('X-Request-ID'))
+        response = jsonify(job)
+        response.status_code = 202
+        return response
+    except ValueError as e:
+        return jsonify({"error": f"Invalid sync parameters: {str(e)}"}), 400
     except Exception as e:
         logger.error(f"Error in project sync: {str(e)}")
         return jsonify({"error": f"Error in project sync: {str(e)}"}), 500
 
+
+@project_bp.route('/sync/<job_id>', methods=['GET'])
+def get_sync_job(job_id):
+    """Report the status and progress of a project sync job"""
+    job = sync_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Sync job {job_id} not found"}), 404
+    return jsonify(job)
+
 @project_bp.route('/projects', methods=['POST'])
 def create_project():
     """Create a new project"""
@@ -1,9 +1,14 @@
 import logging
 import os
 import requests
-import json
-from flask import request
 from shared.debugger_client import track_api_call, track_error, FlowTracker, track_response
+from shared.http_client import get_http_client
+from shared.ndjson import NDJSON_MIMETYPE, encode_ndjson, iter_ndjson, is_error_line
+from shared.hubspot_batch import HubSpotBatchWriter
+from shared.mapping_registry import MappingRegistry, MappingVersionConflict, PinnedMapping
+from shared.pipeline import Pipeline, Stage
+from shared.sync_jobs import parse_flag
+from shared.sync_state import SyncStateStore
 
 
 class ProjectService:
@@ -13,87 +18,230 @@ class ProjectService:
         self.logger = logging.getLogger(__name__)
         self.service_transform = os.environ.get('TRANSFORM_SERVICE_URL')
         self.service_connect = os.environ.get('SERVICE_CONNECT')
+        self.page_size = int(os.environ.get('PROJECT_SYNC_PAGE_SIZE', 100))
+        self.queue_size = int(os.environ.get('PROJECT_SYNC_QUEUE_SIZE', 2))
+        self.transform_workers = int(os.environ.get('PROJECT_SYNC_TRANSFORM_WORKERS', 2))
+        self.send_workers = int(os.environ.get('PROJECT_SYNC_SEND_WORKERS', 2))
+        self.batch_writer = HubSpotBatchWriter.from_env()
+        self.mapping_registry = MappingRegistry.from_env()
+        self.stream_transform = os.environ.get('TRANSFORM_STREAMING', 'false').lower() == 'true'
+        self.sync_state = SyncStateStore.from_env("./data/sync_state.db")
+        self.default_mode = os.environ.get('PROJECT_SYNC_MODE', 'incremental')
+        self.upsert_id_property = os.environ.get('HUBSPOT_UPSERT_ID_PROPERTY', 'oggo_id')
 
-    def sync_projects(self, params):
-        """Main method to sync projects from Oggo to HubSpot - COMPLETE VERSION"""
+    def resolve_sync_params(self, params):
+        """Sync params with this service's defaults filled in, so equivalent requests queue identical jobs.
+
+        Raises ValueError for a page_size or skip_unchanged that cannot be parsed.
+        """
+        resolved = dict(params or {})
+        resolved['mode'] = resolved.get('mode') or self.default_mode
+        resolved['page_size'] = int(resolved.get('page_size') or self.page_size)
+        resolved['skip_unchanged'] = parse_flag(resolved.get('skip_unchanged'), default=resolved['mode'] == 'incremental')
+        if not resolved.get('updated_since'):
+            resolved.pop('updated_since', None)
+        return resolved
+
+    def sync_projects(self, params, request_id=None, progress=None):
+        """Main method to sync projects from Oggo to HubSpot.
+
+        Projects are paged through Oggo and run through a fetch -> transform
+        -> send pipeline so the three steps overlap instead of running one
+        after another over the whole dataset. Runs as a background job,
+        reporting counts to `progress` (a JobProgress) as pages complete.
+
+        In `incremental` mode (the default) only projects updated since the
+        last successful sync are fetched and they are upserted into HubSpot
+        deals; `full` mode fetches everything and uses batch/create. Projects
+        whose mapped output is identical to what was last pushed are skipped
+        unless `skip_unchanged` is turned off (it is off by default in full mode).
+        """
+        tracker = FlowTracker(request_id)
         try:
-            request_id = request.headers.get('X-Request-ID') if request else None
-            tracker = FlowTracker(request_id)
+            page_size = int(params.get('page_size', self.page_size))
+            mode = params.get('mode', self.default_mode)
+            upsert = mode == 'incremental'
+            skip_unchanged = parse_flag(params.get('skip_unchanged'), default=upsert)
+            updated_since = params.get('updated_since') or (self.sync_state.get_watermark('projects') if upsert else None)
             
             # Step 1: Track call to connect service for fetching Oggo data
             track_api_call(tracker, "service_projects", "service_connect", "fetch_oggo_projects")
 
-            # Fetch projects from Oggo
-            projects = self._fetch_projects_from_oggo(params)
+            # Pin the pages of this sync to the mapping version current at its start (re-pinned if it is saved mid-run)
+            mapping = PinnedMapping(self.mapping_registry, 'project')
+
+            # Fetch projects from Oggo page by page; transform and send run as pipeline stages
+            pipeline = Pipeline([
+                Stage("transform", lambda projects: self._transform_page(projects, tracker, mapping), self.transform_workers),
+                Stage("send", lambda transformed_data: self._send_page(transformed_data, tracker, progress, upsert, skip_unchanged), self.send_workers),
+            ], queue_size=self.queue_size, name="project-sync")
+            fetched = []
+            high_water = [updated_since]
+
+            def on_page_fetched(projects):
+                fetched.append(len(projects))
+                high_water.append(max((project.get('updated_at') or '' for project in projects), default=None))
+                if progress:
+                    progress.add(pages=1, fetched=len(projects))
+
+            outcome = pipeline.run(
+                self._iter_project_pages(page_size, request_id, updated_since), on_source_item=on_page_fetched
+            )
+            if progress and outcome["errors"]:
+                progress.add(errors=len(outcome["errors"]))
             
-            if not projects:
+            if not fetched:
                 # NEW: Track response back to gateway even for empty results
                 track_response(tracker, "service_projects", "gateway")
-                return {"message": "No projects found to sync"}
-            
-            # Step 2: Track call to transformer service
-            track_api_call(tracker, "service_projects", "service_transformer", "transform_data")
-
-            # Transform projects
-            transformed_data = self._transform_projects(projects)
+                return {"message": "No projects found to sync", "mode": mode, "updated_since": updated_since}
             
-            # Step 3: Track call to connect service for sending to HubSpot
-            track_api_call(tracker, "service_projects", "service_connect", "send_to_hubspot")
+            errors = [error["message"] for error in outcome["errors"]]
+            for page_result in outcome["results"]:
+                errors.extend(page_result["errors"])
 
-            # Send to HubSpot
-            hubspot_response = self._send_to_hubspot(transformed_data)
+            # Only a clean run may move the watermark, otherwise failed records would never be retried
+            watermark = max(value for value in high_water if value) if any(high_water) else None
+            if not errors:
+                self.sync_state.set_watermark('projects', watermark)
             
             # NEW: Track response from projects service back to gateway
             track_response(tracker, "service_projects", "gateway")
             
             return {
-                "status": "success",
-                "message": f"Successfully processed {len(projects)} projects",
-                "data": transformed_data,
-                "hubspot_response": hubspot_response,
+                "status": "success" if not errors else "partial_success",
+                "message": f"Successfully processed {sum(fetched)} projects",
+                "mode": mode,
+                "updated_since": updated_since,
+                "watermark": watermark if not errors else updated_since,
+                "pages": len(fetched),
+                "fetched": sum(fetched),
+                "transformed": sum(page_result["transformed"] for page_result in outcome["results"]),
+                "skipped": sum(page_result["skipped"] for page_result in outcome["results"]),
+                "skipped_no_id": sum(page_result["skipped_no_id"] for page_result in outcome["results"]),
+                "sent": sum(page_result["sent"] for page_result in outcome["results"]),
+                "errors": errors,
+                "elapsed": outcome["elapsed"],
+                "stages": outcome["stages"],
+                "mapping_versions": mapping.versions,
             }
             
         except Exception as e:
             # NEW: Track response back to gateway even for errors
-            request_id = request.headers.get('X-Request-ID') if request else None
             if request_id:
-                tracker = FlowTracker(request_id)
                 track_response(tracker, "service_projects", "gateway")
             
             track_error(tracker, "service_projects", str(e), f"Params: {params}")
             raise e
+
+    def _transform_page(self, projects, tracker, mapping=None):
+        """Pipeline stage: transform one page of projects, re-pinning the mapping if it was saved mid-sync"""
+        # Step 2: Track call to transformer service
+        track_api_call(tracker, "service_projects", "service_transformer", "transform_data")
+        try:
+            transformed_data = self._transform_projects(projects, tracker.request_id, mapping.version if mapping else None)
+        except MappingVersionConflict as conflict:
+            if mapping is None:
+                raise
+            transformed_data = self._transform_projects(projects, tracker.request_id, mapping.repin(conflict))
+        if not transformed_data:
+            raise Exception("Transform service returned no data for project page")
+        return transformed_data
+
+    def _send_page(self, transformed_data, tracker, progress=None, upsert=False, skip_unchanged=False):
+        """Pipeline stage: send one transformed page to HubSpot, skipping records unchanged since their last push"""
+        records = transformed_data.get('projects', [])
+        sendable = records
+        if upsert:
+            # An upsert needs the Oggo id; without one HubSpot would be sent the literal "None"
+            sendable = [record for record in records if record.get('hubspot_id') not in (None, '')]
+            if len(sendable) < len(records):
+                # Reported, but not an error: retrying cannot fix a missing id, so it must not hold back the watermark
+                self.logger.warning(f"{len(records) - len(sendable)} projects have no hubspot_id and were not upserted")
+
+        if skip_unchanged:
+            changed, hashes = self.sync_state.filter_changed('projects', sendable, 'hubspot_id')
+        else:
+            changed, hashes = sendable, self.sync_state.hash_records(sendable, 'hubspot_id')
+
+        if changed:
+            # Step 3: Track call to connect service for sending to HubSpot
+            track_api_call(tracker, "service_projects", "service_connect", "send_to_hubspot")
+            hubspot_response = self._send_to_hubspot({'projects': changed}, tracker.request_id, upsert)
+        else:
+            hubspot_response = {"results": [], "errors": []}
+
+        # Remember what was pushed only when the whole page went through
+        if not hubspot_response["errors"]:
+            self.sync_state.save_hashes('projects', hashes)
+        
+        page_result = {
+            "transformed": len(records),
+            "skipped": len(sendable) - len(changed),
+            "skipped_no_id": len(records) - len(sendable),
+            "sent": len(hubspot_response["results"]),
+            "errors": [error["message"] for error in hubspot_response["errors"]],
+        }
+        if progress:
+            progress.add(
+                transformed=page_result["transformed"], skipped=page_result["skipped"],
+                skipped_no_id=page_result["skipped_no_id"],
+                sent=page_result["sent"], errors=len(page_result["errors"])
+            )
+        return page_result
+
+    def _iter_project_pages(self, page_size, request_id=None, updated_since=None):
+        """Yield pages of projects from Oggo, following the paging cursor"""
+        after = None
+        while True:
+            projects, after = self._fetch_projects_from_oggo(page_size, after, request_id, updated_since)
+            if projects:
+                yield projects
+            if not after:
+                return
         
-    def _fetch_projects_from_oggo(self, params):
-        """Fetch projects from Oggo via proxy service"""
-        url, headers = self._build_oggo_request()
+    def _fetch_projects_from_oggo(self, page_size, after=None, request_id=None, updated_since=None):
+        """Fetch one page of projects from Oggo via proxy service, returning (projects, next_cursor)"""
+        url, headers, params = self._build_oggo_request(page_size, after, updated_since)
         try:
-            response = requests.get(url, headers=headers)
+            response = get_http_client().get(url, headers=headers, params=params)
             response.raise_for_status()
-            projects = response.json()
+            body = response.json()
             
             # Track receiving response from connect service
-            request_id = request.headers.get('X-Request-ID') if request else None
             if request_id:
                 tracker = FlowTracker(request_id)
                 track_response(tracker, "service_connect", "service_projects")
             
-            return projects
+            # An unpaginated API answers with the whole list
+            if isinstance(body, list):
+                return body, None
+            next_cursor = body.get('paging', {}).get('next', {}).get('after')
+            return body.get('results', []), next_cursor
         except requests.RequestException as e:
             error_msg = f"Failed to fetch projects from Oggo: {str(e)}"
             raise Exception(error_msg)
     
-    def _build_oggo_request(self):
+    def _build_oggo_request(self, page_size, after=None, updated_since=None):
         """Build the request configuration for Oggo API"""
         url = f"{self.service_connect}/proxy/oggo/projects"
         headers = {"Content-Type": "application/json"}
-        return url, headers
+        params = {"limit": page_size}
+        if after:
+            params["after"] = after
+        if updated_since:
+            params["updated_since"] = updated_since
+        return url, headers, params
     
-    def _transform_projects(self, projects):
+    def _transform_projects(self, projects, request_id=None, mapping_version=None):
         """Transform projects using the transformation service"""
-        url, headers, payload = self._build_transform_request(projects)
+        if self.stream_transform:
+            return self._transform_projects_streaming(projects, request_id, mapping_version)
+        url, headers, payload = self._build_transform_request(projects, mapping_version)
 
         try:
-            response = requests.post(url, headers=headers, json=payload)
+            response = get_http_client().post(url, headers=headers, json=payload)
+            if response.status_code == 409:
+                raise MappingVersionConflict('project', mapping_version, response.json().get('version'))
             if response.status_code != 200:
                 raise Exception(f"Transform service error: {response.text}")
             
@@ -104,7 +252,6 @@ class ProjectService:
             transformed_data = response.json()
             
             # Track receiving response from transformer service
-            request_id = request.headers.get('X-Request-ID') if request else None
             if request_id:
                 tracker = FlowTracker(request_id)
                 track_response(tracker, "service_transformer", "service_projects")
@@ -115,39 +262,64 @@ class ProjectService:
             self.logger.error(error_msg)
             raise Exception(error_msg)
         
-    def load_mapping(self, mapping_file):
-        """Load mapping configuration from JSON file"""
-        try:
-            with open(mapping_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            raise e
     
-    def _build_transform_request(self, projects):
+    def _transform_projects_streaming(self, projects, request_id=None, mapping_version=None):
+        """Transform projects through the NDJSON streaming endpoint, reading results as they are produced"""
+        url = f"{self.service_transform}/transform/stream"
+        headers = {"Content-Type": NDJSON_MIMETYPE, "X-Entity-Type": "project"}
+        if mapping_version:
+            headers["X-Mapping-Version"] = mapping_version
+
+        try:
+            response = get_http_client().post(url, headers=headers, data=encode_ndjson(projects), stream=True)
+            try:
+                if response.status_code == 409:
+                    raise MappingVersionConflict('project', mapping_version, response.json().get('version'))
+                if response.status_code != 200:
+                    raise Exception(f"Transform service error: {response.text}")
+
+                transformed = []
+                for record in iter_ndjson(response.iter_lines()):
+                    if is_error_line(record):
+                        raise Exception(f"Transform service error at line {record['line']}: {record['error']}")
+                    transformed.append(record)
+            finally:
+                response.close()
+
+            # Track receiving response from transformer service
+            if request_id:
+                tracker = FlowTracker(request_id)
+                track_response(tracker, "service_transformer", "service_projects")
+
+            return {"projects": transformed}
+
+        except requests.RequestException as e:
+            error_msg = f"Failed to stream projects through transformer: {str(e)}"
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+
+    def _build_transform_request(self, projects, mapping_version=None):
         """Build the request configuration for Transform service"""
         url = f"{self.service_transform}/transform"
         headers = {"Content-Type": "application/json"}
+        # The transformer resolves the mapping itself; only its version is sent
         payload = {
             "data": projects,
-            "entity_type": "project",  
-            "mapping_file": self.load_mapping('./mappings/project_mapping.json')
+            "entity_type": "project",
+            "mapping_version": mapping_version
         }
         return url, headers, payload
 
-    def _send_to_hubspot(self, transformed_data):
-        """Send transformed data to HubSpot via connect service"""
-        url, headers, payload = self._build_hubspot_request(transformed_data)
+    def _send_to_hubspot(self, transformed_data, request_id=None, upsert=False):
+        """Send transformed data to HubSpot via connect service in concurrent 100-record chunks"""
+        url, headers, payload = self._build_hubspot_request(transformed_data, upsert)
 
         try:
-            response = requests.post(url=url, headers=headers, json=payload)
-            if response.status_code not in [200, 201]:
-                error_msg = f"HubSpot API error: Status code {response.status_code}"
-                raise Exception(error_msg)
-            
-            hubspot_response = response.json()
+            hubspot_response = self.batch_writer.write(url, payload["inputs"], headers=headers)
+            if hubspot_response["status"] == "ERROR":
+                raise Exception(hubspot_response["errors"][0]["message"])
             
             # Track receiving response from connect service
-            request_id = request.headers.get('X-Request-ID') if request else None
             if request_id:
                 tracker = FlowTracker(request_id)
                 track_response(tracker, "service_connect", "service_projects")
@@ -158,12 +330,26 @@ class ProjectService:
             error_msg = f"Failed to sync projects to HubSpot: {str(e)}"
             raise Exception(error_msg)
     
-    def _build_hubspot_request(self, transformed_data):
+    def _build_hubspot_request(self, transformed_data, upsert=False):
         """Build the request configuration for HubSpot API"""
         # In HubSpot, projects are usually deals
-        url = f"{self.service_connect}/proxy/hubspot/crm/v3/objects/deals/batch/create"
         headers = {"Content-Type": "application/json"}
         hubspot_projects = transformed_data.get('projects', [])
+        if upsert:
+            # Upsert keyed on the Oggo id so re-sent projects update instead of duplicating
+            url = f"{self.service_connect}/proxy/hubspot/crm/v3/objects/deals/batch/upsert"
+            payload = {
+                "inputs": [
+                    {
+                        "idProperty": self.upsert_id_property,
+                        "id": str(project['hubspot_id']),
+                        "properties": project.get('properties', {})
+                    } for project in hubspot_projects if project.get('hubspot_id') not in (None, '')
+                ]
+            }
+            return url, headers, payload
+
+        url = f"{self.service_connect}/proxy/hubspot/crm/v3/objects/deals/batch/create"
         payload = {
             "inputs": [
                 {
@@ -1,27 +1,39 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+import json
 import logging
-import requests
+import os
 from shared.debugger_client import track_api_call, track_error, FlowTracker, track_response
+from shared.ndjson import NDJSON_MIMETYPE
+from shared.mapping_registry import MappingRegistry
+from mapping_engine import compile_mapping
+from parallel_transform import ParallelTransformer
 
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Mapping rules cached per entity type, revalidated with ETags
+mapping_registry = MappingRegistry.from_env()
+
+# Large batches are sharded across a process pool
+parallel_transformer = ParallelTransformer.from_env()
+
+# Records transformed and flushed together by /transform/stream
+STREAM_BATCH_SIZE = int(os.environ.get('TRANSFORM_STREAM_BATCH', 500))
+
 
 def get_mapping_from_service(entity_type):
-    """Get mapping from the mapping service"""
-    try:
-        response = requests.get(f'http://service_mapping:5000/mappings/{entity_type}')
-        if response.status_code == 200:
-            mapping_data = response.json()
-            return mapping_data.get('rules', {})
-        else:
-            logger.error(f"Failed to fetch mapping from service: {response.status_code}")
-            return {}
-    except Exception as e:
-        logger.error(f"Error fetching mapping from service: {str(e)}")
-        return {}
+    """Get mapping rules, served from the local cache in the steady state"""
+    return mapping_registry.get(entity_type)
+
+
+@app.route('/mappings/<entity_type>/invalidate', methods=['POST'])
+def invalidate_mapping(entity_type):
+    """Called by service_mapping when a mapping is saved"""
+    mapping_registry.invalidate(entity_type)
+    logger.info(f"Mapping cache invalidated for {entity_type}")
+    return jsonify({"status": "success"})
 
 
 
@@ -132,9 +144,10 @@ def transform_data():
         if not request_data:
             return jsonify({"error": "No data provided"}), 400
         
-        # Extract parameters
+        # Extract parameters - the mapping is referenced by entity type and version, never sent
         data = request_data.get('data', [])
         entity_type = request_data.get('entity_type', '')
+        expected_version = request_data.get('mapping_version')
         
         if not entity_type:
             return jsonify({"error": "entity_type is required"}), 400
@@ -144,16 +157,22 @@ def transform_data():
         
         # Track getting mapping from service
         track_api_call(tracker, "service_transformer", "service_mapping", "get_mapping_rules")
-        mapping_rules = get_mapping_from_service(entity_type)
+        mapping_rules, version = mapping_registry.get_versioned(entity_type, expected_version)
         
         if not mapping_rules:
             error_msg = f"No mapping rules found for entity type: {entity_type}"
             logger.error(error_msg)
             return jsonify({"error": error_msg}), 404
+        if expected_version and version != expected_version:
+            return jsonify({
+                "error": f"Mapping version {expected_version} is not current for {entity_type}",
+                "version": version
+            }), 409
         
         # Track transformation process
         track_api_call(tracker, "service_transformer", "internal", "apply_mapping_rules")
-        transformed_data = transform_using_mapping(data, mapping_rules, entity_type)
+        transformed_data = parallel_transformer.transform(data, mapping_rules, entity_type)
+        transformed_data['metadata']['mapping_version'] = version
         
         # Track completion
         track_api_call(tracker, "service_transformer", "internal", "transformation_completed")
@@ -168,6 +187,74 @@ def transform_data():
         logger.error(f"Error in transform: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/transform/stream', methods=['POST'])
+def transform_stream():
+    """Transform NDJSON records into NDJSON as they arrive.
+
+    The entity type comes from the X-Entity-Type header and, optionally, the
+    mapping version the caller expects from X-Mapping-Version. Records are
+    read, transformed and written back in batches of STREAM_BATCH_SIZE, so
+    neither side holds the whole dataset. A malformed line ends the stream
+    with a {"error": ..., "line": n} record.
+
+    Output starts flowing before the input has ended. Clients that send
+    the whole body before reading (as requests does) should keep each call
+    to a page of records, or the response can fill the socket buffers.
+    """
+    request_id = request.headers.get('X-Request-ID')
+    tracker = FlowTracker(request_id)
+    entity_type = request.headers.get('X-Entity-Type', '')
+    expected_version = request.headers.get('X-Mapping-Version')
+
+    if not entity_type:
+        return jsonify({"error": "X-Entity-Type header is required"}), 400
+
+    track_api_call(tracker, "service_transformer", "service_mapping", "get_mapping_rules")
+    mapping_rules, version = mapping_registry.get_versioned(entity_type, expected_version)
+    if not mapping_rules:
+        return jsonify({"error": f"No mapping rules found for entity type: {entity_type}"}), 404
+    if expected_version and version != expected_version:
+        return jsonify({
+            "error": f"Mapping version {expected_version} is not current for {entity_type}",
+            "version": version
+        }), 409
+
+    plan = compile_mapping(mapping_rules, entity_type)
+    track_api_call(tracker, "service_transformer", "internal", "apply_mapping_rules")
+
+    def generate():
+        batch = []
+        line_number = 0
+        try:
+            for line in request.stream:
+                line_number += 1
+                line = line.strip()
+                if not line:
+                    continue
+                batch.append(json.loads(line))
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield _encode_rows(plan, batch)
+                    batch = []
+            if batch:
+                yield _encode_rows(plan, batch)
+        except Exception as e:
+            logger.error(f"Error in streaming transform at line {line_number}: {str(e)}")
+            track_error(tracker, "service_transformer", str(e), f"Streaming transform line {line_number}")
+            yield (json.dumps({"error": str(e), "line": line_number}) + "\n").encode('utf-8')
+            return
+        track_response(tracker, "service_transformer", _detect_calling_service_from_entity(entity_type))
+
+    response = Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    if version:
+        response.headers['X-Mapping-Version'] = version
+    return response
+
+
+def _encode_rows(plan, batch):
+    apply = plan.apply
+    return ("\n".join(json.dumps(apply(item), separators=(',', ':')) for item in batch) + "\n").encode('utf-8')
+
+
 def _detect_calling_service_from_entity(entity_type):
     """Detect calling service from entity type"""
     if entity_type == 'contact':
@@ -177,41 +264,5 @@ def _detect_calling_service_from_entity(entity_type):
     else:
         return "service_unknown"
 
-def transform_using_mapping(data, mapping_rules, entity_type):
-    result = {}
-    transformed_items = []
-    
-    for item in data:
-        transformed_item = {}
-        
-        # Set default hubspot_id to null for contacts
-        if entity_type == 'contact':
-            transformed_item['hubspot_id'] = item.get('id')
-        
-        # For each field in the mapping rules
-        for source_field, target_field in mapping_rules.items():
-            if source_field in item:
-                # Handle nested properties
-                if '.' in target_field:
-                    parts = target_field.split('.')
-                    parent = parts[0]
-                    child = parts[1]
-                    
-                    if parent not in transformed_item:
-                        transformed_item[parent] = {}
-                    transformed_item[parent][child] = item[source_field]
-                else:
-                    # Direct field mapping
-                    transformed_item[target_field] = item[source_field]
-        
-        transformed_items.append(transformed_item)
-    
-    # Package according to entity type
-    if entity_type == 'contact':
-        result['contacts'] = transformed_items
-    else:
-        result[f"{entity_type}s"] = transformed_items
-    return result
-
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
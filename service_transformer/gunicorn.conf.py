@@ -0,0 +1,11 @@
+# gunicorn.conf.py - production serving profile for service_transformer; the common settings are in shared/gunicorn_profile.py
+import os
+import sys
+
+# gunicorn reads this file before the app directory is on sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from shared.gunicorn_profile import profile  # noqa: E402
+
+# Large batches already fan out to a process pool per worker (TRANSFORM_WORKERS),
+# so keep the number of gunicorn workers small to avoid oversubscribing the CPUs
+globals().update(profile(timeout=120))
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from itertools import repeat
+from operator import itemgetter
+
+# Batches at least this large use the columnar path; 0 turns it off
+COLUMNAR_THRESHOLD = int(os.environ.get('TRANSFORM_COLUMNAR_THRESHOLD', 10000))
+
+
+class MappingPlan:
+    """A mapping compiled once and applied to many records.
+
+    Target paths are split up front into tuples of keys. Digit segments
+    after the first one are list indexes, so both `properties.nested.deep.value`
+    and `properties.array_field.0` keep their full depth. Rules are grouped
+    by parent path, so each record builds a parent container once and then
+    sets every leaf under it.
+    """
+
+    def __init__(self, mapping_rules, entity_type):
+        self.entity_type = entity_type
+        self.include_id = entity_type == 'contact'
+        self.top_level = []     # [(source_field, key)]
+        self.flat_groups = []   # [(key, [(source_field, leaf)])] one dict level below the root
+        self.groups = []        # [(parent_path, [(source_field, leaf)])] anything deeper or indexed
+
+        groups = OrderedDict()
+        for source_field, target_field in mapping_rules.items():
+            path = self._parse_path(target_field)
+            if len(path) == 1:
+                self.top_level.append((source_field, path[0]))
+            else:
+                groups.setdefault(path[:-1], []).append((source_field, path[-1]))
+        for parent_path, leaves in groups.items():
+            if len(parent_path) == 1 and not any(isinstance(leaf, int) for _, leaf in leaves):
+                self.flat_groups.append((parent_path[0], leaves))
+            else:
+                self.groups.append((parent_path, leaves))
+
+    def apply(self, item):
+        """Transform one source record"""
+        transformed_item = {}
+
+        # Set default hubspot_id to the source id for contacts
+        if self.include_id:
+            transformed_item['hubspot_id'] = item.get('id')
+
+        for source_field, key in self.top_level:
+            if source_field in item:
+                transformed_item[key] = item[source_field]
+
+        # Common case (e.g. properties.*) built with a single comprehension
+        for key, leaves in self.flat_groups:
+            values = {leaf: item[source_field] for source_field, leaf in leaves if source_field in item}
+            if values:
+                existing = transformed_item.get(key)
+                if isinstance(existing, dict):
+                    existing.update(values)
+                else:
+                    transformed_item[key] = values
+
+        self._apply_groups(item, transformed_item)
+        return transformed_item
+
+    def apply_columnar(self, data):
+        """Transform a batch block by block; same output as applying `apply` to each record.
+
+        Source fields present in every record of the batch are read for all
+        records at once with one itemgetter per output block (the top level
+        and each `properties`-style group) and zipped straight into the
+        output dicts, so those cells never pass through the interpreter
+        loop. Only fields missing from some records, and deeper or indexed
+        groups, are placed record by record.
+        """
+        if not data or not self._columnar_safe():
+            return [self.apply(item) for item in data]
+
+        needed = {source_field for source_field, _ in self.top_level}
+        needed.update(source_field for _, leaves in self.flat_groups + self.groups for source_field, _ in leaves)
+        if self.include_id:
+            needed.add('id')
+
+        # Assume every record carries every field (the usual case for a bulk export); the first
+        # missing one raises KeyError and the batch is redone knowing which fields are sparse
+        try:
+            return self._apply_blocks(data, needed)
+        except KeyError:
+            return self._apply_blocks(data, needed.intersection(*data))
+
+    def _apply_blocks(self, data, dense):
+        """apply_columnar for a known set of fields present in every record"""
+        top = [(source_field, key) for source_field, key in self.top_level if source_field in dense]
+        sparse_top = [(source_field, key) for source_field, key in self.top_level if source_field not in dense]
+        if self.include_id:
+            if 'id' in dense:
+                top.insert(0, ('id', 'hubspot_id'))
+            else:
+                sparse_top.insert(0, (None, 'hubspot_id'))
+        rows = _zip_dicts(data, top) if top else [{} for _ in data]
+
+        for source_field, key in sparse_top:
+            for row, item in zip(rows, data):
+                if source_field is None:
+                    row.setdefault(key, item.get('id'))
+                elif source_field in item:
+                    row[key] = item[source_field]
+
+        for key, leaves in self.flat_groups:
+            dense_leaves = [(source_field, leaf) for source_field, leaf in leaves if source_field in dense]
+            sparse_leaves = [(source_field, leaf) for source_field, leaf in leaves if source_field not in dense]
+            if dense_leaves:
+                for row, values in zip(rows, _zip_dicts(data, dense_leaves)):
+                    row[key] = values
+            if sparse_leaves:
+                for row, item in zip(rows, data):
+                    values = {leaf: item[source_field] for source_field, leaf in sparse_leaves if source_field in item}
+                    if not values:
+                        continue
+                    if dense_leaves:
+                        row[key].update(values)
+                    else:
+                        row[key] = values
+
+        # Deeper dict-only groups whose fields are all dense: build the leaf dicts in one go
+        # and only walk the parent path per record; anything else goes through _ensure_path
+        remaining = []
+        for parent_path, leaves in self.groups:
+            is_dict_path = not any(isinstance(key, int) for key in parent_path[1:])
+            if is_dict_path and not any(isinstance(leaf, int) for _, leaf in leaves) \
+                    and all(source_field in dense for source_field, _ in leaves):
+                for row, values in zip(rows, _zip_dicts(data, leaves)):
+                    node = row
+                    for key in parent_path:
+                        child = node.get(key)
+                        if not isinstance(child, dict):
+                            child = node[key] = {}
+                        node = child
+                    node.update(values)
+            else:
+                remaining.append((parent_path, leaves))
+
+        if remaining:
+            for item, row in zip(data, rows):
+                self._apply_groups(item, row, remaining)
+        return rows
+
+    def _apply_groups(self, item, transformed_item, groups=None):
+        for parent_path, leaves in (self.groups if groups is None else groups):
+            container = None
+            for source_field, leaf in leaves:
+                if source_field in item:
+                    if container is None:
+                        container = _ensure_path(transformed_item, parent_path, leaf)
+                    _assign(container, leaf, item[source_field])
+
+    def _columnar_safe(self):
+        """Columns can only be zipped independently when no key is written by two rules"""
+        top_keys = [key for _, key in self.top_level]
+        if self.include_id:
+            top_keys = [key for key in top_keys if key != 'hubspot_id']
+        all_keys = top_keys + [key for key, _ in self.flat_groups]
+        return len(set(all_keys)) == len(all_keys)
+
+    @staticmethod
+    def _parse_path(target_field):
+        parts = target_field.split('.')
+        return (parts[0],) + tuple(int(part) if part.isdigit() else part for part in parts[1:])
+
+
+def _ensure_path(root, path, leaf):
+    """Walk/create the containers along path; a child is a list when the key below it is an index"""
+    node = root
+    for position, key in enumerate(path):
+        next_key = path[position + 1] if position + 1 < len(path) else leaf
+        child = _get(node, key)
+        if isinstance(next_key, int):
+            if not isinstance(child, list):
+                child = []
+                _assign(node, key, child)
+        elif not isinstance(child, dict):
+            child = {}
+            _assign(node, key, child)
+        node = child
+    return node
+
+
+def _zip_dicts(data, pairs):
+    """[{target: item[source] for source, target in pairs} for item in data], built without a Python-level loop"""
+    sources = [source for source, _ in pairs]
+    targets = [target for _, target in pairs]
+    # itemgetter returns a bare value for one field; asking twice keeps it a tuple and zip stops at one target
+    getter = itemgetter(*sources) if len(sources) > 1 else itemgetter(sources[0], sources[0])
+    return list(map(dict, map(zip, repeat(targets), map(getter, data))))
+
+
+def _get(node, key):
+    if isinstance(node, list):
+        return node[key] if isinstance(key, int) and key < len(node) else None
+    return node.get(key)
+
+
+def _assign(node, key, value):
+    if isinstance(node, list):
+        if not isinstance(key, int):
+            return
+        if key >= len(node):
+            node.extend([None] * (key + 1 - len(node)))
+        node[key] = value
+    else:
+        node[key] = value
+
+
+_plan_cache = OrderedDict()
+_plan_cache_lock = threading.Lock()
+PLAN_CACHE_SIZE = 32
+
+
+def mapping_hash(mapping_rules):
+    """Stable hash of a mapping's content"""
+    return hashlib.sha1(json.dumps(mapping_rules, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def compile_mapping(mapping_rules, entity_type):
+    """Return the compiled plan for a mapping, reusing a cached one for identical rules"""
+    key = (mapping_hash(mapping_rules), entity_type)
+    with _plan_cache_lock:
+        plan = _plan_cache.get(key)
+        if plan is not None:
+            _plan_cache.move_to_end(key)
+            return plan
+
+    plan = MappingPlan(mapping_rules, entity_type)
+    with _plan_cache_lock:
+        _plan_cache[key] = plan
+        while len(_plan_cache) > PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return plan
+
+
+def package_result(transformed_items, entity_type):
+    """Package transformed records according to entity type"""
+    if entity_type == 'contact':
+        return {'contacts': transformed_items}
+    return {f"{entity_type}s": transformed_items}
+
+
+def transform_using_mapping(data, mapping_rules, entity_type, columnar_threshold=None):
+    """Transform a batch, switching to the columnar path for large batches"""
+    plan = compile_mapping(mapping_rules, entity_type)
+    threshold = COLUMNAR_THRESHOLD if columnar_threshold is None else columnar_threshold
+    if threshold and len(data) >= threshold:
+        return package_result(plan.apply_columnar(data), entity_type)
+    apply = plan.apply
+    return package_result([apply(item) for item in data], entity_type)
@@ -0,0 +1,180 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from mapping_engine import COLUMNAR_THRESHOLD, compile_mapping, mapping_hash, package_result, transform_using_mapping
+
+# Set in each pool worker by _init_worker
+_worker_plan = None
+
+
+def _init_worker(mapping_rules, entity_type):
+    """Compile the mapping once per worker process"""
+    global _worker_plan
+    _worker_plan = compile_mapping(mapping_rules, entity_type)
+
+
+def _transform_shard(index, records, columnar_threshold):
+    started = time.perf_counter()
+    if columnar_threshold and len(records) >= columnar_threshold:
+        rows = _worker_plan.apply_columnar(records)
+    else:
+        apply = _worker_plan.apply
+        rows = [apply(item) for item in records]
+    return index, rows, time.perf_counter() - started, os.getpid()
+
+
+class ParallelTransformer:
+    """Splits large transform batches into shards run on a process pool.
+
+    Each pool is created with the compiled mapping as its initializer
+    argument, so the mapping travels to a worker once rather than with
+    every shard. Pools are kept per mapping version; a small LRU bounds how
+    many are alive (normally one each for contacts and projects). A pool
+    evicted from the LRU while a request is still using it is only shut
+    down once that request releases it. Batches below `threshold` records
+    run in-process as before.
+    """
+
+    def __init__(self, workers=None, threshold=20000, shard_size=5000, max_pools=2, start_method="spawn"):
+        self.logger = logging.getLogger(__name__)
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self.shard_size = shard_size
+        self.max_pools = max_pools
+        self.start_method = start_method
+
+        self._pools = OrderedDict()  # (mapping_hash, entity_type) -> _PoolEntry
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @classmethod
+    def from_env(cls):
+        workers = int(os.environ.get('TRANSFORM_WORKERS', 0))
+        return cls(
+            workers=workers or None,
+            threshold=int(os.environ.get('TRANSFORM_PARALLEL_THRESHOLD', 20000)),
+            shard_size=int(os.environ.get('TRANSFORM_SHARD_SIZE', 5000)),
+            max_pools=int(os.environ.get('TRANSFORM_MAX_POOLS', 2)),
+            start_method=os.environ.get('TRANSFORM_START_METHOD', 'spawn'),
+        )
+
+    def transform(self, data, mapping_rules, entity_type):
+        """Transform a batch, returning the packaged result plus a `metadata` block"""
+        started = time.perf_counter()
+
+        if not self.threshold or self.workers < 2 or len(data) < self.threshold:
+            result = transform_using_mapping(data, mapping_rules, entity_type)
+            result['metadata'] = {
+                "parallel": False,
+                "records": len(data),
+                "elapsed": round(time.perf_counter() - started, 4),
+            }
+            return result
+
+        entry = self._acquire_pool(mapping_rules, entity_type)
+        try:
+            shards = self._split(data)
+            futures = [
+                entry.pool.submit(_transform_shard, index, shard, COLUMNAR_THRESHOLD)
+                for index, shard in enumerate(shards)
+            ]
+
+            rows = []
+            shard_timings = []
+            # Futures are consumed in submission order, so output order matches input order
+            for future in futures:
+                index, shard_rows, seconds, pid = future.result()
+                rows.extend(shard_rows)
+                shard_timings.append({
+                    "shard": index,
+                    "records": len(shard_rows),
+                    "seconds": round(seconds, 4),
+                    "pid": pid,
+                })
+        finally:
+            self._release_pool(entry)
+
+        result = package_result(rows, entity_type)
+        result['metadata'] = {
+            "parallel": True,
+            "records": len(data),
+            "workers": self.workers,
+            "shards": shard_timings,
+            "elapsed": round(time.perf_counter() - started, 4),
+        }
+        return result
+
+    def shutdown(self):
+        """Shut down every pool, those still in use as soon as their last request releases them"""
+        with self._lock:
+            entries, self._pools = list(self._pools.values()), OrderedDict()
+            idle = [entry for entry in entries if entry.retire()]
+        for entry in idle:
+            entry.pool.shutdown(wait=False)
+
+    # ============ Private Methods ===============
+    def _split(self, data):
+        """At least one shard per worker, and none larger than shard_size"""
+        shard_count = max(self.workers, -(-len(data) // self.shard_size))
+        size = -(-len(data) // shard_count)
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def _acquire_pool(self, mapping_rules, entity_type):
+        """The pool for this mapping, held for the caller until _release_pool()"""
+        key = (mapping_hash(mapping_rules), entity_type)
+        evicted = []
+        with self._lock:
+            # Pools do not survive a fork of this process
+            if self._pid != os.getpid():
+                self._pools = OrderedDict()
+                self._pid = os.getpid()
+
+            entry = self._pools.get(key)
+            if entry is not None:
+                self._pools.move_to_end(key)
+                entry.users += 1
+                return entry
+
+            entry = _PoolEntry(ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker,
+                initargs=(mapping_rules, entity_type),
+            ))
+            entry.users += 1
+            self._pools[key] = entry
+            while len(self._pools) > self.max_pools:
+                old_entry = self._pools.popitem(last=False)[1]
+                if old_entry.retire():
+                    evicted.append(old_entry)
+
+        for old_entry in evicted:
+            old_entry.pool.shutdown(wait=False)
+        self.logger.info(f"Started {self.workers}-process transform pool for {entity_type} mapping {key[0][:8]}")
+        return entry
+
+    def _release_pool(self, entry):
+        with self._lock:
+            entry.users -= 1
+            idle = entry.retired and entry.users == 0
+        if idle:
+            entry.pool.shutdown(wait=False)
+
+
+class _PoolEntry:
+    """A process pool and the number of requests currently using it"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.users = 0
+        self.retired = False
+
+    def retire(self):
+        """Mark the pool for shutdown; True if nobody is using it, so it can be shut down now"""
+        self.retired = True
+        return self.users == 0
@@ -1,12 +1,173 @@
 # shared/debugger_client.py - Fixed version
-import requests
 import time
 import logging
 import uuid
 import json
+import os
+import atexit
+import threading
+from collections import deque
+from shared.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
+LOGS_SERVICE_URL = os.environ.get("LOGS_SERVICE_URL", "http://service_logs:5000")
+
+
+class LogShipper:
+    """Ships log events to service_logs in batches from a background thread.
+
+    Events are appended to a bounded in-memory ring buffer on the caller's
+    thread and flushed by a worker thread once `batch_size` events are
+    buffered or `flush_interval` seconds have elapsed, whichever comes first.
+    When the buffer is full the `drop_policy` decides what happens:
+
+    - "drop_oldest": evict the oldest buffered event (default)
+    - "drop_newest": discard the incoming event
+    - "block": wait up to `block_timeout` seconds for room, then discard
+    """
+
+    DROP_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+    def __init__(self, logs_url=None, max_queue_size=10000, batch_size=100,
+                 flush_interval=0.5, drop_policy="drop_oldest", block_timeout=0.05, timeout=2):
+        if drop_policy not in self.DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy '{drop_policy}'. Available policies: {list(self.DROP_POLICIES)}")
+
+        self.logs_url = logs_url or f"{LOGS_SERVICE_URL}/logs/batch"
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.timeout = timeout
+
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._worker = None
+        self._pid = None
+        self._counters = {"enqueued": 0, "dropped": 0, "flushed": 0, "failed": 0, "batches": 0}
+
+    def enqueue(self, event):
+        """Buffer an event for shipping. Returns False if the event was dropped."""
+        with self._cond:
+            self._ensure_worker()
+
+            if len(self._buffer) >= self.max_queue_size:
+                if self.drop_policy == "drop_oldest":
+                    self._buffer.popleft()
+                    self._counters["dropped"] += 1
+                elif self.drop_policy == "block":
+                    self._cond.wait_for(lambda: len(self._buffer) < self.max_queue_size, self.block_timeout)
+
+                if len(self._buffer) >= self.max_queue_size:
+                    self._counters["dropped"] += 1
+                    return False
+
+            self._buffer.append(event)
+            self._counters["enqueued"] += 1
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify_all()
+            return True
+
+    def flush(self):
+        """Synchronously ship everything currently buffered (used at shutdown)"""
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            self._send_batch(batch)
+
+    def get_stats(self):
+        """Return a snapshot of the shipper counters"""
+        with self._cond:
+            stats = dict(self._counters)
+            stats["queued"] = len(self._buffer)
+            stats["drop_policy"] = self.drop_policy
+            return stats
+
+    # ============ Private Methods ===============
+    def _ensure_worker(self):
+        """Start the worker thread, restarting it in forked child processes"""
+        pid = os.getpid()
+        if self._worker is not None and self._pid == pid and self._worker.is_alive():
+            return
+        if self._pid != pid:
+            # Inherited buffer and connections belong to the parent process
+            self._buffer.clear()
+        self._pid = pid
+        self._worker = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        """Worker loop: wait for a full batch or the flush interval, then ship"""
+        while True:
+            deadline = time.monotonic() + self.flush_interval
+            with self._cond:
+                while len(self._buffer) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            batch = self._take_batch()
+            if batch:
+                self._send_batch(batch)
+
+    def _take_batch(self):
+        """Pop up to batch_size events from the buffer"""
+        with self._cond:
+            count = min(self.batch_size, len(self._buffer))
+            batch = [self._buffer.popleft() for _ in range(count)]
+            if batch:
+                # Wake producers blocked on a full buffer
+                self._cond.notify_all()
+            return batch
+
+    def _send_batch(self, batch):
+        """Deliver a batch to service_logs in one request, counting failures instead of raising"""
+        flushed = 0
+        try:
+            response = get_http_client().post(self.logs_url, json=batch, timeout=self.timeout)
+            if response.status_code == 200:
+                flushed = len(batch)
+            else:
+                logger.error(f"Failed to ship log batch: Status code {response.status_code}")
+        except Exception as e:
+            logger.error(f"Failed to ship log batch: {str(e)}")
+
+        with self._cond:
+            self._counters["batches"] += 1
+            self._counters["flushed"] += flushed
+            self._counters["failed"] += len(batch) - flushed
+
+
+_log_shipper = None
+_log_shipper_lock = threading.Lock()
+
+
+def get_log_shipper():
+    """Return the process-wide log shipper, configured from environment variables"""
+    global _log_shipper
+    if _log_shipper is None:
+        with _log_shipper_lock:
+            if _log_shipper is None:
+                _log_shipper = LogShipper(
+                    max_queue_size=int(os.environ.get("LOG_SHIPPER_QUEUE_SIZE", 10000)),
+                    batch_size=int(os.environ.get("LOG_SHIPPER_BATCH_SIZE", 100)),
+                    flush_interval=float(os.environ.get("LOG_SHIPPER_FLUSH_INTERVAL", 0.5)),
+                    drop_policy=os.environ.get("LOG_SHIPPER_DROP_POLICY", "drop_oldest"),
+                    block_timeout=float(os.environ.get("LOG_SHIPPER_BLOCK_TIMEOUT", 0.05)),
+                )
+                atexit.register(_log_shipper.flush)
+    return _log_shipper
+
+
+def get_shipper_stats():
+    """Counters for enqueued/dropped/flushed/failed log events in this process"""
+    return get_log_shipper().get_stats()
+
+
 class FlowTracker:
     def __init__(self, request_id=None):
         # FIXED: Only generate new ID if none provided
@@ -33,11 +194,7 @@ class FlowTracker:
             if data:
                 payload["data"] = data
             
-            print(f"🔍 DEBUG: About to send log: {payload}")
-            
-            response = requests.post("http://service_logs:5000/logs", json=payload, timeout=2)
-            
-            print(f"🔍 DEBUG: Log sent, response status: {response.status_code}")
+            get_log_shipper().enqueue(payload)
             
         except Exception as e:
             print(f"🔍 DEBUG: Failed to log flow: {str(e)}")
@@ -62,9 +219,7 @@ class FlowTracker:
             if context:
                 payload["context"] = str(context)
             
-            print(f"🔍 DEBUG: About to send error log: {payload}")
-            response = requests.post("http://service_logs:5000/logs", json=payload, timeout=2)
-            print(f"🔍 DEBUG: Error log sent, response status: {response.status_code}")
+            get_log_shipper().enqueue(payload)
                 
         except Exception as e:
             print(f"🔍 DEBUG: Failed to log error: {str(e)}")
@@ -100,12 +255,12 @@ class FlowTracker:
                                    if k.lower() in ['content-type', 'authorization', 'x-api-key']}
                 log_payload["headers"] = important_headers
                 
-            requests.post("http://service_logs:5000/logs", json=log_payload, timeout=2)
+            get_log_shipper().enqueue(log_payload)
         except Exception as e:
             logger.error(f"Failed to log request payload: {str(e)}")
 
-    def log_response(self, service, status_code, response_data=None, response_time_ms=None):
-        """Log response with data"""
+    def log_response(self, service, status_code, response_data=None, response_time_ms=None, response_preview=None):
+        """Log response with data, or with an already bounded preview of the body"""
         try:
             log_payload = {
                 "service": "response",
@@ -122,7 +277,10 @@ class FlowTracker:
             if response_time_ms:
                 log_payload["response_time_ms"] = response_time_ms
             
-            if response_data:
+            if response_preview is not None:
+                # Already sampled by the caller - no need to serialize anything
+                log_payload["response"] = response_preview
+            elif response_data:
                 # Limit response size for logging
                 response_str = json.dumps(response_data) if isinstance(response_data, dict) else str(response_data)
                 if len(response_str) > 1000:  # Limit to 1000 chars
@@ -130,7 +288,7 @@ class FlowTracker:
                 else:
                     log_payload["response"] = response_data
                 
-            requests.post("http://service_logs:5000/logs", json=log_payload, timeout=2)
+            get_log_shipper().enqueue(log_payload)
         except Exception as e:
             logger.error(f"Failed to log response: {str(e)}")
 
@@ -141,9 +299,9 @@ def track_incoming_request_with_payload(to_service, method, endpoint, payload=No
     tracker.log_request_payload(to_service, method, endpoint, payload, headers)
     return tracker
 
-def track_final_response(tracker, service, status_code, response_data=None, response_time_ms=None):
+def track_final_response(tracker, service, status_code, response_data=None, response_time_ms=None, response_preview=None):
     """Track final response with data"""
-    tracker.log_response(service, status_code, response_data, response_time_ms)
+    tracker.log_response(service, status_code, response_data, response_time_ms, response_preview)
 
 def track_error(tracker, service, error_message, context=None):
     """Track an error - FIXED VERSION WITH DEBUG"""
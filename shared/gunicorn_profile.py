@@ -0,0 +1,45 @@
+# shared/gunicorn_profile.py - production serving profile shared by every service's gunicorn.conf.py
+import os
+
+
+def profile(workers=2, threads=4, timeout=60, single_worker=False, preload_app=None, max_requests=1000,
+            max_requests_jitter=100):
+    """Gunicorn settings, as a dict for a gunicorn.conf.py to load into its globals.
+
+    The arguments are per-service defaults; every setting can still be
+    overridden from the environment, e.g.
+        GUNICORN_WORKER_CLASS=gevent GUNICORN_WORKERS=4 gunicorn -c gunicorn.conf.py "app:app"
+    except the worker count of a `single_worker` service and a
+    `preload_app` a service pins to True or False.
+    """
+    # sync, gthread or gevent
+    worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+    threads = int(os.environ.get("GUNICORN_THREADS", threads))
+
+    # Gunicorn quietly switches sync workers to gthread when threads > 1
+    if worker_class == "sync":
+        threads = 1
+
+    if preload_app is None:
+        preload_app = os.environ.get("GUNICORN_PRELOAD", "false").lower() == "true"
+    # gevent has to patch the standard library before the app is imported
+    if worker_class == "gevent":
+        preload_app = False
+
+    return {
+        "bind": os.environ.get("GUNICORN_BIND", "0.0.0.0:5000"),
+        "worker_class": worker_class,
+        "workers": 1 if single_worker else int(os.environ.get("GUNICORN_WORKERS", workers)),
+        "threads": threads,
+        "worker_connections": int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 1000)),
+        "preload_app": preload_app,
+        "timeout": int(os.environ.get("GUNICORN_TIMEOUT", timeout)),
+        "graceful_timeout": int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30)),
+        "keepalive": int(os.environ.get("GUNICORN_KEEPALIVE", 5)),
+        # Recycle workers now and then to bound slow memory growth; the jitter keeps them from restarting together
+        "max_requests": int(os.environ.get("GUNICORN_MAX_REQUESTS", max_requests)),
+        "max_requests_jitter": int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", max_requests_jitter)),
+        "accesslog": os.environ.get("GUNICORN_ACCESS_LOG") or None,
+        "errorlog": "-",
+        "loglevel": os.environ.get("GUNICORN_LOG_LEVEL", "info"),
+    }
@@ -0,0 +1,162 @@
+# shared/http_client.py - pooled keep-alive HTTP client for inter-service calls
+import os
+import random
+import threading
+import logging
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class JitteredRetry(Retry):
+    """Exponential backoff with full jitter so retrying callers don't stampede an upstream"""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff else 0
+
+
+class HttpClient:
+    """Keeps one pooled requests.Session per upstream (scheme + host + port).
+
+    Connections are reused across calls (keep-alive) instead of opening a
+    new TCP connection per request. Idempotent methods are retried on
+    connection errors and 429/502/503/504 with jittered exponential backoff
+    (or the upstream's Retry-After); other methods are only retried when
+    the connection could not be made. A body that can only be read once
+    (a generator or other iterator) is never retried, since a second attempt
+    would send it empty or truncated; such calls use a second, retry-free
+    session for the same upstream.
+    Timeouts can be set per host, e.g. HTTP_TIMEOUTS="service_logs=2,mock-external-apis=10".
+    """
+
+    def __init__(self, pool_size=20, retries=2, backoff_factor=0.2, timeout=30, host_timeouts=None):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.host_timeouts = host_timeouts or {}
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def request(self, method, url, timeout=None, retry=None, **kwargs):
+        """Same call shape as requests.request, routed through the upstream's pool.
+
+        `retry` defaults to on unless the body is a one-shot iterator.
+        """
+        if retry is None:
+            retry = is_replayable(kwargs.get("data"))
+        session = self.session_for(url, retry=retry)
+        if timeout is None:
+            timeout = self.timeout_for(url)
+        return session.request(method=method, url=url, timeout=timeout, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def session_for(self, url, retry=True):
+        """Return the pooled session for the url's upstream, creating it on first use"""
+        upstream = self._upstream(url)
+        key = (upstream, retry)
+        with self._lock:
+            if self._pid != os.getpid():
+                # Pooled sockets must not be shared with a forked parent
+                self._sessions = {}
+                self._pid = os.getpid()
+
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = self._create_session(upstream, retry)
+            return session
+
+    def timeout_for(self, url):
+        host = urlsplit(url).hostname or ""
+        return self.host_timeouts.get(host, self.timeout)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+    # ============ Private Methods ===============
+    def _create_session(self, upstream, retry=True):
+        max_retries = 0
+        if retry:
+            max_retries = JitteredRetry(
+                total=self.retries,
+                connect=self.retries,
+                read=self.retries,
+                status=self.retries,
+                backoff_factor=self.backoff_factor,
+                allowed_methods=IDEMPOTENT_METHODS,
+                status_forcelist=RETRY_STATUSES,
+                raise_on_status=False,
+                respect_retry_after_header=True,
+            )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=max_retries)
+
+        session = requests.Session()
+        session.mount(upstream, adapter)
+        return session
+
+    @staticmethod
+    def _upstream(url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+
+def is_replayable(data):
+    """Whether a request body can be sent again on retry (bytes, str, dicts, files) rather than only once"""
+    if data is None or isinstance(data, (bytes, bytearray, str, dict, list, tuple)):
+        return True
+    if hasattr(data, "read"):
+        # urllib3 rewinds file-like bodies before a retry
+        return True
+    return iter(data) is not data if hasattr(data, "__iter__") else True
+
+
+def _parse_host_timeouts(value):
+    """Parse "host=seconds,host=seconds" into a dict"""
+    timeouts = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        host, seconds = item.split("=", 1)
+        try:
+            timeouts[host.strip()] = float(seconds)
+        except ValueError:
+            logger.warning(f"Ignoring invalid HTTP timeout entry: {item}")
+    return timeouts
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Return the process-wide HTTP client, configured from environment variables"""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = HttpClient(
+                    pool_size=int(os.environ.get("HTTP_POOL_SIZE", 20)),
+                    retries=int(os.environ.get("HTTP_RETRIES", 2)),
+                    backoff_factor=float(os.environ.get("HTTP_BACKOFF_FACTOR", 0.2)),
+                    timeout=float(os.environ.get("HTTP_TIMEOUT", 30)),
+                    host_timeouts=_parse_host_timeouts(os.environ.get("HTTP_TIMEOUTS", "")),
+                )
+    return _http_client
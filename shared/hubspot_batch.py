@@ -0,0 +1,117 @@
+# shared/hubspot_batch.py - chunked, concurrent, rate-limit aware HubSpot batch writes
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+from shared.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+# HubSpot rejects batch/create|update|upsert calls with more inputs than this
+HUBSPOT_BATCH_LIMIT = 100
+
+
+class HubSpotBatchWriter:
+    """Sends batch inputs to HubSpot in chunks of at most 100 over a bounded thread pool.
+
+    A 429 response pauses every chunk of this writer until its Retry-After
+    has passed, and the chunk is then retried, up to `max_retries` times.
+    Per-chunk results and errors are folded into one response shaped like
+    HubSpot's own batch response, plus an `errors` list.
+    """
+
+    def __init__(self, chunk_size=HUBSPOT_BATCH_LIMIT, max_workers=4, max_retries=3, default_retry_after=1.0):
+        self.chunk_size = min(chunk_size, HUBSPOT_BATCH_LIMIT)
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.default_retry_after = default_retry_after
+
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            chunk_size=int(os.environ.get("HUBSPOT_BATCH_SIZE", HUBSPOT_BATCH_LIMIT)),
+            max_workers=int(os.environ.get("HUBSPOT_BATCH_WORKERS", 4)),
+            max_retries=int(os.environ.get("HUBSPOT_MAX_RETRIES", 3)),
+        )
+
+    def write(self, url, inputs, headers=None):
+        """Send all inputs to a HubSpot batch endpoint and aggregate the outcome"""
+        chunks = [inputs[i:i + self.chunk_size] for i in range(0, len(inputs), self.chunk_size)]
+        futures = [self._get_executor().submit(self._send_chunk, url, chunk, headers) for chunk in chunks]
+
+        aggregated = {"status": "COMPLETE", "results": [], "errors": [], "chunks": len(chunks), "retries": 0}
+        for index, future in enumerate(futures):
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = {"results": [], "error": str(e), "retries": 0}
+
+            aggregated["results"].extend(outcome["results"])
+            aggregated["retries"] += outcome["retries"]
+            if outcome.get("error"):
+                aggregated["errors"].append({"chunk": index, "size": len(chunks[index]), "message": outcome["error"]})
+
+        if aggregated["errors"]:
+            aggregated["status"] = "PARTIAL" if aggregated["results"] else "ERROR"
+        return aggregated
+
+    # ============ Private Methods ===============
+    def _get_executor(self):
+        """One pool per process - it bounds concurrent HubSpot calls across all callers"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hubspot-batch")
+                self._pid = os.getpid()
+            return self._executor
+
+    def _send_chunk(self, url, chunk, headers):
+        retries = 0
+        while True:
+            self._wait_for_rate_limit()
+            response = get_http_client().post(url, headers=headers, json={"inputs": chunk})
+
+            if response.status_code == 429 and retries < self.max_retries:
+                retries += 1
+                delay = self._retry_after(response)
+                logger.warning(f"HubSpot rate limited, retrying chunk in {delay:.1f}s ({retries}/{self.max_retries})")
+                self._pause(delay)
+                continue
+
+            if response.status_code not in (200, 201):
+                return {"results": [], "error": f"HubSpot API error: Status code {response.status_code}: {response.text[:200]}", "retries": retries}
+
+            return {"results": response.json().get("results", []), "retries": retries}
+
+    def _wait_for_rate_limit(self):
+        while True:
+            with self._lock:
+                remaining = self._paused_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    def _pause(self, delay):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def _retry_after(self, response):
+        """Retry-After in seconds, given either as a number or an HTTP date"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return self.default_retry_after
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return self.default_retry_after
@@ -0,0 +1,193 @@
+# shared/mapping_registry.py - versioned mapping rules from service_mapping, cached per process
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+from shared.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+
+class MappingVersionConflict(Exception):
+    """The transformer no longer serves the mapping version a caller asked for (HTTP 409)"""
+
+    def __init__(self, entity_type, expected_version, current_version):
+        super().__init__(f"Mapping version {expected_version} is not current for {entity_type}")
+        self.entity_type = entity_type
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+class PinnedMapping:
+    """The mapping version one sync run transforms with.
+
+    Pinned to the current version when the run starts. If the mapping is
+    saved mid-run the transformer answers 409 for the old version; the page
+    that hit it calls `repin()` and is transformed again with the new one,
+    so a run may span two versions but never fails because of the change.
+    """
+
+    def __init__(self, registry, entity_type):
+        self.entity_type = entity_type
+        self.version = registry.current_version(entity_type)
+        self.versions = [self.version]
+        self._lock = threading.Lock()
+
+    def repin(self, conflict):
+        """Move to the transformer's current version, once even if several pages hit the same conflict"""
+        with self._lock:
+            if self.version == conflict.expected_version and conflict.current_version:
+                logger.warning(
+                    f"{self.entity_type} mapping changed mid-sync, re-pinning "
+                    f"{self.version} -> {conflict.current_version}"
+                )
+                self.version = conflict.current_version
+                self.versions.append(self.version)
+            return self.version
+
+
+class MappingRegistry:
+    """Versioned mapping rules keyed by entity type, cached in-process.
+
+    service_mapping is the only owner of mapping files. Every other service
+    refers to a mapping by entity type and version (its content hash) and
+    asks this registry for the rules or the current version. Cached rules
+    are served without any network call while they are younger than `ttl`
+    seconds. After that they are revalidated with a conditional GET
+    (If-None-Match) that normally comes back 304. service_mapping also
+    pushes an invalidation to the transformer when a mapping is saved, so
+    the TTL only bounds staleness if that push is lost.
+
+    The push reaches a single gunicorn worker. So that the others hear of it
+    too, `invalidate()` also touches a marker file per entity type in
+    `invalidation_dir`, shared by every worker on the host; before serving
+    cached rules a worker compares the marker's mtime with when it last
+    validated them (one stat call) and revalidates if the marker is newer.
+    The default directory is under the container's temp dir, so markers only
+    reach workers in the same container; replicas of the transformer would
+    need MAPPING_INVALIDATION_DIR on a volume they share.
+    """
+
+    def __init__(self, mapping_service_url, ttl=300, invalidation_dir=None):
+        self.mapping_service_url = mapping_service_url
+        self.ttl = ttl
+        self.invalidation_dir = invalidation_dir
+        self._entries = {}  # entity_type -> {"rules", "etag", "version", "validated_at", "checked_at"}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.environ.get('SERVICE_MAPPING', 'http://service_mapping:5000'),
+            ttl=float(os.environ.get('MAPPING_CACHE_TTL', 300)),
+            invalidation_dir=os.environ.get(
+                'MAPPING_INVALIDATION_DIR', os.path.join(tempfile.gettempdir(), 'mapping_invalidations')
+            ),
+        )
+
+    def get(self, entity_type):
+        """Return mapping rules for an entity type, fetching only when missing or expired"""
+        return self.get_versioned(entity_type)[0]
+
+    def get_versioned(self, entity_type, expected_version=None, revalidate=False):
+        """Return (rules, version); a caller expecting another version forces a revalidation"""
+        with self._lock:
+            entry = self._entries.get(entity_type)
+        fresh = (
+            entry and not revalidate
+            and time.monotonic() - entry["validated_at"] < self.ttl
+            and not self._invalidated_since(entity_type, entry["checked_at"])
+        )
+        if fresh and (expected_version is None or entry.get("version") == expected_version):
+            return entry["rules"], entry.get("version")
+        entry = self._fetch(entity_type, entry)
+        return (entry["rules"], entry.get("version")) if entry else ({}, None)
+
+    def current_version(self, entity_type):
+        """Revalidated version of a mapping, for pinning a sync to one version; None if unavailable"""
+        return self.get_versioned(entity_type, revalidate=True)[1]
+
+    def invalidate(self, entity_type=None):
+        """Drop one entity type (or everything) so the next get fetches fresh rules"""
+        with self._lock:
+            self._generation += 1
+            if entity_type is None:
+                self._entries = {}
+            else:
+                self._entries.pop(entity_type, None)
+        self._touch_marker(entity_type)
+
+    # ============ Private Methods ===============
+    def _marker_paths(self, entity_type):
+        safe = re.sub(r'[^A-Za-z0-9_-]', '_', entity_type) if entity_type else None
+        names = ["_all"] + ([safe] if safe else [])
+        return [os.path.join(self.invalidation_dir, f"{name}.invalidated") for name in names]
+
+    def _touch_marker(self, entity_type):
+        """Tell the other workers on this host that entity_type (or every type) changed"""
+        if not self.invalidation_dir:
+            return
+        path = self._marker_paths(entity_type)[-1]
+        try:
+            os.makedirs(self.invalidation_dir, exist_ok=True)
+            with open(path, "a"):
+                pass
+            os.utime(path, None)
+        except OSError as e:
+            logger.warning(f"Could not write mapping invalidation marker {path}: {str(e)}")
+
+    def _invalidated_since(self, entity_type, checked_at):
+        """Whether another worker invalidated entity_type after checked_at (wall-clock ns)"""
+        if not self.invalidation_dir:
+            return False
+        for path in self._marker_paths(entity_type):
+            try:
+                if os.stat(path).st_mtime_ns > checked_at:
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def _fetch(self, entity_type, entry):
+        with self._lock:
+            generation = self._generation
+        # Taken before the request, so an invalidation landing while it is in flight is still seen afterwards
+        checked_at = time.time_ns()
+
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+
+        try:
+            response = get_http_client().get(f"{self.mapping_service_url}/mappings/{entity_type}", headers=headers)
+        except Exception as e:
+            logger.error(f"Error fetching mapping from service: {str(e)}")
+            # Keep serving what we had rather than failing the transform
+            return entry
+
+        if response.status_code == 304 and entry:
+            entry = dict(entry, validated_at=time.monotonic(), checked_at=checked_at)
+        elif response.status_code == 200:
+            body = response.json()
+            etag = response.headers.get("ETag")
+            entry = {
+                "rules": body.get("rules", {}),
+                "etag": etag,
+                "version": body.get("version") or (etag.strip('"') if etag else None),
+                "validated_at": time.monotonic(),
+                "checked_at": checked_at,
+            }
+        else:
+            logger.error(f"Failed to fetch mapping from service: {response.status_code}")
+            return entry
+
+        with self._lock:
+            # An invalidation that raced with this fetch wins; the next get refetches
+            if generation == self._generation:
+                self._entries[entity_type] = entry
+        return entry
+
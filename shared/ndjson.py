@@ -0,0 +1,31 @@
+# shared/ndjson.py - newline-delimited JSON framing for streamed record batches
+import json
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def encode_ndjson(records, batch_size=500):
+    """Yield records as NDJSON bytes, `batch_size` lines per chunk"""
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record, separators=(",", ":")))
+        if len(lines) >= batch_size:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def iter_ndjson(lines):
+    """Parse an iterable of NDJSON lines (bytes or str), skipping blank ones"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def is_error_line(record):
+    """A stream that fails part-way ends with a {"error": ..., "line": n} record"""
+    return isinstance(record, dict) and set(record) == {"error", "line"}
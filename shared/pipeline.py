@@ -0,0 +1,150 @@
+# shared/pipeline.py - staged producer/consumer runner for the sync services
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class Stage:
+    """One step of a pipeline: `func(item)` run by `workers` threads.
+
+    Returning None drops the item; raising records an error for the item
+    and the pipeline carries on with the next one.
+    """
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+
+
+class Pipeline:
+    """Runs a source iterator and a chain of stages concurrently.
+
+    Stages are connected by bounded queues of `queue_size` items, so a slow
+    stage applies back-pressure upstream instead of letting work pile up in
+    memory. The source is consumed on the calling thread; each stage has its
+    own worker threads. With the stages overlapping, wall-clock time tends
+    towards that of the slowest stage rather than the sum of all of them.
+    """
+
+    def __init__(self, stages, queue_size=2, name="pipeline"):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = queue_size
+        self.name = name
+
+    def run(self, source, on_source_item=None):
+        """Feed every item from source through the stages and wait for them to drain.
+
+        Returns {"results", "errors", "stages", "elapsed"} where results are
+        the final stage outputs (in completion order) and stages holds
+        per-stage item counts, errors and busy seconds. An exception raised
+        by the source stops the intake, drains what is already queued and is
+        then re-raised.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        lock = threading.Lock()
+        remaining = [stage.workers for stage in self.stages]
+        results = []
+        errors = []
+        stats = {"source": {"items": 0, "errors": 0, "busy_seconds": 0.0}}
+        for stage in self.stages:
+            stats[stage.name] = {"items": 0, "errors": 0, "busy_seconds": 0.0, "workers": stage.workers}
+
+        def worker(index):
+            stage = self.stages[index]
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            stage_stats = stats[stage.name]
+
+            while True:
+                item = inbox.get()
+                if item is _DONE:
+                    break
+
+                started = time.perf_counter()
+                try:
+                    output = stage.func(item)
+                    error = None
+                except Exception as e:
+                    output = None
+                    error = str(e)
+                busy = time.perf_counter() - started
+
+                with lock:
+                    stage_stats["busy_seconds"] += busy
+                    if error is None:
+                        stage_stats["items"] += 1
+                    else:
+                        stage_stats["errors"] += 1
+                        errors.append({"stage": stage.name, "message": error})
+                if error is not None:
+                    logger.error(f"{self.name} stage '{stage.name}' failed: {error}")
+                    continue
+
+                if output is None:
+                    continue
+                if outbox is not None:
+                    outbox.put(output)
+                else:
+                    with lock:
+                        results.append(output)
+
+            # The last worker out tells every worker of the next stage to stop
+            with lock:
+                remaining[index] -= 1
+                last_out = remaining[index] == 0
+            if last_out and outbox is not None:
+                for _ in range(self.stages[index + 1].workers):
+                    outbox.put(_DONE)
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=worker, args=(index,), name=f"{self.name}-{stage.name}-{number}", daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        started = time.perf_counter()
+        source_error = None
+        try:
+            iterator = iter(source)
+            while True:
+                fetch_started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stats["source"]["busy_seconds"] += time.perf_counter() - fetch_started
+                stats["source"]["items"] += 1
+                if on_source_item:
+                    on_source_item(item)
+                queues[0].put(item)
+        except Exception as e:
+            stats["source"]["errors"] += 1
+            source_error = e
+        finally:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+
+        if source_error is not None:
+            raise source_error
+
+        for stage_stats in stats.values():
+            stage_stats["busy_seconds"] = round(stage_stats["busy_seconds"], 3)
+        return {
+            "results": results,
+            "errors": errors,
+            "stages": stats,
+            "elapsed": round(time.perf_counter() - started, 3),
+        }
@@ -0,0 +1,68 @@
+# shared/streaming.py - chunked pass-through helpers for the proxying services
+import os
+from flask import Response
+
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", 64 * 1024))
+
+# RFC 7230 section 6.1 - these describe one connection and must not be forwarded
+HOP_BY_HOP_HEADERS = frozenset([
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+])
+
+# Framing headers that no longer hold once a body is re-chunked
+FRAMING_HEADERS = frozenset(["content-length", "transfer-encoding"])
+
+
+def strip_hop_by_hop(headers, extra=()):
+    """Copy headers without hop-by-hop ones, including any listed in Connection"""
+    drop = set(HOP_BY_HOP_HEADERS)
+    drop.update(name.lower() for name in extra)
+    for key, value in headers.items():
+        if key.lower() == "connection":
+            drop.update(token.strip().lower() for token in value.split(",") if token.strip())
+    return {key: value for key, value in headers.items() if key.lower() not in drop}
+
+
+def has_request_body(flask_request):
+    """True if the inbound request carries a body (sized or chunked)"""
+    chunked = flask_request.headers.get("Transfer-Encoding", "").lower() == "chunked"
+    return chunked or bool(flask_request.content_length)
+
+
+def iter_request_body(stream, chunk_size=STREAM_CHUNK_SIZE):
+    """Read an inbound body chunk by chunk so it can be forwarded without buffering"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def iter_upstream_body(upstream, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the raw upstream bytes as they arrive, releasing the connection at the end.
+
+    Bytes are passed through undecoded so Content-Encoding stays accurate.
+    """
+    try:
+        for chunk in upstream.raw.stream(chunk_size, decode_content=False):
+            if chunk:
+                yield chunk
+    finally:
+        upstream.close()
+
+
+def streamed_response(upstream, chunk_size=STREAM_CHUNK_SIZE):
+    """Build a Flask response that pipes a `stream=True` requests response to the client"""
+    headers = strip_hop_by_hop(upstream.headers, extra=FRAMING_HEADERS)
+    response = Response(iter_upstream_body(upstream, chunk_size), status=upstream.status_code, headers=headers)
+    # Release the upstream connection even if the client disconnects mid-stream
+    response.call_on_close(upstream.close)
+    return response
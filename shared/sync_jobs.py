@@ -0,0 +1,331 @@
+# shared/sync_jobs.py - persistent background job queue for the sync services
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    request_id TEXT,
+    progress TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, created_at);
+"""
+
+
+class LeaseLost(Exception):
+    """Raised into a running job whose lease was taken over by another worker, so it stops early"""
+
+
+def parse_flag(value, default=False):
+    """Read a boolean job parameter that may arrive as a JSON bool or as a string like "false" """
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in ("true", "1", "yes", "on"):
+        return True
+    if text in ("false", "0", "no", "off", ""):
+        return False
+    raise ValueError(f"Invalid boolean value: {value!r}")
+
+
+class JobProgress:
+    """Thread-safe progress counters for one running job.
+
+    The sync pipelines call `add()` from their stage threads; counters are
+    written back to the job row at most every `flush_interval` seconds, and
+    every write also renews the job's lease. Once a write finds the lease
+    held by another worker, `add()` raises LeaseLost so the stale run stops.
+    """
+
+    def __init__(self, queue, job_id, owner=None, flush_interval=1.0):
+        self.queue = queue
+        self.job_id = job_id
+        self.owner = owner
+        self.lost = threading.Event()
+        self.flush_interval = flush_interval
+        self.started = time.time()
+        self.counts = {"pages": 0, "fetched": 0, "transformed": 0, "skipped": 0, "sent": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def add(self, **counts):
+        if self.lost.is_set():
+            raise LeaseLost(f"{self.queue.kind} job {self.job_id} was taken over by another worker")
+        with self._lock:
+            for key, value in counts.items():
+                self.counts[key] = self.counts.get(key, 0) + value
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if due:
+                self._last_flush = time.monotonic()
+                snapshot = self.snapshot()
+        if due:
+            self.queue._save_progress(self, snapshot)
+
+    def snapshot(self):
+        elapsed = max(time.time() - self.started, 1e-6)
+        snapshot = dict(self.counts)
+        snapshot["elapsed"] = round(elapsed, 3)
+        snapshot["throughput"] = round(self.counts.get("sent", 0) / elapsed, 1)
+        return snapshot
+
+
+class SyncJobQueue:
+    """Runs sync jobs in background threads, persisting them in a local SQLite file.
+
+    `submit()` stores a queued job and returns at once; worker threads claim
+    jobs oldest-first and call `runner(params, request_id, progress)`. A
+    running job holds a lease that its progress writes renew, so a job left
+    behind by a crashed or restarted worker is claimed again once the lease
+    expires, up to `max_attempts` times. Several processes may share the same
+    database file.
+
+    With `dedupe` on, submitting params identical to a job that is still
+    queued or running joins that job instead of starting a duplicate.
+    `normalize(params)`, if given, fills in the runner's defaults first, so
+    params that only differ by spelling a default out compare equal.
+    """
+
+    def __init__(self, db_path, runner, kind="sync", workers=1, lease_seconds=60, max_attempts=3, poll_interval=1.0,
+                 dedupe=True, normalize=None):
+        self.db_path = db_path
+        self.runner = runner
+        self.kind = kind
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.dedupe = dedupe
+        self.normalize = normalize
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+        self._threads = []
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls, runner, kind, default_db_path, normalize=None):
+        return cls(
+            db_path=os.environ.get("SYNC_JOBS_DB", default_db_path),
+            runner=runner,
+            kind=kind,
+            workers=int(os.environ.get("SYNC_JOB_WORKERS", 1)),
+            lease_seconds=float(os.environ.get("SYNC_JOB_LEASE_SECONDS", 60)),
+            max_attempts=int(os.environ.get("SYNC_JOB_MAX_ATTEMPTS", 3)),
+            dedupe=os.environ.get("SYNC_JOB_DEDUPE", "true").lower() == "true",
+            normalize=normalize,
+        )
+
+    def start(self):
+        """Start the worker threads for this process (again after a fork)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = []
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"{self.kind}-job-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, params, request_id=None):
+        """Queue a job and return its public view, with `deduplicated` set if an identical active job was joined"""
+        self.start()
+        if self.normalize is not None:
+            params = self.normalize(params)
+        # Sorted keys so equal params always serialise, and therefore compare, the same
+        encoded = json.dumps(params, sort_keys=True)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = None
+                if self.dedupe:
+                    existing = conn.execute(
+                        "SELECT id FROM jobs WHERE kind = ? AND params = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                        (self.kind, encoded, QUEUED, RUNNING),
+                    ).fetchone()
+                if existing is not None:
+                    job_id = existing["id"]
+                else:
+                    job_id = uuid.uuid4().hex
+                    conn.execute(
+                        "INSERT INTO jobs (id, kind, status, params, request_id, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (job_id, self.kind, QUEUED, encoded, request_id, time.time()),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        if existing is not None:
+            logger.info(f"Joined running {self.kind} job {job_id} instead of starting a duplicate")
+        else:
+            self._wakeup.set()
+        job = self.get(job_id)
+        job["deduplicated"] = existing is not None
+        return job
+
+    def get(self, job_id):
+        """Public view of a job, or None if it does not exist"""
+        self.start()
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ? AND kind = ?", (job_id, self.kind)).fetchone()
+        return self._to_dict(row) if row else None
+
+    # ============ Private Methods ===============
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return closing(conn)
+
+    def _work(self):
+        worker = f"{os.getpid()}:{threading.current_thread().name}"
+        while True:
+            # A fresh owner per claim, so a run cannot mistake a later claim of the same job for its own
+            owner = f"{worker}:{uuid.uuid4().hex[:8]}"
+            try:
+                job = self._claim(owner)
+            except Exception as e:
+                logger.error(f"Failed to claim {self.kind} job: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job, owner)
+
+    def _claim(self, owner):
+        """Atomically take the oldest queued job, or one whose lease has expired"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            try:
+                # Jobs abandoned by a dead worker that have used up their attempts are failed for good
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                    "WHERE kind = ? AND status = ? AND lease_until < ? AND attempts >= ?",
+                    (FAILED, "Job abandoned by its worker too many times", now, self.kind, RUNNING, now, self.max_attempts),
+                )
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE kind = ? AND (status = ? OR (status = ? AND lease_until < ?)) "
+                    "ORDER BY created_at LIMIT 1",
+                    (self.kind, QUEUED, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, lease_until = ?, attempts = attempts + 1, "
+                    "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (RUNNING, owner, now + self.lease_seconds, now, row["id"]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if row["status"] == RUNNING:
+            logger.warning(f"Reclaimed {self.kind} job {row['id']} after its lease expired")
+        return row
+
+    def _run(self, job, owner):
+        job_id = job["id"]
+        progress = JobProgress(self, job_id, owner=owner, flush_interval=min(1.0, self.lease_seconds / 3))
+
+        # Keep the lease alive even if the runner goes quiet for a while
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(progress, stop_heartbeat), name=f"{self.kind}-job-heartbeat", daemon=True
+        )
+        heartbeat.start()
+
+        try:
+            result = self.runner(json.loads(job["params"]), job["request_id"], progress)
+            self._finish(job_id, owner, SUCCEEDED, progress.snapshot(), result=result)
+        except Exception as e:
+            logger.error(f"{self.kind} job {job_id} failed: {str(e)}")
+            self._finish(job_id, owner, FAILED, progress.snapshot(), error=str(e))
+        finally:
+            stop_heartbeat.set()
+
+    def _heartbeat(self, progress, stop):
+        while not stop.wait(self.lease_seconds / 3):
+            if not self._save_progress(progress, progress.snapshot()):
+                return
+
+    def _save_progress(self, progress, snapshot):
+        """Write progress and renew the lease; False once the lease belongs to another worker"""
+        try:
+            with self._connect() as conn:
+                updated = conn.execute(
+                    "UPDATE jobs SET progress = ?, lease_until = ? WHERE id = ? AND status = ? AND owner = ?",
+                    (json.dumps(snapshot), time.time() + self.lease_seconds, progress.job_id, RUNNING, progress.owner),
+                ).rowcount
+        except Exception as e:
+            # A transient database error is not a lost lease; the next write tries again
+            logger.error(f"Failed to save progress for {self.kind} job {progress.job_id}: {str(e)}")
+            return True
+        if updated == 0:
+            logger.warning(f"{self.kind} job {progress.job_id} lost its lease to another worker, stopping this run")
+            progress.lost.set()
+            return False
+        return True
+
+    def _finish(self, job_id, owner, status, snapshot, result=None, error=None):
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = ?, progress = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL "
+                "WHERE id = ? AND owner = ?",
+                (status, json.dumps(snapshot), json.dumps(result) if result is not None else None, error, time.time(),
+                 job_id, owner),
+            ).rowcount
+        if updated == 0:
+            logger.warning(f"Discarded the outcome of a stale run of {self.kind} job {job_id}; another worker owns it")
+
+    def _to_dict(self, row):
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "params": json.loads(row["params"]),
+            "progress": json.loads(row["progress"] or "{}"),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+
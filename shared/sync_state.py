@@ -0,0 +1,133 @@
+# shared/sync_state.py - per-entity sync watermarks and pushed-record hashes persisted between runs
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermarks (
+    entity TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS record_hashes (
+    entity TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (entity, record_id)
+);
+"""
+
+# Stay well under SQLite's default limit of 999 bound variables per statement
+_LOOKUP_CHUNK = 500
+
+
+def record_hash(record):
+    """Stable hash of a mapped record's content"""
+    encoded = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+class SyncStateStore:
+    """Remembers, per entity type, what has already been pushed to HubSpot.
+
+    The watermark is the newest source `updated_at` pushed; incremental
+    syncs ask Oggo only for records changed since then. Watermarks are
+    ISO-8601 UTC strings as Oggo sends them, so they compare correctly as
+    plain strings. Record hashes are the hash of each record's mapped output
+    at its last successful push, keyed by source id, so records whose
+    updated_at moved without any mapped field changing can be skipped.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls, default_db_path):
+        return cls(os.environ.get("SYNC_STATE_DB", default_db_path))
+
+    def get_watermark(self, entity):
+        """Newest updated_at synced for an entity, or None before its first sync"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT watermark FROM watermarks WHERE entity = ?", (entity,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, entity, watermark):
+        """Move an entity's watermark forward (never back)"""
+        if not watermark:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO watermarks (entity, watermark, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(entity) DO UPDATE SET watermark = excluded.watermark, updated_at = excluded.updated_at "
+                "WHERE excluded.watermark > watermarks.watermark",
+                (entity, watermark, time.time()),
+            )
+
+    def reset(self, entity):
+        """Forget an entity's watermark and hashes so its next incremental sync is a full one"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM watermarks WHERE entity = ?", (entity,))
+            conn.execute("DELETE FROM record_hashes WHERE entity = ?", (entity,))
+
+    def filter_changed(self, entity, records, id_field):
+        """Split mapped records into those that differ from their last push.
+
+        Returns (changed_records, hashes) where hashes maps the id of every
+        changed record to its new hash, ready for `save_hashes` once the push
+        succeeds. Records without an id are always treated as changed.
+        """
+        hashes = self.hash_records(records, id_field)
+        known = self._get_hashes(entity, list(hashes))
+        changed = [
+            record for record in records
+            if record.get(id_field) is None or known.get(str(record.get(id_field))) != hashes[str(record.get(id_field))]
+        ]
+        changed_ids = {str(record.get(id_field)) for record in changed if record.get(id_field) is not None}
+        return changed, {record_id: hashes[record_id] for record_id in changed_ids}
+
+    def hash_records(self, records, id_field):
+        """Hash of every record that has an id, keyed by that id"""
+        return {
+            str(record[id_field]): record_hash(record)
+            for record in records if record.get(id_field) is not None
+        }
+
+    def save_hashes(self, entity, hashes):
+        """Record the hashes of successfully pushed records"""
+        if not hashes:
+            return
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO record_hashes (entity, record_id, hash, updated_at) VALUES (?, ?, ?, ?)",
+                [(entity, record_id, value, now) for record_id, value in hashes.items()],
+            )
+            conn.execute("COMMIT")
+
+    # ============ Private Methods ===============
+    def _get_hashes(self, entity, record_ids):
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(record_ids), _LOOKUP_CHUNK):
+                chunk = record_ids[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT record_id, hash FROM record_hashes WHERE entity = ? AND record_id IN ({placeholders})",
+                    [entity, *chunk],
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.db_path, timeout=30, isolation_level=None))
+